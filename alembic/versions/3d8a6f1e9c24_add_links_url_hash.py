@@ -0,0 +1,39 @@
+"""Add links.url_hash for per-owner deduplication
+
+Revision ID: 3d8a6f1e9c24
+Revises: 9b4f7e2a1c6d
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d8a6f1e9c24'
+down_revision: Union[str, None] = '9b4f7e2a1c6d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Существующие ссылки остаются без хеша: дубликаты, созданные до включения
+    # режима дедупликации, не нарушают уникальный индекс
+    op.add_column('links', sa.Column('url_hash', sa.String(length=32), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ux_links_owner_id_url_hash', 'links', ['owner_id', 'url_hash'], unique=True,
+            postgresql_concurrently=True,
+            postgresql_where=sa.text('url_hash IS NOT NULL'),
+            sqlite_where=sa.text('url_hash IS NOT NULL'),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ux_links_owner_id_url_hash', table_name='links', postgresql_concurrently=True)
+    op.drop_column('links', 'url_hash')
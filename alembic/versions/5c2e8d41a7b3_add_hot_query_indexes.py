@@ -0,0 +1,50 @@
+"""Add indexes for hot query shapes
+
+Revision ID: 5c2e8d41a7b3
+Revises: 217de5acc258
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e8d41a7b3'
+down_revision: Union[str, None] = '217de5acc258'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Фильтр по custom_alias уже обслуживается индексом уникального ограничения
+# links_custom_alias_key, отдельный индекс для него не нужен.
+INDEXES = [
+    # get_projects и get_links_by_project: WHERE owner_id = ? AND project ...
+    ('ix_links_owner_id_project', 'links', ['owner_id', 'project'], {}),
+    # cleanup_expired_links: WHERE expires_at < ? (только ссылки со сроком действия)
+    ('ix_links_expires_at', 'links', ['expires_at'], {
+        'postgresql_where': sa.text('expires_at IS NOT NULL'),
+        'sqlite_where': sa.text('expires_at IS NOT NULL'),
+    }),
+    # Внешний ключ link_stats.link_id: каскадное удаление и выборка статистики ссылки
+    ('ix_link_stats_link_id_accessed_at', 'link_stats', ['link_id', 'accessed_at'], {}),
+    # cleanup_inactive_links: WHERE accessed_at < ?
+    ('ix_link_stats_accessed_at', 'link_stats', ['accessed_at'], {}),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # На Postgres индексы строятся CONCURRENTLY (без блокировки записи),
+    # что возможно только вне транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, **options)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,46 @@
+"""Add projects table with link and click counters
+
+Revision ID: 6e1b9c3f2a57
+Revises: c1f7a3e5d209
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e1b9c3f2a57'
+down_revision: Union[str, None] = 'c1f7a3e5d209'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'projects',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('link_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('click_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ux_projects_owner_id_name', 'projects', ['owner_id', 'name'], unique=True)
+    # Счетчики по активным ссылкам (удаленные ссылки ждут очистки и не учитываются);
+    # группировка идет по индексу ix_links_owner_id_project
+    op.execute(
+        "INSERT INTO projects (owner_id, name, link_count, click_count) "
+        "SELECT owner_id, project, COUNT(*), COALESCE(SUM(access_count), 0) FROM links "
+        "WHERE owner_id IS NOT NULL AND project IS NOT NULL AND (is_active IS NULL OR is_active) "
+        "GROUP BY owner_id, project"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_projects_owner_id_name', table_name='projects')
+    op.drop_table('projects')
@@ -0,0 +1,43 @@
+"""Add partial index for deleted links awaiting purge
+
+Revision ID: 8c4d2a6f1b93
+Revises: 6e1b9c3f2a57
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4d2a6f1b93'
+down_revision: Union[str, None] = '6e1b9c3f2a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# purge_deleted_links: WHERE is_active IS false. Удаленных ссылок мало,
+# поэтому индекс маленький, а очистка не сканирует всю таблицу links.
+INDEXES = [
+    ('ix_links_inactive', 'links', ['id'], {
+        'postgresql_where': sa.text('is_active IS false'),
+        'sqlite_where': sa.text('is_active IS 0'),
+    }),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # На Postgres индекс строится CONCURRENTLY (без блокировки записи),
+    # что возможно только вне транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, **options)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,45 @@
+"""Add links access counter columns
+
+Revision ID: c1f7a3e5d209
+Revises: 3d8a6f1e9c24
+Create Date: 2026-10-19 15:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1f7a3e5d209'
+down_revision: Union[str, None] = '3d8a6f1e9c24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Столбцы есть в модели Link, но начальная миграция их не создавала; в базах,
+# созданных через create_tables.py, они уже есть
+COLUMNS = [
+    sa.Column('last_accessed', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('access_count', sa.Integer(), server_default='0', nullable=True),
+]
+
+
+def _existing_columns() -> set:
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns('links')}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = _existing_columns()
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column('links', column)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    existing = _existing_columns()
+    for column in reversed(COLUMNS):
+        if column.name in existing:
+            op.drop_column('links', column.name)
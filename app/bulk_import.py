@@ -0,0 +1,269 @@
+"""Массовый импорт ссылок из CSV и JSONL
+
+Запуск:
+    python -m app.bulk_import links.csv [--format csv|jsonl] [--owner-email EMAIL]
+                              [--batch-size 1000] [--errors errors.jsonl] [--progress-file links.progress]
+
+Файл читается потоком и обрабатывается пакетами по batch_size строк: строки
+пакета проверяются той же схемой, что и `POST /links/shorten`, занятые алиасы
+находятся одним запросом на пакет (индексы short_code и custom_alias), затем
+пакет вставляется одним executemany и фиксируется отдельной транзакцией.
+В памяти одновременно находится только один пакет.
+
+Колонки CSV (и ключи объектов JSONL): original_url, custom_alias, expires_at,
+project, permanent. Строки нумеруются с 1 (в CSV без заголовка). Ошибки
+передаются по одной с номером строки. После каждого пакета сообщается номер
+последней зафиксированной строки; повторный запуск с skip равным этому номеру
+продолжает импорт (--progress-file делает это автоматически).
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import re
+from typing import Callable, Iterator, Optional, TextIO, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .queries import insert_links, taken_codes
+from .redis_client import bump_generation, SEARCH_GENERATION_KEY
+from .routers.links import generate_short_code
+from .schemas import LinkCreate
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Сколько ошибок возвращать в ответе эндпоинта (остальные только считаются)
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+FORMATS = ("csv", "jsonl")
+ALIAS_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """Формат по расширению файла или None"""
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if extension == "ndjson":
+        return "jsonl"
+    return extension if extension in FORMATS else None
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Прочитать записи файла по одной
+
+    Yields:
+        Tuple[int, Optional[dict], Optional[str]]: Номер строки, запись и
+            ошибка разбора (запись None, если строку не удалось разобрать)
+    """
+    if fmt == "csv":
+        for number, record in enumerate(csv.DictReader(stream), 1):
+            if None in record:
+                yield number, None, "Лишние колонки в строке"
+                continue
+            # Пустые ячейки - значения по умолчанию
+            yield number, {key: value for key, value in record.items() if value not in ("", None)}, None
+        return
+
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Некорректный JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "Ожидается JSON-объект"
+            continue
+        yield number, record, None
+
+
+def validate_record(record: dict) -> Tuple[Optional[LinkCreate], Optional[str]]:
+    """Проверить запись схемой создания ссылки
+
+    Returns:
+        Tuple[Optional[LinkCreate], Optional[str]]: Ссылка или текст ошибки
+    """
+    try:
+        link = LinkCreate(**record)
+    except ValidationError as e:
+        return None, "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+    if link.custom_alias is not None and not ALIAS_PATTERN.match(link.custom_alias):
+        return None, "custom_alias: допустимы латинские буквы, цифры, '_' и '-' (до 64 символов)"
+    return link, None
+
+
+def _link_values(link: LinkCreate, short_code: str, owner_id: Optional[int]) -> dict:
+    return {
+        "original_url": str(link.original_url),
+        "short_code": short_code,
+        "custom_alias": link.custom_alias,
+        "expires_at": link.expires_at,
+        "project": link.project,
+        "permanent": link.permanent,
+        "owner_id": owner_id,
+        "access_count": 0,
+        "is_active": True,
+    }
+
+
+def _assign_codes(db: Session, count: int, reserved: set) -> list:
+    """Сгенерировать count свободных коротких кодов, проверяя занятость пакетом"""
+    codes = set()
+    while len(codes) < count:
+        candidates = {generate_short_code() for _ in range(count - len(codes))} - reserved - codes
+        codes |= candidates - taken_codes(db, candidates)
+    return list(codes)
+
+
+def import_links(db: Session, stream: TextIO, fmt: str, owner_id: Optional[int] = None,
+                 batch_size: int = IMPORT_BATCH_SIZE, skip: int = 0,
+                 on_error: Callable[[int, str], None] = None,
+                 on_progress: Callable[[dict], None] = None) -> dict:
+    """Импортировать ссылки из файла
+
+    Args:
+        db (Session): Сессия базы данных
+        stream (TextIO): Текстовый поток с содержимым файла
+        fmt (str): Формат: csv или jsonl
+        owner_id (int, optional): Владелец импортируемых ссылок
+        batch_size (int): Строк в пакете (транзакции)
+        skip (int): Пропустить строки с номерами до skip включительно (продолжение импорта)
+        on_error (Callable[[int, str], None], optional): Вызывается для каждой ошибочной строки
+        on_progress (Callable[[dict], None], optional): Вызывается после каждого пакета
+
+    Returns:
+        dict: processed, imported, failed и last_row - номер последней
+            обработанной строки
+
+    Raises:
+        ValueError: Если формат не поддерживается
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Неподдерживаемый формат: {fmt}")
+    result = {"processed": 0, "imported": 0, "failed": 0, "last_row": skip}
+
+    rows = (row for row in read_rows(stream, fmt) if row[0] > skip)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+
+        # Ошибки пакета передаются по порядку строк после его обработки
+        failures = []
+
+        valid = []
+        for number, record, error in batch:
+            link = None
+            if error is None:
+                link, error = validate_record(record)
+            if error:
+                failures.append((number, error))
+            else:
+                valid.append((number, link))
+
+        # Алиасы пакета проверяются одним запросом; повторы внутри пакета - ошибка
+        taken = taken_codes(db, (link.custom_alias for _, link in valid if link.custom_alias))
+        accepted = []
+        for number, link in valid:
+            if link.custom_alias and link.custom_alias in taken:
+                failures.append((number, "custom_alias: алиас уже существует"))
+                continue
+            if link.custom_alias:
+                taken.add(link.custom_alias)
+            accepted.append((number, link))
+
+        codes = iter(_assign_codes(db, sum(1 for _, link in accepted if not link.custom_alias), taken))
+        values = [
+            (number, _link_values(link, link.custom_alias or next(codes), owner_id))
+            for number, link in accepted
+        ]
+        if values:
+            try:
+                insert_links(db, [row for _, row in values])
+                db.commit()
+                result["imported"] += len(values)
+            except IntegrityError:
+                # Код заняли параллельно: вставляем пакет по одной строке
+                db.rollback()
+                for number, row in values:
+                    try:
+                        insert_links(db, [row])
+                        db.commit()
+                        result["imported"] += 1
+                    except IntegrityError:
+                        db.rollback()
+                        failures.append((number, "short_code: код или алиас уже существует"))
+
+        result["failed"] += len(failures)
+        if on_error is not None:
+            for number, error in sorted(failures):
+                on_error(number, error)
+        result["processed"] += len(batch)
+        result["last_row"] = batch[-1][0]
+        if on_progress is not None:
+            on_progress(dict(result))
+
+    if result["imported"]:
+        bump_generation(SEARCH_GENERATION_KEY)
+    return result
+
+
+def main(argv=None):
+    from .database import SessionLocal
+    from .models import User
+
+    parser = argparse.ArgumentParser(description="Массовый импорт ссылок из CSV и JSONL")
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--owner-email", help="Владелец импортируемых ссылок")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--errors", help="Файл для ошибок (JSONL: номер строки и текст ошибки)")
+    parser.add_argument("--progress-file", help="Файл с номером последней зафиксированной строки")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.file)
+    if fmt is None:
+        parser.error("Не удалось определить формат, укажите --format")
+    skip = 0
+    if args.progress_file and os.path.exists(args.progress_file):
+        with open(args.progress_file) as progress:
+            skip = int(progress.read().strip() or 0)
+        print(f"Продолжение импорта после строки {skip}")
+
+    db = SessionLocal()
+    errors = open(args.errors, "a") if args.errors else None
+    try:
+        owner_id = None
+        if args.owner_email:
+            owner = db.query(User).filter(User.email == args.owner_email).first()
+            if owner is None:
+                parser.error(f"Пользователь {args.owner_email} не найден")
+            owner_id = owner.id
+
+        def on_error(number, error):
+            if errors is not None:
+                errors.write(json.dumps({"row": number, "error": error}, ensure_ascii=False) + "\n")
+            else:
+                print(f"Строка {number}: {error}")
+
+        def on_progress(result):
+            if args.progress_file:
+                with open(args.progress_file, "w") as progress:
+                    progress.write(str(result["last_row"]))
+            print(f"Обработано строк: {result['processed']}, импортировано: {result['imported']}, ошибок: {result['failed']}")
+
+        with open(args.file, encoding="utf-8", newline="") as stream:
+            print(import_links(
+                db, stream, fmt, owner_id=owner_id, batch_size=args.batch_size, skip=skip,
+                on_error=on_error, on_progress=on_progress
+            ))
+    finally:
+        if errors is not None:
+            errors.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Массовые операции над ссылками проекта
+
+Ссылки проекта обрабатываются порциями по BULK_CHUNK_SIZE: каждая порция -
+один SELECT по индексу (owner_id, project) с курсором по id, один UPDATE по
+списку id и отдельная короткая транзакция. После фиксации порции ключи ее
+ссылок удаляются из кэша одним DEL на узел Redis (`delete_many`).
+
+Удаление мягкое, как у `DELETE /links/{short_code}`: ссылки помечаются
+is_active = false, а статистику и сами строки удаляет фоновая задача
+purge_deleted_links.
+"""
+import os
+from typing import Iterator
+
+from sqlalchemy.orm import Session
+
+from .project_clicks import flushed_clicks
+from .queries import adjust_project_counts, update_project_chunk
+from .redis_client import bump_generation, clear_owner_cache, delete_many, SEARCH_GENERATION_KEY
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+# Значения столбцов при мягком удалении ссылки
+DELETED_VALUES = {"is_active": False, "url_hash": None}
+
+
+def iter_project_updates(db: Session, owner_id: int, project: str, values: dict,
+                         chunk_size: int = BULK_CHUNK_SIZE, drop_stats: bool = False) -> Iterator[int]:
+    """Изменить все активные ссылки проекта, сообщая о прогрессе
+
+    Генератор: после фиксации каждой порции возвращает количество уже
+    обработанных ссылок. Кэш поиска и сводки владельца очищается по
+    завершении, в том числе если обход прерван (например, клиент отключился
+    от потока прогресса); повторный вызов обработает оставшиеся ссылки.
+
+    Args:
+        db (Session): Сессия базы данных
+        owner_id (int): Владелец ссылок
+        project (str): Название проекта
+        values (dict): Новые значения столбцов links
+        chunk_size (int): Ссылок в порции (транзакции)
+        drop_stats (bool): Удалять из кэша и статистику ссылок
+
+    Yields:
+        int: Количество обработанных ссылок
+    """
+    cursor = {}
+    processed = 0
+    try:
+        while True:
+            rows = update_project_chunk(db, owner_id, project, values, cursor, chunk_size)
+            if not rows:
+                break
+            codes = [row.short_code for row in rows]
+            if values.get("is_active") is False:
+                adjust_project_counts(db, [
+                    (row.short_code, owner_id, project, -1, -flushed_clicks(row.short_code, row.access_count)) for row in rows
+                ])
+            db.commit()
+            keys = [f"link:{code}" for code in codes]
+            if drop_stats:
+                keys += [f"stats:{code}" for code in codes]
+            delete_many(keys)
+            processed += len(codes)
+            yield processed
+    finally:
+        if processed:
+            bump_generation(SEARCH_GENERATION_KEY)
+            clear_owner_cache([owner_id])
+
+
+def iter_project_deletes(db: Session, owner_id: int, project: str,
+                         chunk_size: int = BULK_CHUNK_SIZE) -> Iterator[int]:
+    """Мягко удалить все ссылки проекта, сообщая о прогрессе (см. iter_project_updates)"""
+    return iter_project_updates(db, owner_id, project, DELETED_VALUES, chunk_size=chunk_size, drop_stats=True)
+
+
+def update_project_links(db: Session, owner_id: int, project: str, values: dict,
+                         chunk_size: int = BULK_CHUNK_SIZE, drop_stats: bool = False) -> int:
+    """Изменить все активные ссылки проекта
+
+    Returns:
+        int: Количество измененных ссылок
+    """
+    processed = 0
+    for processed in iter_project_updates(db, owner_id, project, values, chunk_size, drop_stats):
+        pass
+    return processed
+
+
+def delete_project_links(db: Session, owner_id: int, project: str, chunk_size: int = BULK_CHUNK_SIZE) -> int:
+    """Мягко удалить все ссылки проекта
+
+    Returns:
+        int: Количество удаленных ссылок
+    """
+    return update_project_links(db, owner_id, project, DELETED_VALUES, chunk_size=chunk_size, drop_stats=True)
@@ -0,0 +1,100 @@
+import threading
+import time
+from typing import Callable
+
+# Состояния автомата
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Числовые коды состояний для метрик
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Автоматический выключатель для внешней зависимости (Redis)
+
+    После failure_threshold ошибок подряд выключатель размыкается и перестает
+    пропускать вызовы. Через recovery_timeout секунд он переходит в состояние
+    half_open и пропускает один пробный вызов: успех замыкает цепь, ошибка
+    снова ее размыкает.
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Вернуть выключатель в исходное (замкнутое) состояние"""
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.opened_total = 0
+        self.rejected_total = 0
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние с учетом истекшего времени восстановления"""
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Можно ли выполнить вызов к зависимости
+
+        Returns:
+            bool: True, если вызов разрешен (в half_open - только один пробный)
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected_total += 1
+            return False
+
+    def record_success(self):
+        """Зафиксировать успешный вызов"""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """Зафиксировать ошибку вызова"""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.opened_total += 1
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._probe_in_flight = False
+
+    def metrics(self) -> dict:
+        """Метрики выключателя
+
+        Returns:
+            dict: Состояние (строкой и кодом), счетчики ошибок и отказов
+        """
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "state_code": STATE_CODES[state],
+                "consecutive_failures": self._failures,
+                "opened_total": self.opened_total,
+                "rejected_total": self.rejected_total,
+            }
@@ -0,0 +1,128 @@
+"""Быстрый путь для перенаправлений по короткому коду
+
+ASGI-middleware перехватывает `GET /{short_code}` до маршрутизации FastAPI:
+URL берется прямо из кэша (Redis или кэш процесса), без внедрения
+зависимостей, сессии БД и pydantic. Переход учитывается в пуле потоков уже
+после отправки ответа. При промахе кэша запрос передается приложению целиком
+(маршрут заполнит кэш, вернет 404 или 410).
+"""
+import json
+import os
+from urllib.parse import quote
+
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from .database import get_db
+from .http_cache import read_link_entry, entry_expired, redirect_cache_control
+from .live import publish_click
+from .project_clicks import add_project_click
+from .queries import record_click
+from .redis_client import get_cache
+
+# json - ответ 200 с телом {"url": ...}, 301/302/307/308 - настоящий редирект с Location
+REDIRECT_MODE = os.getenv("REDIRECT_MODE", "json")
+# Включить быстрый путь (false - все запросы идут через маршрут FastAPI)
+FAST_REDIRECT = os.getenv("FAST_REDIRECT", "true").lower() in ("1", "true", "yes")
+
+# Символы URL, которые не нужно экранировать в заголовке Location (как в starlette)
+_LOCATION_SAFE = ":/%#?=@[]!$&'()*+,;"
+
+
+def redirect_status(mode: str, permanent: bool = False) -> int:
+    """HTTP-статус редиректа для режима или 0 для режима json
+
+    Для постоянных ссылок статус заменяется постоянным аналогом (301 или 308).
+
+    Raises:
+        ValueError: Если режим не поддерживается
+    """
+    if mode == "json":
+        return 0
+    if mode not in ("301", "302", "307", "308"):
+        raise ValueError(f"Неподдерживаемый REDIRECT_MODE: {mode}")
+    if permanent:
+        return 308 if mode in ("307", "308") else 301
+    return int(mode)
+
+
+class FastRedirectMiddleware:
+    """ASGI-middleware с быстрым ответом на `GET /{short_code}` из кэша
+
+    Args:
+        app: Следующее ASGI-приложение в цепочке
+        application (FastAPI): Приложение, откуда берутся маршруты (их пути не
+            считаются короткими кодами) и переопределения get_db
+        mode (str): Режим ответа, см. REDIRECT_MODE
+    """
+
+    def __init__(self, app, application, mode: str = REDIRECT_MODE):
+        self.app = app
+        self.application = application
+        self.mode = mode
+        # Неподдерживаемый режим - ошибка при старте, а не при первом запросе
+        redirect_status(mode)
+        self._reserved = None
+
+    def _short_code(self, scope) -> str:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return None
+        path = scope["path"]
+        if len(path) < 2 or path.count("/") != 1:
+            return None
+        # Маршруты приложения (/health, /docs, ...) регистрируются до старта,
+        # поэтому множество строится при первом запросе
+        if self._reserved is None:
+            self._reserved = {route.path for route in self.application.routes if "{" not in route.path}
+        if path in self._reserved:
+            return None
+        return path[1:]
+
+    async def __call__(self, scope, receive, send):
+        short_code = self._short_code(scope)
+        entry = read_link_entry(get_cache(f"link:{short_code}")) if short_code else None
+        # Истекшие ссылки (ответ 410) обрабатывает приложение
+        if not entry or entry_expired(entry):
+            await self.app(scope, receive, send)
+            return
+
+        # Шаблон маршрута для метрик (MetricsMiddleware)
+        scope["route_template"] = "/{short_code}"
+        status_code = redirect_status(self.mode, entry["permanent"])
+        if status_code:
+            body = b""
+            headers = [(b"location", quote(entry["url"], safe=_LOCATION_SAFE).encode("latin-1"))]
+        else:
+            status_code = 200
+            body = json.dumps({"url": entry["url"]}).encode("utf-8")
+            headers = [(b"content-type", b"application/json")]
+        headers.append((b"cache-control", redirect_cache_control(entry).encode("latin-1")))
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+        await run_in_threadpool(self._record_hit, short_code, scope)
+
+    def _record_hit(self, short_code: str, scope):
+        """Учесть переход по ссылке, отданной из кэша"""
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope.get("headers", [])}
+        client = scope.get("client")
+        # Та же зависимость, что у маршрутов, с учетом переопределений
+        sessions = self.application.dependency_overrides.get(get_db, get_db)()
+        db = next(sessions)
+        try:
+            record_click(
+                db, short_code,
+                ip_address=str(client[0]) if client else None,
+                user_agent=headers.get("user-agent"),
+                referer=headers.get("referer")
+            )
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            print(f"Ошибка учета перехода по {short_code}: {e}")
+            return
+        finally:
+            sessions.close()
+        add_project_click(short_code)
+        publish_click(short_code)
@@ -0,0 +1,81 @@
+import bisect
+import hashlib
+from typing import Hashable, Iterable, List
+
+
+class HashRing:
+    """Консистентное хеширование с виртуальными узлами
+
+    Каждый узел занимает vnodes точек на кольце. Ключ принадлежит первому
+    узлу по часовой стрелке от своего хеша, поэтому при добавлении узла
+    переезжает только ~1/N ключей - и только на новый узел.
+    """
+
+    def __init__(self, nodes: Iterable[Hashable] = (), vnodes: int = 160):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners = {}
+        self._nodes = []
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    @property
+    def nodes(self) -> list:
+        """Список узлов в порядке добавления"""
+        return list(self._nodes)
+
+    def add_node(self, node: Hashable):
+        """Добавить узел на кольцо
+
+        Args:
+            node (Hashable): Идентификатор узла (например, URL)
+        """
+        if node in self._nodes:
+            return
+        self._nodes.append(node)
+        for i in range(self.vnodes):
+            point = self._hash(f"{node}#{i}")
+            if point in self._owners:
+                continue
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove_node(self, node: Hashable):
+        """Убрать узел с кольца; его ключи переходят к соседям"""
+        if node not in self._nodes:
+            return
+        self._nodes.remove(node)
+        self._points = [p for p in self._points if self._owners[p] != node]
+        self._owners = {p: self._owners[p] for p in self._points}
+
+    def get_node(self, key: str) -> Hashable:
+        """Получить узел, которому принадлежит ключ
+
+        Args:
+            key (str): Ключ
+        Returns:
+            Hashable: Идентификатор узла
+        Raises:
+            ValueError: Если на кольце нет узлов
+        """
+        if not self._points:
+            raise ValueError("Hash ring is empty")
+        if len(self._nodes) == 1:
+            return self._nodes[0]
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def group(self, keys: Iterable[str]) -> dict:
+        """Сгруппировать ключи по узлам
+
+        Returns:
+            dict: Узел -> список его ключей (порядок ключей сохраняется)
+        """
+        groups = {}
+        for key in keys:
+            groups.setdefault(self.get_node(key), []).append(key)
+        return groups
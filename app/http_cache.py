@@ -0,0 +1,121 @@
+"""HTTP-кэширование: ETag, условные запросы и Cache-Control редиректов
+
+Здесь же формат записи кэша `link:{short_code}`: кроме URL в ней хранятся
+признак постоянной ссылки и срок действия, чтобы быстрый путь редиректа
+мог выставить правильный Cache-Control без обращения к БД.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import Request, Response
+
+from .redis_client import set_cache
+
+# Время жизни записи кэша ссылки (не больше оставшегося срока действия ссылки)
+LINK_CACHE_TTL = 86400
+# max-age для постоянных редиректов (не больше оставшегося срока действия ссылки)
+REDIRECT_PERMANENT_MAX_AGE = int(os.getenv("REDIRECT_PERMANENT_MAX_AGE", "86400"))
+# Cache-Control временных редиректов: каждый переход должен дойти до сервиса
+REDIRECT_TEMPORARY_CACHE_CONTROL = os.getenv("REDIRECT_TEMPORARY_CACHE_CONTROL", "no-cache")
+# Cache-Control информации и статистики ссылок: кэшировать можно, но с проверкой по ETag
+LINK_INFO_CACHE_CONTROL = os.getenv("LINK_INFO_CACHE_CONTROL", "no-cache")
+
+
+def make_etag(data: dict) -> str:
+    """Сильный ETag по содержимому ответа
+
+    Args:
+        data (dict): Значения, из которых строится ответ
+    Returns:
+        str: ETag в кавычках
+    """
+    payload = json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+    return '"%s"' % hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Совпадает ли ETag с заголовком If-None-Match (слабое сравнение, RFC 7232)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip() in (etag, "W/" + etag) for tag in header.split(","))
+
+
+def not_modified(etag: str, cache_control: str = LINK_INFO_CACHE_CONTROL) -> Response:
+    """Ответ 304 без тела"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Время в UTC без часового пояса
+
+    Postgres возвращает timestamptz с часовым поясом, SQLite и клиенты API -
+    без него; сравнение с datetime.utcnow() требует одного вида.
+    """
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _seconds_left(expires_at: Optional[datetime], now: datetime) -> Optional[int]:
+    if expires_at is None:
+        return None
+    return max(int((expires_at - now).total_seconds()), 0)
+
+
+def link_cache_entry(original_url: str, permanent: bool = False, expires_at: Optional[datetime] = None) -> dict:
+    """Запись кэша для ссылки"""
+    return {
+        "url": original_url,
+        "permanent": bool(permanent),
+        "expires_at": naive_utc(expires_at).isoformat() if expires_at else None
+    }
+
+
+def read_link_entry(value) -> Optional[dict]:
+    """Разобрать запись кэша ссылки
+
+    Записи старого формата (строка с URL) считаются временными ссылками без срока.
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        return link_cache_entry(value)
+    return value
+
+
+def _entry_expires_at(entry: dict) -> Optional[datetime]:
+    # Записи, сохраненные до приведения к UTC, могут содержать часовой пояс
+    return naive_utc(datetime.fromisoformat(entry["expires_at"])) if entry.get("expires_at") else None
+
+
+def entry_expired(entry: dict, now: datetime = None) -> bool:
+    """Истек ли срок действия ссылки из записи кэша"""
+    expires_at = _entry_expires_at(entry)
+    return expires_at is not None and expires_at < (naive_utc(now) or datetime.utcnow())
+
+
+def cache_link(short_code: str, entry: dict):
+    """Записать ссылку в кэш на время, не превышающее срок ее действия"""
+    left = _seconds_left(_entry_expires_at(entry), datetime.utcnow())
+    ttl = LINK_CACHE_TTL if left is None else min(LINK_CACHE_TTL, left)
+    if ttl > 0:
+        set_cache(f"link:{short_code}", entry, ttl)
+
+
+def redirect_cache_control(entry: dict, now: datetime = None) -> str:
+    """Cache-Control для редиректа по ссылке
+
+    Постоянные ссылки кэшируются браузерами и CDN, но не дольше срока действия
+    ссылки; временные перепроверяются при каждом переходе.
+    """
+    if not entry.get("permanent"):
+        return REDIRECT_TEMPORARY_CACHE_CONTROL
+    left = _seconds_left(_entry_expires_at(entry), naive_utc(now) or datetime.utcnow())
+    max_age = REDIRECT_PERMANENT_MAX_AGE if left is None else min(REDIRECT_PERMANENT_MAX_AGE, left)
+    return f"public, max-age={max_age}"
@@ -0,0 +1,235 @@
+"""Переходы по ссылкам в реальном времени (Server-Sent Events)
+
+Редирект публикует переход в канал Redis `clicks:{short_code}` (на узле,
+которому канал принадлежит на кольце). В каждом процессе работает один
+LiveHub: на канал ссылки он подписывается один раз, сколько бы зрителей ее
+ни смотрело, и раз в LIVE_TICK секунд забирает все накопившиеся сообщения.
+Переходы за тик суммируются и раздаются зрителям одним событием.
+
+Каждый зритель хранит только счетчик еще не отправленных переходов: если
+клиент читает медленнее, чем приходят события, переходы складываются в
+следующее событие, а не копятся в очереди (память на зрителя постоянна).
+"""
+import asyncio
+import json
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Set
+
+import redis
+
+from . import redis_client
+from .redis_client import UNAVAILABLE, call_redis
+
+# Публиковать переходы для живой статистики
+LIVE_EVENTS = os.getenv("LIVE_EVENTS", "true").lower() in ("1", "true", "yes")
+# Период объединения событий в секундах
+LIVE_TICK = float(os.getenv("LIVE_TICK", "1.0"))
+# Комментарий-пинг, чтобы прокси не закрывали соединение без событий
+LIVE_KEEPALIVE = float(os.getenv("LIVE_KEEPALIVE", "15"))
+# Максимум одновременных зрителей в процессе
+LIVE_MAX_VIEWERS = int(os.getenv("LIVE_MAX_VIEWERS", "10000"))
+
+CHANNEL_PREFIX = "clicks:"
+
+
+def channel_for(short_code: str) -> str:
+    return f"{CHANNEL_PREFIX}{short_code}"
+
+
+def publish_click(short_code: str):
+    """Опубликовать переход по ссылке
+
+    Если Redis недоступен, переход доставляется только зрителям этого процесса.
+
+    Args:
+        short_code (str): Короткий код ссылки
+    Returns:
+        None
+    """
+    if not LIVE_EVENTS:
+        return
+    if call_redis("publish", channel_for(short_code), 1) is UNAVAILABLE:
+        hub.record(short_code)
+
+
+class Viewer:
+    """Подписчик на переходы одной ссылки"""
+    __slots__ = ("pending", "event")
+
+    def __init__(self):
+        self.pending = 0
+        self.event = asyncio.Event()
+
+    def add(self, count: int):
+        self.pending += count
+        self.event.set()
+
+    def take(self) -> int:
+        count, self.pending = self.pending, 0
+        self.event.clear()
+        return count
+
+
+class LiveHub:
+    """Раздача переходов зрителям процесса через подписки Redis"""
+
+    def __init__(self, tick: float = LIVE_TICK, max_viewers: int = LIVE_MAX_VIEWERS):
+        self.tick = tick
+        self.max_viewers = max_viewers
+        self.viewers: Dict[str, Set[Viewer]] = {}
+        # Подписки по узлам Redis: узел -> (pubsub, коды подписанных ссылок)
+        self.subscriptions: Dict[str, tuple] = {}
+        self._local = Counter()
+        self._lock = threading.Lock()
+        self._task = None
+
+    @property
+    def viewer_count(self) -> int:
+        return sum(len(viewers) for viewers in self.viewers.values())
+
+    def add(self, short_code: str) -> Viewer:
+        """Добавить зрителя ссылки и запустить раздачу событий
+
+        Raises:
+            OverflowError: Если достигнут предел зрителей процесса
+        """
+        if self.viewer_count >= self.max_viewers:
+            raise OverflowError("Слишком много зрителей")
+        viewer = Viewer()
+        self.viewers.setdefault(short_code, set()).add(viewer)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return viewer
+
+    def remove(self, short_code: str, viewer: Viewer):
+        viewers = self.viewers.get(short_code)
+        if viewers is None:
+            return
+        viewers.discard(viewer)
+        if not viewers:
+            del self.viewers[short_code]
+
+    def record(self, short_code: str, count: int = 1):
+        """Учесть переход без Redis (доставляется в ближайший тик)"""
+        if short_code not in self.viewers:
+            return
+        with self._lock:
+            self._local[short_code] += count
+
+    def drain(self, codes: Iterable[str]) -> Counter:
+        """Привести подписки к набору кодов и забрать накопившиеся переходы
+
+        Выполняется в пуле потоков: клиент Redis синхронный.
+
+        Args:
+            codes (Iterable[str]): Коды ссылок, у которых есть зрители
+        Returns:
+            Counter: Код -> количество переходов с прошлого тика
+        """
+        wanted = {}
+        for short_code in codes:
+            wanted.setdefault(redis_client.node_for(channel_for(short_code)).name, set()).add(short_code)
+
+        counts = Counter()
+        for name in set(self.subscriptions) | set(wanted):
+            node = redis_client.nodes.get(name)
+            try:
+                self._drain_node(name, node, wanted.get(name, set()), counts)
+            except redis.RedisError as e:
+                # Подписка восстановится в следующий тик
+                print(f"Redis {name} недоступен (live): {e}")
+                self._close(name)
+
+        with self._lock:
+            counts.update(self._local)
+            self._local.clear()
+        return counts
+
+    def _drain_node(self, name: str, node, codes: Set[str], counts: Counter):
+        if node is None or not codes:
+            self._close(name)
+            return
+        pubsub, subscribed = self.subscriptions.get(name) or (node.client.pubsub(ignore_subscribe_messages=True), set())
+        if codes - subscribed:
+            pubsub.subscribe(*(channel_for(code) for code in codes - subscribed))
+        if subscribed - codes:
+            pubsub.unsubscribe(*(channel_for(code) for code in subscribed - codes))
+        self.subscriptions[name] = (pubsub, set(codes))
+
+        while True:
+            message = pubsub.get_message(timeout=0)
+            if message is None:
+                break
+            if message.get("type") != "message":
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            counts[channel[len(CHANNEL_PREFIX):]] += int(message["data"])
+
+    def _close(self, name: str):
+        pubsub, _ = self.subscriptions.pop(name, (None, None))
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except redis.RedisError:
+                pass
+
+    def dispatch(self, counts: Counter):
+        for short_code, count in counts.items():
+            for viewer in self.viewers.get(short_code, ()):
+                viewer.add(count)
+
+    async def run(self):
+        """Цикл раздачи: один drain на тик, пока есть зрители"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.tick)
+            codes = list(self.viewers)
+            try:
+                counts = await loop.run_in_executor(None, self.drain, codes)
+            except Exception as e:
+                print(f"Ошибка раздачи живой статистики: {e}")
+                continue
+            self.dispatch(counts)
+            if not codes and not self.viewers:
+                # Зрителей не осталось: подписки сняты в drain
+                break
+
+
+hub = LiveHub()
+
+
+def format_event(short_code: str, clicks: int) -> str:
+    data = json.dumps({"short_code": short_code, "clicks": clicks, "time": datetime.utcnow().isoformat()})
+    return f"event: clicks\ndata: {data}\n\n"
+
+
+async def stream_clicks(short_code: str, viewer: Viewer, is_disconnected, keepalive: float = LIVE_KEEPALIVE):
+    """События SSE для зрителя, пока клиент не отключится
+
+    Args:
+        short_code (str): Короткий код ссылки
+        viewer (Viewer): Зритель, полученный от hub.add
+        is_disconnected: Корутина-функция, проверяющая отключение клиента
+        keepalive (float): Период комментариев-пингов в секундах
+
+    Yields:
+        str: Строки потока text/event-stream
+    """
+    try:
+        yield f"retry: {int(LIVE_TICK * 1000)}\n\n"
+        while not await is_disconnected():
+            try:
+                await asyncio.wait_for(viewer.event.wait(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            clicks = viewer.take()
+            if clicks:
+                yield format_event(short_code, clicks)
+    finally:
+        hub.remove(short_code, viewer)
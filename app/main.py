@@ -1,12 +1,18 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse, Response
+import asyncio
 import uvicorn
 import os
 
 from .database import get_db
 from .models import Link
-from .redis_client import get_cache
+from .redis_client import get_cache, cache_health
+from .fast_redirect import FastRedirectMiddleware, FAST_REDIRECT, REDIRECT_MODE, redirect_status
+from .http_cache import redirect_cache_control
+from .metrics import MetricsMiddleware, monitor_event_loop_lag, redis_circuit_state, render_metrics
+from .query_budget import QueryBudgetMiddleware, query_budget
+from . import profiler
 from datetime import datetime
 
 app = FastAPI(
@@ -15,6 +21,10 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Быстрый путь редиректов добавляется первым, чтобы CORS оставался внешним слоем
+if FAST_REDIRECT:
+    app.add_middleware(FastRedirectMiddleware, application=app, mode=REDIRECT_MODE)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -23,25 +33,86 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Профилирование отдельных запросов по заголовку X-Profile-Token
+app.add_middleware(profiler.ProfilerMiddleware)
+
+# Счетчики запросов к БД (бюджеты маршрутов, заголовки X-DB-* в режиме отладки)
+app.add_middleware(QueryBudgetMiddleware)
+
+# Метрики - самый внешний слой: учитываются и ответы быстрого пути
+app.add_middleware(MetricsMiddleware, application=app)
+
 # Import routers
-from .routers import auth, links
+from .routers import auth, links, imports
 
 # Register routers
 app.include_router(auth.router)
 app.include_router(links.router)
+app.include_router(imports.router)
 
 @app.get("/")
 async def root():
     return {"message": "Добро пожаловать в URL Shortener API"}
 
+@app.get("/health")
+async def health():
+    """Состояние сервиса и автоматических выключателей узлов Redis"""
+    return {"status": "ok", "redis_circuit": cache_health()}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики в формате Prometheus"""
+    for node, state in cache_health().items():
+        redis_circuit_state.labels(node).set(state["state_code"])
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+@app.post(profiler.WINDOW_PATH, include_in_schema=False)
+async def profile_window(
+    seconds: float = Query(10, gt=0),
+    x_profile_token: str = Header(None)
+):
+    """Профилировать текущий воркер в течение seconds секунд
+
+    Returns:
+        PlainTextResponse: Стеки в формате collapsed stacks
+
+    Raises:
+        HTTPException: 404, если профилировщик выключен; 403 при неверном токене;
+            409, если в воркере уже идет профилирование
+    """
+    if not profiler.PROFILER_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not profiler.authorized(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Неверный токен профилировщика")
+
+    sampler = profiler.Sampler()
+    if not sampler.start():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Профилирование уже запущено")
+    try:
+        await asyncio.sleep(min(seconds, profiler.PROFILER_MAX_WINDOW))
+    finally:
+        sampler.stop()
+    return PlainTextResponse(sampler.collapsed())
+
+@app.on_event("startup")
+async def start_event_loop_monitor():
+    asyncio.create_task(monitor_event_loop_lag())
+
 # Корневой маршрут для работы с короткими ссылками (redirect)
 @app.get("/{short_code}")
+@query_budget(3)
 async def redirect(short_code: str, request: Request, db = Depends(get_db)):
     """
     Обрабатывает короткий URL и перенаправляет на соответствующий оригинальный URL
     """
-    # Вместо использования url_path_for напрямую вызываем функцию redirect_to_original
-    return await links.redirect_to_original(short_code=short_code, request=request, db=db)
+    # Вместо использования url_path_for напрямую вызываем функцию resolve_redirect
+    entry = links.resolve_redirect(short_code=short_code, request=request, db=db)
+    headers = {"Cache-Control": redirect_cache_control(entry)}
+    status_code = redirect_status(REDIRECT_MODE, entry["permanent"])
+    if status_code:
+        return RedirectResponse(entry["url"], status_code=status_code, headers=headers)
+    return JSONResponse({"url": entry["url"]}, headers=headers)
 
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""Метрики в формате Prometheus
+
+Задержки маршрутов, попадания в кэш по семействам ключей, запросы к БД,
+фоновые задачи очистки и задержка цикла событий. Обновление метрики - это
+изменение значения в памяти своего процесса, без межпроцессных блокировок.
+
+Несколько воркеров uvicorn: задайте PROMETHEUS_MULTIPROC_DIR (пустой
+каталог, очищаемый при перезапуске) до старта. Каждый воркер пишет значения
+в свой mmap-файл, а `/metrics` любого воркера суммирует файлы всех процессов.
+"""
+import asyncio
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+# Как часто (в секундах) измерять задержку цикла событий
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+
+# Семейства ключей кэша; остальные ключи попадают в "other"
+CACHE_FAMILIES = ("link", "stats", "search")
+
+# Границы для быстрых путей: от долей миллисекунды до секунд
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Время обработки запроса",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+cache_requests = Counter(
+    "cache_requests_total", "Обращения к кэшу по семействам ключей", ["family", "result"]
+)
+db_queries = Counter("db_queries_total", "Запросы к БД", ["operation"])
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "Время выполнения запроса к БД", ["operation"], buckets=LATENCY_BUCKETS
+)
+cleanup_duration = Histogram(
+    "cleanup_duration_seconds", "Время выполнения задачи очистки", ["job"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+cleanup_deleted = Counter("cleanup_deleted_rows_total", "Удаленные задачами очистки ссылки", ["job"])
+event_loop_lag = Histogram(
+    "event_loop_lag_seconds", "Опоздание цикла событий относительно запланированного пробуждения",
+    buckets=LATENCY_BUCKETS
+)
+redis_circuit_state = Gauge(
+    "redis_circuit_state", "Состояние выключателя узла Redis (0 - closed, 1 - half_open, 2 - open)",
+    ["node"], multiprocess_mode="liveall"
+)
+
+
+def cache_family(key: str) -> str:
+    """Семейство ключа кэша для метки метрики (ограниченный набор значений)"""
+    family = key.split(":", 1)[0]
+    return family if family in CACHE_FAMILIES else "other"
+
+
+def record_cache_lookup(key: str, hit: bool):
+    """Учесть обращение к кэшу"""
+    cache_requests.labels(cache_family(key), "hit" if hit else "miss").inc()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "other"
+    if operation not in ("select", "insert", "update", "delete"):
+        operation = "other"
+    db_queries.labels(operation).inc()
+    db_query_duration.labels(operation).observe(elapsed)
+
+
+def observe_cleanup(job: str, started: float, deleted: int):
+    """Учесть выполнение задачи очистки
+
+    Args:
+        job (str): Название задачи
+        started (float): Момент начала по time.perf_counter()
+        deleted (int): Количество удаленных ссылок
+    """
+    cleanup_duration.labels(job).observe(time.perf_counter() - started)
+    cleanup_deleted.labels(job).inc(deleted)
+
+
+async def measure_event_loop_lag(interval: float = EVENT_LOOP_LAG_INTERVAL) -> float:
+    """Один замер: насколько позже запланированного проснулась корутина"""
+    started = time.monotonic()
+    await asyncio.sleep(interval)
+    lag = max(time.monotonic() - started - interval, 0.0)
+    event_loop_lag.observe(lag)
+    return lag
+
+
+async def monitor_event_loop_lag(interval: float = EVENT_LOOP_LAG_INTERVAL):
+    """Фоновая задача: постоянно измерять задержку цикла событий"""
+    while True:
+        await measure_event_loop_lag(interval)
+
+
+class MetricsMiddleware:
+    """ASGI-middleware, измеряющее время обработки запросов
+
+    Метка route - шаблон пути маршрута (например, `/links/{short_code}/stats/`),
+    а не сам путь, чтобы число временных рядов не росло. Middleware, отвечающие
+    сами (быстрый путь редиректа), указывают шаблон в scope["route_template"].
+    """
+
+    def __init__(self, app, application):
+        self.app = app
+        self.application = application
+        self._templates = None
+
+    def _route(self, scope) -> str:
+        if "route_template" in scope:
+            return scope["route_template"]
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._templates is None:
+            self._templates = {}
+            for route in self.application.routes:
+                self._templates.setdefault(getattr(route, "endpoint", None), route.path)
+        return self._templates.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_request_duration.labels(scope["method"], self._route(scope), str(status)).observe(
+                time.perf_counter() - started
+            )
+
+
+def render_metrics():
+    """Текст метрик и его Content-Type
+
+    В многопроцессном режиме значения собираются из файлов всех воркеров.
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
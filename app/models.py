@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -26,11 +26,37 @@ class Link(Base):
     last_accessed = Column(DateTime(timezone=True), nullable=True)
     access_count = Column(Integer, default=0)
     is_active = Column(Boolean, default=True)  
+    # Постоянная ссылка: редирект 301 и кэширование браузерами и CDN
+    permanent = Column(Boolean, default=False)
     project = Column(String, nullable=True)  
+    # Хеш нормализованного URL у ссылок, созданных в режиме дедупликации (app/urls.py)
+    url_hash = Column(String(32), nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     owner = relationship("User", back_populates="links")
     stats = relationship("LinkStat", back_populates="link", cascade="all, delete-orphan")
 
+    # Индексы под горячие запросы (миграция 5c2e8d41a7b3)
+    __table_args__ = (
+        Index("ix_links_owner_id_project", "owner_id", "project"),
+        Index(
+            "ix_links_expires_at", "expires_at",
+            postgresql_where=expires_at.isnot(None),
+            sqlite_where=expires_at.isnot(None)
+        ),
+        # Одна ссылка без алиаса на URL у владельца (миграция 3d8a6f1e9c24)
+        Index(
+            "ux_links_owner_id_url_hash", "owner_id", "url_hash", unique=True,
+            postgresql_where=url_hash.isnot(None),
+            sqlite_where=url_hash.isnot(None)
+        ),
+        # Удаленные ссылки, ожидающие очистки (миграция 8c4d2a6f1b93)
+        Index(
+            "ix_links_inactive", "id",
+            postgresql_where=is_active.is_(False),
+            sqlite_where=is_active.is_(False)
+        ),
+    )
+
 class LinkStat(Base):
     """Модель для хранения статистики переходов по ссылкам"""
     __tablename__ = "link_stats"
@@ -43,4 +69,28 @@ class LinkStat(Base):
     referer = Column(String, nullable=True)  
     country = Column(String, nullable=True) 
 
-    link = relationship("Link", back_populates="stats")
\ No newline at end of file
+    link = relationship("Link", back_populates="stats")
+
+    __table_args__ = (
+        Index("ix_link_stats_link_id_accessed_at", "link_id", "accessed_at"),
+        Index("ix_link_stats_accessed_at", "accessed_at"),
+    )
+
+class Project(Base):
+    """Проект пользователя со счетчиками ссылок и переходов
+
+    Счетчики обновляются вместе с ссылками (app.queries.adjust_project_counts)
+    и учитывают только активные ссылки. При шардировании таблица лежит на
+    каждом шарде рядом со ссылками проекта, поэтому внешнего ключа на users нет.
+    """
+    __tablename__ = "projects"
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, nullable=False)
+    name = Column(String, nullable=False)
+    link_count = Column(Integer, nullable=False, default=0)
+    click_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ux_projects_owner_id_name", "owner_id", "name", unique=True),
+    )
@@ -0,0 +1,159 @@
+"""Сэмплирующий профилировщик по запросу
+
+Отдельный поток каждые PROFILER_INTERVAL секунд снимает стеки всех потоков
+процесса (цикл событий и пул потоков) через sys._current_frames() и
+накапливает их в формате collapsed stacks (`кадр;кадр;кадр количество`),
+который понимают flamegraph.pl, speedscope и inferno.
+
+Включается только при заданном PROFILER_TOKEN:
+- для одного запроса - заголовок `X-Profile-Token: <токен>`; стеки пишутся в
+  файл в PROFILER_OUTPUT_DIR, путь возвращается в заголовке X-Profile-File;
+- на N секунд в текущем воркере - `POST /debug/profile?seconds=N` с тем же
+  заголовком; стеки возвращаются в ответе.
+
+Пока профилировщик не запущен, поток не создается, а middleware только
+проверяет наличие заголовка.
+"""
+import hmac
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN")
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.005"))
+PROFILER_OUTPUT_DIR = os.getenv("PROFILER_OUTPUT_DIR", os.path.join(tempfile.gettempdir(), "profiles"))
+# Максимальная длительность окна профилирования в секундах
+PROFILER_MAX_WINDOW = float(os.getenv("PROFILER_MAX_WINDOW", "60"))
+# Эндпоинт профилирования окна сам запускает сэмплер
+WINDOW_PATH = "/debug/profile"
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_ROOT_DIR = os.path.dirname(_APP_DIR)
+
+# Одновременно в воркере работает не больше одного сэмплера
+_active_lock = threading.Lock()
+
+
+def authorized(token: Optional[str]) -> bool:
+    """Разрешено ли профилирование с этим токеном"""
+    if not PROFILER_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), PROFILER_TOKEN.encode("utf-8"))
+
+
+def _frame_name(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_ROOT_DIR):
+        filename = os.path.relpath(filename, _ROOT_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """Сборщик стеков всех потоков процесса
+
+    Args:
+        interval (float): Интервал между снимками в секундах
+        app_only (bool): Учитывать только стеки, проходящие через код app/
+            (простаивающие потоки и цикл событий в ожидании отбрасываются)
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL, app_only: bool = True):
+        self.interval = interval
+        self.app_only = app_only
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> bool:
+        """Запустить сбор; False, если в воркере уже работает другой сэмплер"""
+        if not _active_lock.acquire(blocking=False):
+            return False
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> Counter:
+        """Остановить сбор и вернуть накопленные стеки"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            _active_lock.release()
+        return self.samples
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(skip=own)
+
+    def sample(self, skip: int = None):
+        """Снять стеки всех потоков, кроме skip"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == skip:
+                continue
+            stack = []
+            in_app = False
+            while frame is not None:
+                code = frame.f_code
+                in_app = in_app or code.co_filename.startswith(_APP_DIR)
+                stack.append(_frame_name(code))
+                frame = frame.f_back
+            if self.app_only and not in_app:
+                continue
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Стеки в формате collapsed stacks"""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+
+class ProfilerMiddleware:
+    """ASGI-middleware профилирования отдельных запросов по заголовку X-Profile-Token"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILER_TOKEN or scope["path"] == WINDOW_PATH:
+            await self.app(scope, receive, send)
+            return
+        token = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile-token":
+                token = value.decode("latin-1")
+                break
+        if not authorized(token):
+            # Неверный токен не раскрывает наличие профилировщика: запрос выполняется как обычно
+            await self.app(scope, receive, send)
+            return
+
+        sampler = Sampler()
+        started = sampler.start()
+        path = None
+        if started:
+            os.makedirs(PROFILER_OUTPUT_DIR, exist_ok=True)
+            slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", scope["path"].strip("/"))[:100] or "root"
+            path = os.path.join(PROFILER_OUTPUT_DIR, f"{int(time.time() * 1000)}-{scope['method']}-{slug}.collapsed")
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                value = path.encode("latin-1") if path else b"busy"
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-file", value)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            if started:
+                sampler.stop()
+                with open(path, "w") as output:
+                    output.write(sampler.collapsed())
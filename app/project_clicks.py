@@ -0,0 +1,84 @@
+"""Отложенный учет переходов в счетчиках проектов
+
+Строка проекта общая для всех его ссылок: UPDATE на каждый переход
+выстраивал бы редиректы популярного проекта в очередь за блокировкой одной
+строки. Поэтому редирект после фиксации перехода только добавляет его в
+буфер процесса, а фоновая задача (tasks.scheduled_project_clicks_flush) раз
+в PROJECT_CLICKS_FLUSH_INTERVAL секунд записывает накопленное одним
+UPDATE на шард.
+
+Счетчик проекта отстает от переходов не больше чем на интервал сброса; при
+аварийном завершении процесса переходы последнего интервала в нем теряются
+(access_count ссылок и статистика переходов при этом точны).
+"""
+import threading
+from collections import Counter
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .queries import apply_project_clicks
+
+# Короткий код -> переходы, еще не записанные в счетчик проекта
+_pending = Counter()
+_lock = threading.Lock()
+
+
+def add_project_click(short_code: str, count: int = 1):
+    """Учесть переход в счетчике проекта ссылки при следующем сбросе
+
+    Args:
+        short_code (str): Короткий код ссылки
+        count (int): Количество переходов
+    Returns:
+        None
+    """
+    with _lock:
+        _pending[short_code] += count
+
+
+def flushed_clicks(short_code: str, access_count: int) -> int:
+    """Переходы удаляемой ссылки, уже записанные в счетчик ее проекта
+
+    Ожидающие в буфере переходы изымаются: удаление вычитает из счетчика
+    проекта только уже записанные переходы, и сброс их больше не добавит.
+    Переходы из буферов других процессов добавит их сброс (он не пропускает
+    удаленные ссылки), а access_count их уже включает.
+
+    Args:
+        short_code (str): Короткий код ссылки
+        access_count (int): Счетчик переходов ссылки
+    Returns:
+        int: Сколько переходов вычесть из счетчика проекта
+    """
+    with _lock:
+        pending = _pending.pop(short_code, 0)
+    return (access_count or 0) - pending
+
+
+def flush_project_clicks(db: Session) -> int:
+    """Записать накопленные переходы в счетчики проектов
+
+    Если запись не удалась, переходы возвращаются в буфер до следующего сброса.
+
+    Args:
+        db (Session): Сессия базы данных
+    Returns:
+        int: Количество записанных переходов
+    Raises:
+        SQLAlchemyError: Если не удалось записать счетчики
+    """
+    with _lock:
+        clicks = dict(_pending)
+        _pending.clear()
+    if not clicks:
+        return 0
+    try:
+        apply_project_clicks(db, clicks)
+        db.commit()
+    except SQLAlchemyError:
+        db.rollback()
+        with _lock:
+            _pending.update(clicks)
+        raise
+    return sum(clicks.values())
@@ -0,0 +1,518 @@
+"""Быстрый доступ к данным для горячих путей
+
+Запросы построены один раз на уровне модуля в виде Core `select` с
+параметрами, поэтому SQLAlchemy берет их скомпилированную форму из кэша.
+Они выполняются прямо на соединении сессии (в ее транзакции), без
+ORM-сущностей, identity map и инструментирования атрибутов, и возвращают
+легкие записи со `__slots__`.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import String, and_, bindparam, case, delete, exists, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import Link, LinkStat, Project
+
+links = Link.__table__
+link_stats = LinkStat.__table__
+projects = Project.__table__
+
+
+class RedirectTarget:
+    """Данные ссылки, нужные для перенаправления"""
+    __slots__ = ("id", "original_url", "expires_at", "is_active", "permanent")
+
+    def __init__(self, id, original_url, expires_at, is_active, permanent):
+        self.id = id
+        self.original_url = original_url
+        self.expires_at = expires_at
+        self.is_active = is_active
+        self.permanent = permanent
+
+
+class LinkStatsRecord:
+    """Статистика ссылки"""
+    __slots__ = ("original_url", "created_at", "access_count", "last_accessed")
+
+    def __init__(self, original_url, created_at, access_count, last_accessed):
+        self.original_url = original_url
+        self.created_at = created_at
+        self.access_count = access_count
+        self.last_accessed = last_accessed
+
+    def as_dict(self) -> dict:
+        """Словарь с датами в ISO-формате (для ответа и кэша)"""
+        return {
+            "original_url": self.original_url,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "access_count": self.access_count,
+            "last_accessed": self.last_accessed.isoformat() if self.last_accessed else None
+        }
+
+
+_redirect_stmt = select(
+    links.c.id, links.c.original_url, links.c.expires_at, links.c.is_active, links.c.permanent
+).where(links.c.short_code == bindparam("short_code"))
+
+_code_exists_stmt = select(links.c.id).where(links.c.short_code == bindparam("short_code")).limit(1)
+
+_alias_exists_stmt = select(links.c.id).where(links.c.custom_alias == bindparam("alias")).limit(1)
+
+# Какие из кодов уже заняты как короткий код или алиас (индексы short_code и custom_alias)
+_taken_codes_stmt = select(links.c.short_code, links.c.custom_alias).where(or_(
+    links.c.short_code.in_(bindparam("codes", expanding=True)),
+    links.c.custom_alias.in_(bindparam("codes", expanding=True)),
+))
+
+# Удаленные ссылки (is_active = false) до очистки считаются отсутствующими
+_stats_stmt = select(
+    links.c.original_url, links.c.created_at, links.c.access_count, links.c.last_accessed
+).where(links.c.short_code == bindparam("short_code"), links.c.is_active.isnot(False))
+
+_stats_many_stmt = select(
+    links.c.short_code, links.c.original_url, links.c.created_at, links.c.access_count, links.c.last_accessed
+).where(links.c.short_code.in_(bindparam("codes", expanding=True)), links.c.is_active.isnot(False))
+
+# Порция активных ссылок проекта после курсора (индекс ix_links_owner_id_project)
+_project_chunk_stmt = select(links.c.id, links.c.short_code, links.c.access_count).where(
+    links.c.owner_id == bindparam("owner_id"),
+    links.c.project == bindparam("project"),
+    links.c.is_active.isnot(False),
+    links.c.id > bindparam("after_id"),
+).order_by(links.c.id)
+
+_projects_stmt = select(projects.c.name).where(
+    projects.c.owner_id == bindparam("owner_id"), projects.c.link_count > 0
+)
+
+# Сводка по ссылкам владельца (индекс ix_links_owner_id_project): ссылки
+# проектов и их переходы берутся из счетчиков projects, здесь считаются
+# только ссылки без проекта и скоро истекающие ссылки
+_summary_stmt = select(
+    func.coalesce(func.sum(case((links.c.project.is_(None), 1), else_=0)), 0).label("unassigned_links"),
+    func.coalesce(func.sum(case(
+        (links.c.project.is_(None), func.coalesce(links.c.access_count, 0)),
+        else_=0,
+    )), 0).label("unassigned_clicks"),
+    func.coalesce(func.sum(case(
+        (and_(links.c.expires_at > bindparam("now"), links.c.expires_at <= bindparam("expiring_before")), 1),
+        else_=0,
+    )), 0).label("expiring_soon"),
+).where(links.c.owner_id == bindparam("owner_id"), links.c.is_active.isnot(False))
+
+# Переходы по активным ссылкам владельца за неделю и сутки одним проходом:
+# от ссылок владельца по индексу ix_link_stats_link_id_accessed_at, поэтому
+# объем чтения зависит от переходов владельца, а не от всего трафика
+_recent_clicks_stmt = select(
+    func.coalesce(func.sum(case((link_stats.c.accessed_at >= bindparam("day_ago"), 1), else_=0)), 0).label("clicks_24h"),
+    func.count(link_stats.c.id).label("clicks_7d"),
+).select_from(links.join(link_stats, link_stats.c.link_id == links.c.id)).where(
+    links.c.owner_id == bindparam("owner_id"),
+    links.c.is_active.isnot(False),
+    link_stats.c.accessed_at >= bindparam("week_ago"),
+)
+
+_project_counters_stmt = select(projects.c.name, projects.c.link_count, projects.c.click_count).where(
+    projects.c.owner_id == bindparam("owner_id"), projects.c.link_count > 0
+)
+
+_record_click_stmt = update(links).where(links.c.id == bindparam("link_id")).values(
+    access_count=func.coalesce(links.c.access_count, 0) + 1,
+    last_accessed=bindparam("accessed_at"),
+)
+
+_insert_stat_stmt = insert(link_stats)
+
+# Те же изменения по короткому коду, без предварительного поиска id ссылки
+# (имена параметров не должны совпадать с именами столбцов в insert/update)
+_record_click_by_code_stmt = update(links).where(links.c.short_code == bindparam("code")).values(
+    access_count=func.coalesce(links.c.access_count, 0) + 1,
+    last_accessed=bindparam("accessed_at"),
+)
+
+_insert_stat_by_code_stmt = insert(link_stats).from_select(
+    ["link_id", "ip_address", "user_agent", "referer"],
+    select(
+        links.c.id,
+        bindparam("client_ip", type_=String),
+        bindparam("client_agent", type_=String),
+        bindparam("client_referer", type_=String),
+    ).where(links.c.short_code == bindparam("code"))
+)
+
+
+# Накопленные переходы ссылки в счетчике ее проекта (строка проекта на шарде
+# ссылки). Удаленные ссылки не пропускаются: удаление вычитает их access_count,
+# в который входят и еще не записанные переходы
+_project_clicks_stmt = update(projects).where(
+    projects.c.owner_id == select(links.c.owner_id).where(links.c.short_code == bindparam("code")).scalar_subquery(),
+    projects.c.name == select(links.c.project).where(links.c.short_code == bindparam("code")).scalar_subquery(),
+).values(click_count=projects.c.click_count + bindparam("clicks"))
+
+
+def _connection(db: Session, short_code: str):
+    """Соединение сессии на шарде ссылки (или на единственной БД)"""
+    router = db.info.get("shard_router")
+    if router is not None:
+        return db.connection(bind_arguments={"shard_id": router.shard_for_code(short_code)})
+    return db.connection()
+
+
+def _all_connections(db: Session):
+    router = db.info.get("shard_router")
+    if router is not None:
+        return [db.connection(bind_arguments={"shard_id": name}) for name in router.shards]
+    return [db.connection()]
+
+
+def _connections_for_codes(db: Session, short_codes: Iterable[str]):
+    """Разбить коды по шардам: пары (соединение, коды шарда)"""
+    router = db.info.get("shard_router")
+    if router is None:
+        codes = list(short_codes)
+        return [(db.connection(), codes)] if codes else []
+    groups = {}
+    for short_code in short_codes:
+        groups.setdefault(router.shard_for_code(short_code), []).append(short_code)
+    return [(db.connection(bind_arguments={"shard_id": shard}), codes) for shard, codes in groups.items()]
+
+
+def lookup_redirect(db: Session, short_code: str) -> Optional[RedirectTarget]:
+    """Найти ссылку для перенаправления
+
+    Args:
+        db (Session): Сессия базы данных
+        short_code (str): Короткий код ссылки
+    Returns:
+        Optional[RedirectTarget]: Данные ссылки или None, если ссылка не найдена
+    """
+    row = _connection(db, short_code).execute(_redirect_stmt, {"short_code": short_code}).first()
+    return RedirectTarget(*row) if row else None
+
+
+def short_code_exists(db: Session, short_code: str) -> bool:
+    """Занят ли короткий код"""
+    return _connection(db, short_code).execute(_code_exists_stmt, {"short_code": short_code}).first() is not None
+
+
+def alias_exists(db: Session, alias: str) -> bool:
+    """Занят ли пользовательский алиас
+
+    Алиас можно сменить у существующей ссылки, поэтому при шардировании
+    проверяются все шарды.
+    """
+    return any(
+        connection.execute(_alias_exists_stmt, {"alias": alias}).first() is not None
+        for connection in _all_connections(db)
+    )
+
+
+def read_stats(db: Session, short_code: str) -> Optional[LinkStatsRecord]:
+    """Прочитать статистику ссылки
+
+    Args:
+        db (Session): Сессия базы данных
+        short_code (str): Короткий код ссылки
+    Returns:
+        Optional[LinkStatsRecord]: Статистика или None, если ссылка не найдена
+    """
+    row = _connection(db, short_code).execute(_stats_stmt, {"short_code": short_code}).first()
+    return LinkStatsRecord(*row) if row else None
+
+
+def read_stats_many(db: Session, short_codes: Iterable[str]) -> Dict[str, LinkStatsRecord]:
+    """Прочитать статистику нескольких ссылок одним запросом IN (по одному на шард)
+
+    Args:
+        db (Session): Сессия базы данных
+        short_codes (Iterable[str]): Короткие коды
+    Returns:
+        Dict[str, LinkStatsRecord]: Код -> статистика (ненайденные коды отсутствуют)
+    """
+    result = {}
+    for connection, codes in _connections_for_codes(db, short_codes):
+        for short_code, *fields in connection.execute(_stats_many_stmt, {"codes": codes}):
+            result[short_code] = LinkStatsRecord(*fields)
+    return result
+
+
+def record_click(db: Session, short_code: str, link_id: int = None, ip_address: str = None,
+                 user_agent: str = None, referer: str = None):
+    """Учесть переход по ссылке: счетчик, время последнего доступа и запись статистики
+
+    Без link_id ссылка находится по короткому коду внутри тех же двух
+    запросов, поэтому при попадании в кэш ее не нужно искать заранее; если
+    ссылки уже нет, ничего не изменится. Изменения выполняются в транзакции
+    сессии; фиксирует их вызывающий код. Счетчик проекта обновляется
+    отложенно (см. app.project_clicks).
+    """
+    connection = _connection(db, short_code)
+    now = datetime.utcnow()
+    if link_id is None:
+        connection.execute(_record_click_by_code_stmt, {"code": short_code, "accessed_at": now})
+        connection.execute(_insert_stat_by_code_stmt, {
+            "code": short_code,
+            "client_ip": ip_address,
+            "client_agent": user_agent,
+            "client_referer": referer,
+        })
+        return
+    connection.execute(_record_click_stmt, {"link_id": link_id, "accessed_at": now})
+    connection.execute(_insert_stat_stmt, {
+        "link_id": link_id,
+        "ip_address": ip_address,
+        "user_agent": user_agent,
+        "referer": referer,
+    })
+
+
+def taken_codes(db: Session, codes: Iterable[str]) -> Set[str]:
+    """Коды из списка, уже занятые как короткий код или алиас
+
+    Один запрос на шард вместо проверки каждого кода по отдельности.
+
+    Args:
+        db (Session): Сессия базы данных
+        codes (Iterable[str]): Проверяемые коды
+    Returns:
+        Set[str]: Занятые коды
+    """
+    codes = set(codes)
+    if not codes:
+        return set()
+    taken = set()
+    for connection in _all_connections(db):
+        for row in connection.execute(_taken_codes_stmt, {"codes": list(codes)}):
+            taken.update(value for value in row if value in codes)
+    return taken
+
+
+def insert_links(db: Session, rows: List[dict]):
+    """Вставить ссылки одним executemany на шард
+
+    Изменения выполняются в транзакции сессии; фиксирует их вызывающий код.
+
+    Args:
+        db (Session): Сессия базы данных
+        rows (List[dict]): Значения столбцов links (обязателен short_code)
+    """
+    rows_by_code = {row["short_code"]: row for row in rows}
+    for connection, codes in _connections_for_codes(db, rows_by_code):
+        shard_rows = [rows_by_code[code] for code in codes]
+        connection.execute(links.insert(), shard_rows)
+        apply_project_deltas(connection, _project_deltas(
+            (row["owner_id"], row["project"], 1, row.get("access_count") or 0)
+            for row in shard_rows if row.get("is_active") is not False
+        ))
+
+
+def _project_deltas(changes: Iterable[Tuple[Optional[int], Optional[str], int, int]]) -> Dict[Tuple[int, str], List[int]]:
+    deltas = {}
+    for owner_id, project, link_delta, click_delta in changes:
+        if owner_id is None or project is None:
+            continue
+        delta = deltas.setdefault((owner_id, project), [0, 0])
+        delta[0] += link_delta
+        delta[1] += click_delta
+    return deltas
+
+
+def apply_project_deltas(connection, deltas: Dict[Tuple[int, str], List[int]]):
+    """Изменить счетчики проектов на соединении одним upsert (executemany)
+
+    Args:
+        connection: Соединение с БД (шардом) ссылок
+        deltas (Dict[Tuple[int, str], List[int]]): (владелец, проект) -> [изменение
+            количества ссылок, изменение количества переходов]
+    """
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    dialect = postgresql if connection.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(projects)
+    statement = statement.on_conflict_do_update(
+        index_elements=[projects.c.owner_id, projects.c.name],
+        set_={
+            "link_count": projects.c.link_count + statement.excluded.link_count,
+            "click_count": projects.c.click_count + statement.excluded.click_count,
+        },
+    )
+    connection.execute(statement, [
+        {"owner_id": owner_id, "name": name, "link_count": link_delta, "click_count": click_delta}
+        for (owner_id, name), (link_delta, click_delta) in deltas.items()
+    ])
+
+
+def adjust_project_counts(db: Session, changes: Iterable[Tuple[str, Optional[int], Optional[str], int, int]]):
+    """Изменить счетчики проектов при создании и удалении ссылок
+
+    Изменения группируются по шарду ссылки и проекту; ссылки без владельца
+    или проекта пропускаются. Выполняется в транзакции сессии; фиксирует
+    изменения вызывающий код.
+
+    Args:
+        db (Session): Сессия базы данных
+        changes: Кортежи (short_code, owner_id, project, изменение количества
+            ссылок, изменение количества переходов)
+    """
+    changes = {change[0]: change[1:] for change in changes if change[1] is not None and change[2] is not None}
+    for connection, codes in _connections_for_codes(db, changes):
+        apply_project_deltas(connection, _project_deltas(changes[code] for code in codes))
+
+
+def apply_project_clicks(db: Session, clicks: Dict[str, int]):
+    """Добавить накопленные переходы в счетчики проектов
+
+    Один UPDATE (executemany) на шард; ссылки без проекта ничего не меняют. Выполняется в транзакции сессии; фиксирует
+    изменения вызывающий код.
+
+    Args:
+        db (Session): Сессия базы данных
+        clicks (Dict[str, int]): Короткий код -> количество переходов
+    """
+    for connection, codes in _connections_for_codes(db, clicks):
+        connection.execute(_project_clicks_stmt, [{"code": code, "clicks": clicks[code]} for code in codes])
+
+
+def read_projects(db: Session, owner_id: int) -> List[str]:
+    """Названия проектов владельца, в которых есть активные ссылки
+
+    Один запрос по индексу ux_projects_owner_id_name (на каждый шард).
+
+    Returns:
+        List[str]: Отсортированные названия проектов
+    """
+    names = set()
+    for connection in _all_connections(db):
+        names.update(connection.execute(_projects_stmt, {"owner_id": owner_id}).scalars())
+    return sorted(names)
+
+
+def update_project_chunk(db: Session, owner_id: int, project: str, values: dict,
+                         cursor: dict, chunk_size: int) -> list:
+    """Обновить следующую порцию активных ссылок проекта
+
+    Порция выбирается по индексу (owner_id, project) с курсором по id и
+    обновляется одним UPDATE ... WHERE id IN (...). Изменения выполняются в
+    транзакции сессии; фиксирует их вызывающий код.
+
+    Args:
+        db (Session): Сессия базы данных
+        owner_id (int): Владелец ссылок
+        project (str): Название проекта
+        values (dict): Новые значения столбцов links
+        cursor (dict): Последний обработанный id по номеру шарда
+            (изменяется на месте; None - шард обработан)
+        chunk_size (int): Ссылок в порции
+    Returns:
+        list: Строки обновленных ссылок (short_code и access_count; пустой
+            список, если ссылок не осталось)
+    """
+    for index, connection in enumerate(_all_connections(db)):
+        after_id = cursor.get(index, 0)
+        if after_id is None:
+            continue
+        rows = connection.execute(_project_chunk_stmt.limit(chunk_size), {
+            "owner_id": owner_id, "project": project, "after_id": after_id
+        }).all()
+        if not rows:
+            cursor[index] = None
+            continue
+        ids = [row.id for row in rows]
+        connection.execute(
+            update(links).where(links.c.id.in_(bindparam("ids", expanding=True))).values(**values),
+            {"ids": ids}
+        )
+        cursor[index] = ids[-1]
+        return rows
+    return []
+
+
+# Есть ли удаленные ссылки, ожидающие очистки (частичный индекс ix_links_inactive)
+_has_deleted_stmt = select(links.c.id).where(links.c.is_active.is_(False)).limit(1)
+
+
+def has_deleted_links(db: Session) -> bool:
+    """Есть ли на каком-либо шарде удаленные (is_active = false) ссылки"""
+    return any(connection.execute(_has_deleted_stmt).first() is not None for connection in _all_connections(db))
+
+
+def purge_stats_chunk(db: Session, chunk_size: int) -> int:
+    """Удалить порцию статистики удаленных (is_active = false) ссылок
+
+    Изменения выполняются в транзакции сессии; фиксирует их вызывающий код.
+
+    Returns:
+        int: Количество удаленных записей (на всех шардах)
+    """
+    chunk = select(link_stats.c.id).join(links, links.c.id == link_stats.c.link_id).where(
+        links.c.is_active.is_(False)
+    ).limit(chunk_size)
+    statement = delete(link_stats).where(link_stats.c.id.in_(chunk.scalar_subquery()))
+    return sum(connection.execute(statement).rowcount for connection in _all_connections(db))
+
+
+def purge_links_chunk(db: Session, chunk_size: int) -> int:
+    """Удалить порцию удаленных ссылок, у которых уже не осталось статистики
+
+    Returns:
+        int: Количество удаленных ссылок (на всех шардах)
+    """
+    chunk = select(links.c.id).where(
+        links.c.is_active.is_(False),
+        ~exists().where(link_stats.c.link_id == links.c.id)
+    ).limit(chunk_size)
+    statement = delete(links).where(links.c.id.in_(chunk.scalar_subquery()))
+    return sum(connection.execute(statement).rowcount for connection in _all_connections(db))
+
+
+def read_summary(db: Session, owner_id: int, now: datetime, expiring_before: datetime, top_projects: int) -> dict:
+    """Сводка по активным ссылкам владельца (без переходов за сутки и неделю)
+
+    Итоги складываются из счетчиков таблицы projects и одного агрегирующего
+    запроса по ссылкам без проекта (на каждом шарде).
+
+    Args:
+        db (Session): Сессия базы данных
+        owner_id (int): Владелец ссылок
+        now (datetime): Текущее время (UTC)
+        expiring_before (datetime): Ссылки, истекающие до этого момента, считаются истекающими скоро
+        top_projects (int): Сколько проектов с наибольшим количеством переходов вернуть
+    Returns:
+        dict: total_links, total_clicks, expiring_soon и top_projects
+    """
+    params = {"owner_id": owner_id, "now": now, "expiring_before": expiring_before}
+    totals = {}
+    summary = {"total_links": 0, "total_clicks": 0, "expiring_soon": 0}
+    for connection in _all_connections(db):
+        for name, link_count, click_count in connection.execute(_project_counters_stmt, params):
+            total = totals.setdefault(name, {"name": name, "link_count": 0, "click_count": 0})
+            total["link_count"] += link_count
+            total["click_count"] += click_count
+        row = connection.execute(_summary_stmt, params).one()
+        summary["total_links"] += row.unassigned_links or 0
+        summary["total_clicks"] += row.unassigned_clicks or 0
+        summary["expiring_soon"] += row.expiring_soon or 0
+    summary["total_links"] += sum(project["link_count"] for project in totals.values())
+    summary["total_clicks"] += sum(project["click_count"] for project in totals.values())
+    summary["top_projects"] = sorted(
+        totals.values(), key=lambda project: (-project["click_count"], project["name"])
+    )[:top_projects]
+    return summary
+
+
+def read_recent_clicks(db: Session, owner_id: int, now: datetime) -> dict:
+    """Переходы по активным ссылкам владельца за последние сутки и неделю
+
+    Returns:
+        dict: clicks_24h и clicks_7d
+    """
+    params = {"owner_id": owner_id, "day_ago": now - timedelta(days=1), "week_ago": now - timedelta(days=7)}
+    clicks = {"clicks_24h": 0, "clicks_7d": 0}
+    for connection in _all_connections(db):
+        row = connection.execute(_recent_clicks_stmt, params).one()
+        clicks["clicks_24h"] += row.clicks_24h or 0
+        clicks["clicks_7d"] += row.clicks_7d or 0
+    return clicks
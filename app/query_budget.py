@@ -0,0 +1,145 @@
+"""Учет запросов к БД в рамках HTTP-запроса
+
+События движка SQLAlchemy считают запросы, строки и время БД для текущего
+HTTP-запроса (контекст передается через ContextVar, в том числе в пул
+потоков). Маршрут может объявить бюджет запросов декоратором `query_budget`;
+превышение бюджета и многократное повторение одного и того же запроса
+(признак N+1) выводятся в лог.
+
+В режиме отладки (QUERY_DEBUG_HEADERS=true) счетчики возвращаются в заголовках
+ответа X-DB-Queries, X-DB-Rows и X-DB-Time (миллисекунды).
+"""
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_DEBUG_HEADERS = os.getenv("QUERY_DEBUG_HEADERS", "false").lower() in ("1", "true", "yes")
+# Сколько раз один и тот же запрос может повториться за HTTP-запрос без предупреждения о N+1
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+
+
+class QueryStats:
+    """Счетчики запросов к БД одного HTTP-запроса"""
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def repeated(self, threshold: int = QUERY_REPEAT_THRESHOLD) -> List[str]:
+        """Запросы, выполненные больше threshold раз"""
+        return [statement for statement, count in self.statements.items() if count > threshold]
+
+
+class BudgetViolation:
+    """Превышение бюджета или подозрение на N+1 в одном HTTP-запросе"""
+
+    def __init__(self, route: str, message: str):
+        self.route = route
+        self.message = message
+
+    def __repr__(self):
+        return f"{self.route}: {self.message}"
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Нарушения записываются сюда в строгом режиме (используется плагином pytest)
+strict = False
+violations: List[BudgetViolation] = []
+
+
+def current_stats() -> Optional[QueryStats]:
+    """Счетчики текущего HTTP-запроса или None вне запроса"""
+    return _current.get()
+
+
+def query_budget(max_queries: int):
+    """Объявить бюджет запросов к БД для маршрута
+
+    Декоратор ставится под декоратором маршрута и возвращает ту же функцию.
+
+    Args:
+        max_queries (int): Максимальное количество запросов за HTTP-запрос
+    """
+    def decorator(endpoint):
+        endpoint.__query_budget__ = max_queries
+        return endpoint
+    return decorator
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("budget_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get("budget_started"):
+        return
+    stats.duration += time.perf_counter() - conn.info["budget_started"].pop()
+    stats.queries += 1
+    # Количество строк по данным драйвера (для SELECT в SQLite неизвестно)
+    if cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    stats.statements[statement] += 1
+
+
+def _report(route: str, message: str):
+    print(f"Запросы к БД: {route}: {message}")
+    if strict:
+        violations.append(BudgetViolation(route, message))
+
+
+def check_budget(route: str, budget: Optional[int], stats: QueryStats):
+    """Проверить бюджет маршрута и повторяющиеся запросы
+
+    Args:
+        route (str): Маршрут (для сообщения)
+        budget (Optional[int]): Бюджет маршрута или None, если он не объявлен
+        stats (QueryStats): Счетчики HTTP-запроса
+    """
+    if budget is not None and stats.queries > budget:
+        _report(route, f"{stats.queries} запросов при бюджете {budget}")
+    for statement in stats.repeated():
+        _report(route, f"возможен N+1, запрос выполнен {stats.statements[statement]} раз: {statement}")
+
+
+class QueryBudgetMiddleware:
+    """ASGI-middleware, считающее запросы к БД каждого HTTP-запроса"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and QUERY_DEBUG_HEADERS:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-queries", str(stats.queries).encode("latin-1")),
+                    (b"x-db-rows", str(stats.rows).encode("latin-1")),
+                    (b"x-db-time", f"{stats.duration * 1000:.2f}".encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
+            endpoint = scope.get("endpoint")
+            route = f"{scope['method']} {scope['path']}"
+            check_budget(route, getattr(endpoint, "__query_budget__", None), stats)
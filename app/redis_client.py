@@ -1,14 +1,212 @@
 import redis
 import json
 import os
-from typing import Any, Optional
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from .circuit_breaker import CircuitBreaker
+from .hash_ring import HashRing
+from .local_cache import LocalCache
+from .metrics import record_cache_lookup
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-redis_client = redis.from_url(REDIS_URL)
+# Список узлов через запятую; ключи распределяются консистентным хешированием
+REDIS_NODES = [url.strip() for url in os.getenv("REDIS_NODES", "").split(",") if url.strip()]
+# Режим Redis Cluster: шардирование выполняет сам кластер
+REDIS_CLUSTER = os.getenv("REDIS_CLUSTER", "false").lower() in ("1", "true", "yes")
+REDIS_VNODES = int(os.getenv("REDIS_VNODES", "160"))
+# Таймауты Redis в секундах: медленный Redis не должен тормозить редиректы
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.2"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.2"))
+# Сколько ключей, не удаленных из-за недоступности узла, помнить до его восстановления
+REDIS_PENDING_INVALIDATIONS = int(os.getenv("REDIS_PENDING_INVALIDATIONS", "10000"))
+
+def _connect(url: str):
+    options = {
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+    }
+    if REDIS_CLUSTER:
+        from redis.cluster import RedisCluster
+        return RedisCluster.from_url(url, **options)
+    return redis.from_url(url, **options)
+
+def _make_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_threshold=int(os.getenv("REDIS_BREAKER_FAILURES", "5")),
+        recovery_timeout=float(os.getenv("REDIS_BREAKER_RECOVERY", "30")),
+    )
+
+class RedisNode:
+    """Узел кэша: клиент Redis и его автоматический выключатель
+
+    Инвалидации (удаление ключей и увеличение поколений), не дошедшие до узла,
+    пока он был недоступен, запоминаются и выполняются перед первым вызовом
+    после восстановления: иначе узел продолжил бы отдавать устаревшие данные
+    до истечения их TTL.
+    """
+    __slots__ = ("name", "client", "breaker", "pending_deletes", "pending_bumps", "_lock")
+
+    def __init__(self, name: str, client, breaker: CircuitBreaker):
+        self.name = name
+        self.client = client
+        self.breaker = breaker
+        self.pending_deletes = set()
+        self.pending_bumps = set()
+        self._lock = threading.Lock()
+
+    def defer(self, keys: Iterable[str] = (), bumps: Iterable[str] = ()):
+        """Запомнить инвалидацию для повтора после восстановления узла"""
+        with self._lock:
+            self.pending_bumps.update(bumps)
+            for key in keys:
+                if len(self.pending_deletes) >= REDIS_PENDING_INVALIDATIONS:
+                    # Остальные ключи устареют по TTL
+                    print(f"Redis {self.name}: очередь инвалидаций переполнена")
+                    break
+                self.pending_deletes.add(key)
+
+    def take_pending(self) -> tuple:
+        with self._lock:
+            pending = (self.pending_deletes, self.pending_bumps)
+            self.pending_deletes, self.pending_bumps = set(), set()
+        return pending
+
+# Первый узел (или единственный сервер / кластер)
+_urls = [REDIS_URL] if REDIS_CLUSTER or not REDIS_NODES else REDIS_NODES
+redis_client = _connect(_urls[0])
+# Автоматический выключатель вокруг первого узла Redis
+redis_breaker = _make_breaker()
+
+nodes: Dict[str, RedisNode] = {_urls[0]: RedisNode(_urls[0], redis_client, redis_breaker)}
+for _url in _urls[1:]:
+    nodes[_url] = RedisNode(_url, _connect(_url), _make_breaker())
+hash_ring = HashRing(nodes, vnodes=REDIS_VNODES)
+
+# Кэш внутри процесса, используется пока Redis недоступен
+local_cache = LocalCache(
+    maxsize=int(os.getenv("LOCAL_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("LOCAL_CACHE_TTL", "60")),
+)
 
 # Стандартное время жизни кеша в секундах
 DEFAULT_TTL = 3600
 
+# Счетчик поколения результатов поиска (увеличивается при изменении ссылок)
+SEARCH_GENERATION_KEY = "search:generation"
+
+# Маркер недоступности Redis (в отличие от None - "ключа нет")
+UNAVAILABLE = object()
+
+def configure_nodes(clients: Dict[str, Any], vnodes: int = REDIS_VNODES):
+    """Заменить набор узлов кэша
+
+    Args:
+        clients (Dict[str, Any]): Имя узла -> клиент Redis
+        vnodes (int): Количество виртуальных узлов на кольце
+    Returns:
+        None
+    """
+    global hash_ring
+    nodes.clear()
+    for name, client in clients.items():
+        nodes[name] = RedisNode(name, client, _make_breaker())
+    hash_ring = HashRing(nodes, vnodes=vnodes)
+
+def add_node(name: str, client):
+    """Добавить узел кэша; на него переезжает только часть ключей"""
+    nodes[name] = RedisNode(name, client, _make_breaker())
+    hash_ring.add_node(name)
+
+def node_for(key: str) -> RedisNode:
+    """Узел, которому принадлежит ключ"""
+    return nodes[hash_ring.get_node(key)]
+
+def _replay_pending(node: RedisNode):
+    keys, bumps = node.take_pending()
+    if not keys and not bumps:
+        return
+    commands = [("delete", tuple(keys))] if keys else []
+    commands += [("incr", (key,)) for key in bumps]
+    try:
+        _run_pipeline(node.client, commands)
+    except redis.RedisError:
+        node.defer(keys, bumps)
+        raise
+    print(f"Redis {node.name}: выполнены отложенные инвалидации ({len(keys)} ключей)")
+
+def _guarded(node: RedisNode, label: str, operation) -> Any:
+    if not node.breaker.allow_request():
+        return UNAVAILABLE
+    try:
+        # Первый вызов после восстановления сначала удаляет устаревшие ключи
+        if node.pending_deletes or node.pending_bumps:
+            _replay_pending(node)
+        result = operation(node.client)
+    except redis.RedisError as e:
+        node.breaker.record_failure()
+        print(f"Redis {node.name} недоступен ({label}): {e}")
+        return UNAVAILABLE
+    node.breaker.record_success()
+    return result
+
+def call_node(node: RedisNode, method: str, *args) -> Any:
+    """Вызвать метод Redis на узле через его автоматический выключатель
+
+    Args:
+        node (RedisNode): Узел кэша
+        method (str): Имя метода клиента Redis
+        *args: Аргументы вызова
+    Returns:
+        Any: Результат вызова или UNAVAILABLE, если узел недоступен
+    """
+    return _guarded(node, method, lambda client: getattr(client, method)(*args))
+
+def pipeline_node(node: RedisNode, commands: List[tuple]) -> Any:
+    """Выполнить команды на узле одним конвейером (один сетевой обмен)
+
+    Args:
+        node (RedisNode): Узел кэша
+        commands (List[tuple]): Пары (имя метода, аргументы)
+    Returns:
+        Any: Список результатов или UNAVAILABLE, если узел недоступен
+    """
+    return _guarded(node, "pipeline", lambda client: _run_pipeline(client, commands))
+
+def call_redis(method: str, key: str, *args) -> Any:
+    """Вызвать метод Redis на узле, которому принадлежит ключ
+
+    Args:
+        method (str): Имя метода клиента Redis
+        key (str): Ключ (первый аргумент команды)
+        *args: Остальные аргументы вызова
+    Returns:
+        Any: Результат вызова или UNAVAILABLE, если Redis недоступен
+    """
+    return call_node(node_for(key), method, key, *args)
+
+def _run_pipeline(client, commands: List[tuple]) -> list:
+    pipe = client.pipeline(transaction=False)
+    for method, args in commands:
+        getattr(pipe, method)(*args)
+    return pipe.execute()
+
+def _encode(data: Any) -> Any:
+    if isinstance(data, dict) or isinstance(data, list):
+        # Преобразуем словарь или список в JSON строку с обработкой datetime
+        return json.dumps(data, default=lambda obj: obj.isoformat() if hasattr(obj, 'isoformat') else str(obj))
+    return data
+
+def _local_value(data: Any, encoded: Any) -> Any:
+    # В кэше процесса храним то же, что вернет Redis после декодирования
+    return json.loads(encoded) if encoded is not data else data
+
+def _decode(data: bytes) -> Any:
+    try:
+        return json.loads(data)
+    except json.JSONDecodeError:
+        return data.decode('utf-8')
+
 def set_cache(key: str, data: Any, ttl: int = DEFAULT_TTL):
     """Хранить данные в кэше
 
@@ -20,42 +218,144 @@ def set_cache(key: str, data: Any, ttl: int = DEFAULT_TTL):
     Returns:
         None
     """
-    if isinstance(data, dict) or isinstance(data, list):
-        # Преобразуем словарь или список в JSON строку с обработкой datetime
-        try:
-            json_str = json.dumps(data, default=lambda obj: obj.isoformat() if hasattr(obj, 'isoformat') else str(obj))
-            redis_client.setex(key, ttl, json_str)
-        except Exception as e:
-            print(f"Ошибка кэширования данных: {e}")
-    else:
-        redis_client.setex(key, ttl, data)
+    try:
+        value = _encode(data)
+    except Exception as e:
+        print(f"Ошибка кэширования данных: {e}")
+        return
+    local_cache.set(key, _local_value(data, value), ttl)
+    call_redis("setex", key, ttl, value)
 
 def get_cache(key: str) -> Optional[Any]:
     """Получить данные из кэша
 
+    Если Redis недоступен, данные берутся из кэша процесса.
+
     Args:
         key (str): Ключ для получения данных
     Returns:
         Optional[Any]: Данные из кэша или None, если данные не найдены
     """
-    data = redis_client.get(key)
+    data = call_redis("get", key)
+    if data is UNAVAILABLE:
+        value = local_cache.get(key)
+        record_cache_lookup(key, value is not None)
+        return value
+    record_cache_lookup(key, bool(data))
     if not data:
         return None
-    
-    try:
-        return json.loads(data)
-    except json.JSONDecodeError:
-        return data.decode('utf-8')
+
+    value = _decode(data)
+    local_cache.set(key, value)
+    return value
+
+def set_raw(key: str, data: bytes, ttl: int = DEFAULT_TTL):
+    """Хранить готовые байты (например, сериализованный ответ) без перекодирования
+
+    Args:
+        key (str): Ключ для хранения данных
+        data (bytes): Данные для хранения
+        ttl (int, optional): Время жизни данных в секундах. По умолчанию DEFAULT_TTL.
+    Returns:
+        None
+    """
+    local_cache.set(key, data, ttl)
+    call_redis("setex", key, ttl, data)
+
+def get_raw(key: str) -> Optional[bytes]:
+    """Получить байты, сохраненные через set_raw, без декодирования
+
+    Args:
+        key (str): Ключ для получения данных
+    Returns:
+        Optional[bytes]: Данные из кэша или None, если данные не найдены
+    """
+    data = call_redis("get", key)
+    if data is UNAVAILABLE:
+        value = local_cache.get(key)
+        record_cache_lookup(key, value is not None)
+        return value
+    record_cache_lookup(key, bool(data))
+    if not data:
+        return None
+    local_cache.set(key, data)
+    return data
+
+def get_many(keys: Iterable[str]) -> Dict[str, Any]:
+    """Получить несколько ключей: один MGET на каждый узел
+
+    Args:
+        keys (Iterable[str]): Ключи для получения
+    Returns:
+        Dict[str, Any]: Ключ -> данные (отсутствующие ключи не попадают в результат)
+    """
+    results = {}
+    for name, node_keys in hash_ring.group(keys).items():
+        node = nodes[name]
+        method = "mget_nonatomic" if REDIS_CLUSTER else "mget"
+        values = call_node(node, method, node_keys)
+        if values is UNAVAILABLE:
+            for key in node_keys:
+                value = local_cache.get(key)
+                record_cache_lookup(key, value is not None)
+                if value is not None:
+                    results[key] = value
+            continue
+        for key, data in zip(node_keys, values):
+            record_cache_lookup(key, bool(data))
+            if data:
+                results[key] = _decode(data)
+                local_cache.set(key, results[key])
+    return results
+
+def set_many(items: Dict[str, Any], ttl: int = DEFAULT_TTL):
+    """Сохранить несколько ключей: один конвейер SETEX на каждый узел
+
+    Args:
+        items (Dict[str, Any]): Ключ -> данные
+        ttl (int, optional): Время жизни данных в секундах
+    Returns:
+        None
+    """
+    encoded = {}
+    for key, data in items.items():
+        try:
+            encoded[key] = _encode(data)
+        except Exception as e:
+            print(f"Ошибка кэширования данных: {e}")
+            continue
+        local_cache.set(key, _local_value(data, encoded[key]), ttl)
+    for name, node_keys in hash_ring.group(encoded).items():
+        commands = [("setex", (key, ttl, encoded[key])) for key in node_keys]
+        pipeline_node(nodes[name], commands)
 
 def delete_cache(key: str):
     """Удалить данные из кэша
-    
+
     Args:
         key (str): Ключ для удаления данных
     Returns:
         None
     """
-    redis_client.delete(key)
+    local_cache.delete(key)
+    node = node_for(key)
+    if call_node(node, "delete", key) is UNAVAILABLE:
+        node.defer(keys=[key])
+
+def delete_many(keys: Iterable[str]):
+    """Удалить несколько ключей: один DEL на каждый узел
+
+    Args:
+        keys (Iterable[str]): Ключи для удаления
+    Returns:
+        None
+    """
+    keys = list(keys)
+    for key in keys:
+        local_cache.delete(key)
+    for name, node_keys in hash_ring.group(keys).items():
+        if call_node(nodes[name], "delete", *node_keys) is UNAVAILABLE:
+            nodes[name].defer(keys=node_keys)
 
 def clear_link_cache(short_code: str):
     """Очистить кэш ссылки и статистики
@@ -72,22 +372,71 @@ def clear_link_cache(short_code: str):
     for key in keys_to_delete:
         delete_cache(key)
 
+def clear_owner_cache(owner_ids: Iterable[int]):
+    """Очистить кэш списка проектов и сводки владельцев
+
+    Args:
+        owner_ids (Iterable[int]): Владельцы, у которых изменились ссылки
+    Returns:
+        None
+    """
+    owner_ids = {owner_id for owner_id in owner_ids if owner_id is not None}
+    delete_many([f"projects:{owner_id}" for owner_id in owner_ids] + [f"summary:{owner_id}" for owner_id in owner_ids])
+
 def increment_counter(key: str, ttl: int = DEFAULT_TTL):
     """Увеличить счетчик и установить TTL, если ключ не существует
-    
+
     Args:
         key (str): Ключ для счетчика
         ttl (int, optional): Время жизни данных в секундах. По умолчанию DEFAULT_TTL.
     Returns:
         int: Текущее значение счетчика
     """
-    if not redis_client.exists(key):
-        redis_client.setex(key, ttl, 1)
+    exists = call_redis("exists", key)
+    if exists is UNAVAILABLE:
+        return 0
+    if not exists:
+        call_redis("setex", key, ttl, 1)
     else:
-        redis_client.incr(key)
-    
+        call_redis("incr", key)
+
     # Получаем текущее значение как строку и преобразуем в int
-    value = redis_client.get(key)
-    if value is None:
+    value = call_redis("get", key)
+    if value is None or value is UNAVAILABLE:
         return 0  # Защита от None
-    return int(value)
\ No newline at end of file
+    return int(value)
+
+def get_generation(key: str) -> Optional[int]:
+    """Получить текущее поколение (тег) группы кэшированных данных
+
+    Args:
+        key (str): Ключ счетчика поколения
+    Returns:
+        Optional[int]: Номер поколения или None, если Redis недоступен
+    """
+    value = call_redis("get", key)
+    if value is UNAVAILABLE:
+        return None
+    try:
+        return int(value) if value else 0
+    except ValueError:
+        return 0
+
+def bump_generation(key: str):
+    """Увеличить поколение: все записи с прежним тегом становятся недостижимыми
+
+    Args:
+        key (str): Ключ счетчика поколения
+    Returns:
+        None
+    """
+    node = node_for(key)
+    if call_node(node, "incr", key) is UNAVAILABLE:
+        node.defer(bumps=[key])
+
+def cache_health() -> Dict[str, dict]:
+    """Состояние автоматических выключателей и очереди инвалидаций всех узлов кэша"""
+    return {
+        name: {**node.breaker.metrics(), "pending_invalidations": len(node.pending_deletes) + len(node.pending_bumps)}
+        for name, node in nodes.items()
+    }
@@ -0,0 +1,169 @@
+"""Инструменты шардирования таблицы links
+
+Подготовка схемы на шардах:
+    python -m app.reshard init --shards URL1,URL2
+
+Перенос ссылок при изменении набора шардов:
+    python -m app.reshard move --from URL1,URL2 --to URL1,URL2,URL3 [--dry-run]
+
+Перенос идемпотентен: ссылка вместе со статистикой копируется на новый шард
+одной транзакцией и только затем удаляется со старого; счетчики ее проекта
+переносятся вместе с ней. Повторный запуск после сбоя пропускает уже
+скопированные ссылки. На время переноса запись новых переходов по
+переносимым ссылкам лучше остановить.
+"""
+import argparse
+import os
+from typing import Dict
+
+from sqlalchemy import select, text
+
+from .database import Base, DATABASE_URL
+from .models import Link, LinkStat
+from .queries import apply_project_deltas
+from .sharding import ShardRouter
+
+links_table = Link.__table__
+stats_table = LinkStat.__table__
+
+
+def init_shards(router: ShardRouter):
+    """Создать схему на всех шардах
+
+    На Postgres для шардов, отличных от основной БД, снимается внешний ключ
+    links.owner_id -> users.id (пользователи хранятся только в основной БД),
+    а последовательности идентификаторов разводятся, чтобы id ссылок не
+    пересекались между шардами.
+
+    Args:
+        router (ShardRouter): Маршрутизатор шардов
+    Returns:
+        None
+    """
+    count = len(router.shards)
+    for index, (name, engine) in enumerate(sorted(router.shards.items())):
+        Base.metadata.create_all(bind=engine)
+        if engine.dialect.name != "postgresql":
+            continue
+        with engine.begin() as connection:
+            if engine is not router.primary:
+                connection.execute(text("ALTER TABLE links DROP CONSTRAINT IF EXISTS links_owner_id_fkey"))
+            connection.execute(text(
+                f"ALTER SEQUENCE links_id_seq INCREMENT BY {count} RESTART WITH {index + 1}"
+            ))
+        print(f"Шард {name} подготовлен")
+
+
+def _project_delta(link: dict, sign: int) -> dict:
+    """Вклад ссылки в счетчики ее проекта (строки projects лежат на шарде ссылки)"""
+    if link["owner_id"] is None or link["project"] is None or link["is_active"] is False:
+        return {}
+    return {(link["owner_id"], link["project"]): [sign, sign * (link["access_count"] or 0)]}
+
+
+def _copy_link(link: dict, source, target) -> bool:
+    """Скопировать ссылку и ее статистику на целевой шард
+
+    Returns:
+        bool: False, если ссылка уже была скопирована ранее
+    """
+    with target.begin() as connection:
+        exists = connection.execute(
+            select(links_table.c.id).where(links_table.c.short_code == link["short_code"])
+        ).first()
+        if exists:
+            return False
+        values = {k: v for k, v in link.items() if k != "id"}
+        new_id = connection.execute(links_table.insert(), values).inserted_primary_key[0]
+        with source.connect() as source_connection:
+            stats = source_connection.execute(
+                select(stats_table).where(stats_table.c.link_id == link["id"])
+            ).mappings().all()
+        if stats:
+            connection.execute(stats_table.insert(), [
+                {**{k: v for k, v in row.items() if k != "id"}, "link_id": new_id}
+                for row in stats
+            ])
+        apply_project_deltas(connection, _project_delta(link, 1))
+    return True
+
+
+def _delete_link(link: dict, source):
+    with source.begin() as connection:
+        connection.execute(stats_table.delete().where(stats_table.c.link_id == link["id"]))
+        connection.execute(links_table.delete().where(links_table.c.id == link["id"]))
+        apply_project_deltas(connection, _project_delta(link, -1))
+
+
+def reshard(source: ShardRouter, target: ShardRouter, batch_size: int = 1000, dry_run: bool = False) -> Dict[str, int]:
+    """Перенести ссылки, шард которых изменился в новой конфигурации
+
+    Ссылки читаются постранично по id, в память попадает не больше
+    batch_size строк. Благодаря консистентному хешированию переносится
+    только небольшая часть ссылок.
+
+    Args:
+        source (ShardRouter): Текущая конфигурация шардов
+        target (ShardRouter): Новая конфигурация шардов
+        batch_size (int): Размер страницы при чтении ссылок
+        dry_run (bool): Только подсчитать ссылки к переносу
+
+    Returns:
+        Dict[str, int]: Количество просмотренных, перенесенных и пропущенных ссылок
+    """
+    result = {"scanned": 0, "moved": 0, "skipped": 0}
+    for name, engine in source.shards.items():
+        last_id = 0
+        while True:
+            with engine.connect() as connection:
+                batch = connection.execute(
+                    select(links_table)
+                    .where(links_table.c.id > last_id)
+                    .order_by(links_table.c.id)
+                    .limit(batch_size)
+                ).mappings().all()
+            if not batch:
+                break
+            last_id = batch[-1]["id"]
+            for link in batch:
+                result["scanned"] += 1
+                if target.shard_for_code(link["short_code"]) == name:
+                    continue
+                if dry_run:
+                    result["moved"] += 1
+                    continue
+                destination = target.engine_for_code(link["short_code"])
+                if _copy_link(dict(link), engine, destination):
+                    result["moved"] += 1
+                else:
+                    result["skipped"] += 1
+                _delete_link(dict(link), engine)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Шардирование таблицы links")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    init_parser = subparsers.add_parser("init", help="Создать схему на шардах")
+    init_parser.add_argument("--shards", default=os.getenv("DATABASE_SHARD_URLS", ""))
+
+    move_parser = subparsers.add_parser("move", help="Перенести ссылки в новую конфигурацию шардов")
+    move_parser.add_argument("--from", dest="source", required=True)
+    move_parser.add_argument("--to", dest="target", required=True)
+    move_parser.add_argument("--batch-size", type=int, default=1000)
+    move_parser.add_argument("--dry-run", action="store_true")
+
+    args = parser.parse_args(argv)
+    split = lambda value: [url.strip() for url in value.split(",") if url.strip()]
+
+    if args.command == "init":
+        init_shards(ShardRouter.from_urls(DATABASE_URL, split(args.shards)))
+    else:
+        source = ShardRouter.from_urls(DATABASE_URL, split(args.source))
+        target = ShardRouter.from_urls(DATABASE_URL, split(args.target))
+        print(reshard(source, target, batch_size=args.batch_size, dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
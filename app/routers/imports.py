@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from sqlalchemy.orm import Session
+from typing import Optional
+import io
+
+from ..bulk_import import import_links, detect_format, FORMATS, IMPORT_BATCH_SIZE, IMPORT_MAX_ERRORS
+from ..database import get_db, mark_write
+from ..models import User
+from ..redis_client import clear_owner_cache
+from .auth import get_current_user
+
+router = APIRouter(tags=["links"], prefix="/links")
+
+
+@router.post("/import", summary="Импорт ссылок из файла", description="Массовый импорт ссылок из CSV или JSONL с отчетом об ошибках по строкам")
+def import_links_file(
+    request: Request,
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, regex="^(csv|jsonl)$"),
+    skip: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Импортировать ссылки текущего пользователя из файла
+
+    Обработчик синхронный и выполняется в пуле потоков: файл читается
+    потоком, пакетами по IMPORT_BATCH_SIZE строк.
+
+    Args:
+        file (UploadFile): CSV или JSONL файл
+        format (str, optional): Формат файла (по умолчанию по расширению)
+        skip (int): Продолжить импорт после строки с этим номером (last_row прошлого ответа)
+
+    Returns:
+        dict: Итоги импорта и ошибки по строкам (не больше IMPORT_MAX_ERRORS)
+
+    Raises:
+        HTTPException: Если формат не удалось определить
+    """
+    fmt = format or detect_format(file.filename)
+    if fmt not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не удалось определить формат файла, укажите format=csv или format=jsonl"
+        )
+
+    errors = []
+
+    def on_error(number, error):
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append({"row": number, "error": error})
+
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        result = import_links(
+            db, stream, fmt, owner_id=current_user.id, batch_size=IMPORT_BATCH_SIZE, skip=skip, on_error=on_error
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Файл должен быть в кодировке UTF-8")
+    finally:
+        # Файл закрывает UploadFile
+        stream.detach()
+    if result["imported"]:
+        mark_write(request)
+        clear_owner_cache([current_user.id])
+
+    result["errors"] = errors
+    result["errors_truncated"] = result["failed"] > len(errors)
+    return result
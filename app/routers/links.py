@@ -1,43 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional
+import json
 import random
 import string
 from datetime import datetime, timedelta
 import asyncio  
 
-from ..database import get_db
+from ..database import get_db, get_read_db, mark_write, from_replica
 from ..models import Link, LinkStat, User
-from ..schemas import LinkCreate, Link as LinkResponse, LinkUpdate, LinkStats
-from ..tasks import scheduled_cleanup
+from ..schemas import LinkCreate, Link as LinkResponse, LinkUpdate, LinkStats, LinkStatsBatch, LinkSummary, ProjectLinksUpdate
+from ..bulk_update import iter_project_updates, iter_project_deletes
+from ..tasks import scheduled_cleanup, scheduled_purge, scheduled_project_clicks_flush, flush_pending_project_clicks, warm_up_cache_on_startup
 from .auth import get_current_user, get_current_user_or_none
-from ..redis_client import redis_client, set_cache, get_cache, delete_cache, clear_link_cache
+from ..live import hub, publish_click, stream_clicks
+from ..project_clicks import add_project_click, flushed_clicks
+from ..http_cache import make_etag, etag_matches, not_modified, naive_utc, link_cache_entry, read_link_entry, entry_expired, cache_link, redirect_cache_control, LINK_INFO_CACHE_CONTROL
+from ..queries import lookup_redirect, short_code_exists, alias_exists, read_stats, read_stats_many, record_click, adjust_project_counts, read_projects, read_summary, read_recent_clicks
+from ..query_budget import query_budget
+from ..urls import normalize_url, url_hash, DEDUPE_LINKS
+from ..serialization import LINK_COLUMNS, JSONBytesResponse, dump_links
+from ..redis_client import redis_client, set_cache, get_cache, get_many, set_many, set_raw, get_raw, delete_cache, clear_link_cache, clear_owner_cache, get_generation, bump_generation, SEARCH_GENERATION_KEY
+import os
 
 router = APIRouter(tags=["links"], prefix="/links")
 
+# Результаты поиска помечаются поколением; любое изменение ссылок увеличивает
+# его, поэтому TTL может быть большим без риска отдать устаревшие данные
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "3600"))
+# Время жизни статистики ссылки в кэше
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "300"))
+# Время жизни списка проектов пользователя в кэше (очищается при изменении ссылок)
+PROJECTS_CACHE_TTL = int(os.getenv("PROJECTS_CACHE_TTL", "3600"))
+# Сводка очищается при изменении ссылок пользователя; TTL ограничивает
+# отставание счетчиков переходов
+SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", "60"))
+# Переходы за сутки и неделю читают статистику и не очищаются при изменении
+# ссылок: пересчитываются не чаще раза в этот период
+SUMMARY_CLICKS_CACHE_TTL = int(os.getenv("SUMMARY_CLICKS_CACHE_TTL", "300"))
+# Через сколько дней должна истекать ссылка, чтобы попасть в expiring_soon
+SUMMARY_EXPIRING_DAYS = int(os.getenv("SUMMARY_EXPIRING_DAYS", "7"))
+SUMMARY_TOP_PROJECTS = int(os.getenv("SUMMARY_TOP_PROJECTS", "5"))
+
 @router.on_event("startup")
 async def start_cleanup_task():
     asyncio.create_task(scheduled_cleanup())
+    asyncio.create_task(scheduled_purge())
+    asyncio.create_task(scheduled_project_clicks_flush())
+
+@router.on_event("shutdown")
+async def flush_project_clicks_on_shutdown():
+    await flush_pending_project_clicks()
+
+@router.on_event("startup")
+async def warm_up_cache():
+    await warm_up_cache_on_startup()
 
 @router.get("/projects", response_model=List[str], summary="Получить все проекты пользователя", description="Получить список всех проектов, созданных аутентифицированным пользователем")
-def get_projects(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@query_budget(2)
+def get_projects(db: Session = Depends(get_read_db), current_user: User = Depends(get_current_user)):
     """Получить список всех проектов пользователя
     
+    Проекты читаются из таблицы projects (счетчики обновляются вместе со
+    ссылками) и кэшируются до следующего создания или удаления ссылки.
+    
     Returns:
         List[str]: Список названий проектов
     
     Raises:
         HTTPException: Если пользователь не аутентифицирован
     """
-    projects = db.query(Link.project).filter(
-        Link.owner_id == current_user.id,
-        Link.project.isnot(None)
-    ).distinct().all()
-    
-    return [project[0] for project in projects if project[0]]
+    cache_key = f"projects:{current_user.id}"
+    projects = get_cache(cache_key)
+    if projects is None:
+        projects = read_projects(db, current_user.id)
+        if not from_replica(db):
+            set_cache(cache_key, projects, PROJECTS_CACHE_TTL)
+    return projects
 
 @router.get("/projects/{project_name}", response_model=List[LinkResponse], summary="Получить ссылки проекта", description="Получить все ссылки, связанные с определенным проектом")
-def get_links_by_project(project_name: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+@query_budget(2)
+def get_links_by_project(project_name: str, db: Session = Depends(get_read_db), current_user: User = Depends(get_current_user)):
     """Получить все ссылки в определенном проекте
     
     Args:
@@ -49,56 +94,225 @@ def get_links_by_project(project_name: str, db: Session = Depends(get_db), curre
     Raises:
         HTTPException: Если пользователь не аутентифицирован
     """
-    links = db.query(Link).filter(
+    # Только столбцы ответа, сериализация в JSON за один проход
+    rows = db.query(*LINK_COLUMNS).filter(
         Link.owner_id == current_user.id,
-        Link.project == project_name
+        Link.project == project_name,
+        Link.is_active.isnot(False)
     ).all()
     
-    return links
+    return JSONBytesResponse(dump_links(rows))
+
+@router.get("/summary", response_model=LinkSummary, summary="Сводка по ссылкам пользователя", description="Количество ссылок и переходов, переходы за сутки и неделю, скоро истекающие ссылки и популярные проекты")
+@query_budget(4)
+def get_links_summary(db: Session = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    """Получить сводку для панели управления
+
+    Количество ссылок и переходов и популярные проекты берутся из счетчиков
+    таблицы projects (ссылки без проекта считаются одним запросом по индексу
+    владельца). Сводка кэшируется и очищается при создании, изменении и
+    удалении ссылок пользователя. Переходы за сутки и неделю считаются по
+    статистике и кэшируются отдельно на SUMMARY_CLICKS_CACHE_TTL секунд.
+
+    Returns:
+        LinkSummary: Сводка по активным ссылкам пользователя
+
+    Raises:
+        HTTPException: Если пользователь не аутентифицирован
+    """
+    cache_key = f"summary:{current_user.id}"
+    summary = get_cache(cache_key)
+    now = datetime.utcnow()
+    if summary is None:
+        summary = read_summary(
+            db, current_user.id, now, now + timedelta(days=SUMMARY_EXPIRING_DAYS), SUMMARY_TOP_PROJECTS
+        )
+        if not from_replica(db):
+            set_cache(cache_key, summary, SUMMARY_CACHE_TTL)
+
+    clicks_key = f"summary_clicks:{current_user.id}"
+    clicks = get_cache(clicks_key)
+    if clicks is None:
+        clicks = read_recent_clicks(db, current_user.id, now)
+        if not from_replica(db):
+            set_cache(clicks_key, clicks, SUMMARY_CLICKS_CACHE_TTL)
+    return {**summary, **clicks}
+
+def _bulk_response(progress: Iterator[int], key: str, stream: bool):
+    """Ответ массовой операции: итог или поток прогресса (NDJSON)
+
+    Первая порция обрабатывается до ответа, чтобы вернуть 404 для пустого проекта.
+    """
+    processed = next(progress, None)
+    if processed is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
+    if not stream:
+        for processed in progress:
+            pass
+        return {key: processed}
+
+    def lines(processed: int):
+        yield json.dumps({"processed": processed}) + "\n"
+        for processed in progress:
+            yield json.dumps({"processed": processed}) + "\n"
+        yield json.dumps({key: processed}) + "\n"
+
+    return StreamingResponse(lines(processed), media_type="application/x-ndjson")
+
+@router.delete("/projects/{project_name}", summary="Удалить ссылки проекта", description="Удалить все ссылки проекта одной операцией")
+def delete_project(
+    project_name: str,
+    request: Request,
+    progress: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Удалить все ссылки проекта
+
+    Обработчик синхронный и выполняется в пуле потоков: ссылки удаляются
+    порциями по BULK_CHUNK_SIZE (см. app.bulk_update).
+
+    Args:
+        project_name (str): Название проекта
+        progress (bool): Отдавать прогресс потоком NDJSON: строка
+            {"processed": n} после каждой порции и {"deleted": n} в конце
+
+    Returns:
+        dict: Количество удаленных ссылок
+
+    Raises:
+        HTTPException: Если в проекте нет ссылок пользователя
+    """
+    deletes = iter_project_deletes(db, current_user.id, project_name)
+    response = _bulk_response(deletes, "deleted", progress)
+    mark_write(request)
+    return response
+
+@router.patch("/projects/{project_name}", summary="Изменить ссылки проекта", description="Установить срок действия или постоянство всех ссылок проекта")
+def update_project(
+    project_name: str,
+    project_update: ProjectLinksUpdate,
+    request: Request,
+    progress: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Изменить срок действия всех ссылок проекта
+
+    Args:
+        project_name (str): Название проекта
+        project_update (ProjectLinksUpdate): Новые expires_at и/или permanent
+        progress (bool): Отдавать прогресс потоком NDJSON (как в delete_project)
+
+    Returns:
+        dict: Количество измененных ссылок
+
+    Raises:
+        HTTPException: Если нечего менять или в проекте нет ссылок пользователя
+    """
+    # expires_at: null снимает срок действия, permanent: null ничего не меняет
+    values = project_update.dict(exclude_unset=True)
+    if values.get("permanent", False) is None:
+        del values["permanent"]
+    if not values:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nothing to update")
+    updates = iter_project_updates(db, current_user.id, project_name, values)
+    response = _bulk_response(updates, "updated", progress)
+    mark_write(request)
+    return response
 
 @router.get("/search", response_model=List[LinkResponse], summary="Поиск ссылок по оригинальному URL", description="Поиск всех ссылок, соответствующих указанному оригинальному URL")
-async def search_links(original_url: str, db: Session = Depends(get_db)):
+@query_budget(1)
+async def search_links(original_url: str, exact: bool = False, db: Session = Depends(get_read_db)):
     """Найти ссылки по оригинальному URL
     
     Args:
         original_url (str): Оригинальный URL для поиска (полный или часть)
+        exact (bool): Искать точное совпадение URL (поиск по индексу без
+            сканирования подстроки); URL сравнивается как есть и в нормализованном виде
     
     Returns:
         List[LinkResponse]: Список найденных ссылок
     """
-    # Проверяем кэш
-    cache_key = f"search:{original_url}"
-    cached_results = get_cache(cache_key)
-    if cached_results:
-        return cached_results
-
-    # Оптимизированный запрос с использованием индекса
-    links = db.query(Link).filter(
-        Link.original_url.ilike(f'%{original_url}%')
-    ).order_by(Link.created_at.desc()).limit(100).all()
-    
-    # Сериализуем результаты для кэширования
-    results = [
-        {
-            "id": link.id,
-            "original_url": link.original_url,
-            "short_code": link.short_code,
-            "custom_alias": link.custom_alias,
-            "created_at": link.created_at.isoformat() if link.created_at else None,
-            "expires_at": link.expires_at.isoformat() if link.expires_at else None,
-            "access_count": link.access_count
-        } for link in links
-    ]
+    # Проверяем кэш текущего поколения (без Redis кэш поиска не используется)
+    generation = get_generation(SEARCH_GENERATION_KEY)
+    # Режим поиска - отдельный сегмент ключа: строка запроса может начинаться с любого символа
+    cache_key = f"search:{generation}:{'exact' if exact else 'sub'}:{original_url}"
+    if generation is not None:
+        cached_body = get_raw(cache_key)
+        if cached_body:
+            return JSONBytesResponse(cached_body)
+
+    if exact:
+        condition = Link.original_url.in_({original_url, normalize_url(original_url)})
+    else:
+        condition = Link.original_url.ilike(f'%{original_url}%')
+    # Оптимизированный запрос с использованием индекса (только столбцы ответа)
+    rows = db.query(*LINK_COLUMNS).filter(condition, Link.is_active.isnot(False)).order_by(Link.created_at.desc()).limit(100).all()
+    # При шардировании результаты шардов объединяются: сортируем и обрезаем заново
+    rows = sorted(rows, key=lambda row: row.created_at, reverse=True)[:100]
     
-    # Кэшируем результаты на 5 минут
-    set_cache(cache_key, results, 300)
-    return links
+    # Одни и те же байты идут в кэш и в ответ
+    body = dump_links(rows)
+    # Ответ отстающей реплики не кэшируется под новым поколением
+    if generation is not None and not from_replica(db):
+        set_raw(cache_key, body, SEARCH_CACHE_TTL)
+    return JSONBytesResponse(body)
+
+def _find_duplicate(db: Session, owner_id: Optional[int], dedupe_hash: str) -> Optional[Link]:
+    """Ссылка владельца с тем же нормализованным URL (один запрос по индексу ux_links_owner_id_url_hash)"""
+    return db.query(Link).filter(Link.owner_id == owner_id, Link.url_hash == dedupe_hash).first()
+
+
+def _expired(link: Link) -> bool:
+    return entry_expired(link_cache_entry(link.original_url, link.permanent, link.expires_at))
+
+
+def _reusable(link: Link, link_data: LinkCreate) -> bool:
+    """Можно ли вернуть существующую ссылку вместо создания новой"""
+    return (
+        link.is_active is not False
+        and not _expired(link)
+        and link.project == link_data.project
+        and bool(link.permanent) == link_data.permanent
+        # Postgres возвращает срок с часовым поясом, в запросе он может быть без него
+        and naive_utc(link.expires_at) == naive_utc(link_data.expires_at)
+    )
+
 
 def generate_short_code(length=6):
     chars = string.ascii_letters + string.digits
     return ''.join(random.choice(chars) for _ in range(length))
 
+@router.post("/stats/batch", response_model=Dict[str, Optional[LinkStats]], summary="Статистика нескольких ссылок", description="Получить статистику до 500 ссылок одним запросом")
+@query_budget(1)
+async def get_link_stats_batch(batch: LinkStatsBatch, db: Session = Depends(get_read_db)):
+    """Получить статистику нескольких ссылок
+    
+    Кэш читается одним MGET (на узел Redis), промахи - одним запросом IN,
+    найденная статистика записывается в кэш одним конвейером.
+    
+    Args:
+        batch (LinkStatsBatch): Короткие коды ссылок
+    
+    Returns:
+        Dict[str, Optional[LinkStats]]: Код -> статистика (null для ненайденных ссылок)
+    """
+    codes = list(dict.fromkeys(batch.codes))
+    cached = get_many(f"stats:{code}" for code in codes)
+    stats = {code: cached[f"stats:{code}"] for code in codes if f"stats:{code}" in cached}
+
+    misses = [code for code in codes if code not in stats]
+    if misses:
+        fresh = {code: record.as_dict() for code, record in read_stats_many(db, misses).items()}
+        if not from_replica(db):
+            set_many({f"stats:{code}": value for code, value in fresh.items()}, STATS_CACHE_TTL)
+        stats.update(fresh)
+
+    return {code: stats.get(code) for code in codes}
+
 @router.post("/shorten", response_model=LinkResponse, summary="Создать короткую ссылку", description="Создать новую сокращенную ссылку с опциональным пользовательским алиасом и сроком действия")
+@query_budget(6)
 async def create_short_link(
     link_data: LinkCreate,
     request: Request,
@@ -117,9 +331,24 @@ async def create_short_link(
     Raises:
         HTTPException: Если пользовательский алиас уже существует
     """
+    owner_id = current_user.id if current_user else None
+    dedupe_hash = None
+    if DEDUPE_LINKS and not link_data.custom_alias:
+        dedupe_hash = url_hash(str(link_data.original_url))
+        existing = _find_duplicate(db, owner_id, dedupe_hash)
+        if existing is not None:
+            if _reusable(existing, link_data):
+                return existing
+            if existing.is_active is False or _expired(existing):
+                # Истекшая или отключенная ссылка освобождает хеш для новой
+                existing.url_hash = None
+                db.flush()
+            else:
+                # Та же ссылка с другими параметрами создается без дедупликации
+                dedupe_hash = None
+
     if link_data.custom_alias:
-        existing_link = db.query(Link).filter(Link.custom_alias == link_data.custom_alias).first()
-        if existing_link:
+        if alias_exists(db, link_data.custom_alias):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Custom alias already exists"
@@ -128,8 +357,7 @@ async def create_short_link(
     else:
         while True:
             short_code = generate_short_code()
-            existing_link = db.query(Link).filter(Link.short_code == short_code).first()
-            if not existing_link:
+            if not short_code_exists(db, short_code):
                 break
 
     db_link = Link(
@@ -137,83 +365,110 @@ async def create_short_link(
         short_code=short_code,
         custom_alias=link_data.custom_alias,
         expires_at=link_data.expires_at,
-        owner_id=current_user.id if current_user else None,
-        project=link_data.project 
+        owner_id=owner_id,
+        project=link_data.project,
+        permanent=link_data.permanent,
+        url_hash=dedupe_hash
     )
 
     db.add(db_link)
-    db.commit()
+    adjust_project_counts(db, [(short_code, owner_id, link_data.project, 1, 0)])
+    try:
+        db.commit()
+    except IntegrityError:
+        # Ту же ссылку параллельно создал другой запрос этого владельца
+        db.rollback()
+        existing = _find_duplicate(db, owner_id, dedupe_hash) if dedupe_hash else None
+        if existing is None:
+            raise
+        return existing
     db.refresh(db_link)
+    mark_write(request)
 
     # Кэшируем ссылку в Redis
-    set_cache(f"link:{short_code}", str(link_data.original_url), 86400)  # 24 часа в секундах
+    cache_link(short_code, link_cache_entry(db_link.original_url, db_link.permanent, db_link.expires_at))
+    bump_generation(SEARCH_GENERATION_KEY)
+    clear_owner_cache([owner_id])
 
     return db_link
 
 @router.get("/{short_code}", response_model=LinkResponse, include_in_schema=False)
 @router.get("/{short_code}/", response_model=LinkResponse, summary="Получить детали ссылки", description="Получить информацию о конкретной сокращенной ссылке")
-async def get_link_info(short_code: str, db: Session = Depends(get_db)):
+@query_budget(1)
+async def get_link_info(short_code: str, request: Request, response: Response, db: Session = Depends(get_read_db)):
     """Получить информацию о конкретной короткой ссылке
     
     Args:
         short_code (str): Короткий код ссылки
+        request (Request): Объект запроса FastAPI (для If-None-Match)
     
     Returns:
-        LinkResponse: Детали ссылки
+        LinkResponse: Детали ссылки или 304, если ETag совпал
     
     Raises:
         HTTPException: Если ссылка не найдена
     """
-    link = db.query(Link).filter(Link.short_code == short_code).first()
+    link = db.query(Link).filter(Link.short_code == short_code, Link.is_active.isnot(False)).first()
     if not link:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Link not found"
         )
+
+    # ETag по всем столбцам ссылки: меняется при изменении и при каждом переходе
+    etag = make_etag({column.name: getattr(link, column.name) for column in Link.__table__.columns})
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = LINK_INFO_CACHE_CONTROL
     return link
 
 
 @router.get("/{short_code}/stats", response_model=LinkStats, summary="Получить статистику ссылки", description="Получить статистику использования конкретной сокращенной ссылки")
-async def get_link_stats(short_code: str, db: Session = Depends(get_db)):
+@query_budget(1)
+async def get_link_stats(short_code: str, request: Request, response: Response, db: Session = Depends(get_read_db)):
     """Получить статистику о конкретной короткой ссылке
     
     Args:
         short_code (str): Короткий код ссылки
+        request (Request): Объект запроса FastAPI (для If-None-Match)
     
     Returns:
-        LinkStats: Статистика ссылки
+        LinkStats: Статистика ссылки или 304, если ETag совпал
     
     Raises:
         HTTPException: Если ссылка не найдена
     """
     # Проверка кэша
-    cached_stats = get_cache(f"stats:{short_code}")
-    if cached_stats:
-        return cached_stats
+    stats = get_cache(f"stats:{short_code}")
+    if not stats:
+        record = read_stats(db, short_code)
+        if not record:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Ссылка не найдена"
+            )
         
-    link = db.query(Link).filter(Link.short_code == short_code).first()
-    if not link:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Ссылка не найдена"
-        )
-    
-    # Создаем словарь с данными, явно форматируя datetime объекты
-    stats = {
-        "original_url": link.original_url,
-        "created_at": link.created_at.isoformat() if link.created_at else None,
-        "access_count": link.access_count,
-        "last_accessed": link.last_accessed.isoformat() if link.last_accessed else None
-    }
-    
-    # Кэшируем статистику как словарь с уже сериализованными датами
-    set_cache(f"stats:{short_code}", stats, 300)  # 5 минут
-    
+        # Словарь с уже сериализованными datetime объектами
+        stats = record.as_dict()
+        
+        # Кэшируем статистику как словарь с уже сериализованными датами
+        # (только прочитанную с основной БД)
+        if not from_replica(db):
+            set_cache(f"stats:{short_code}", stats, STATS_CACHE_TTL)
+
+    # Кэшированная и свежая статистика дают одинаковый ETag
+    etag = make_etag(stats)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = LINK_INFO_CACHE_CONTROL
     return stats
 
     
 @router.get("/{short_code}/redirect/", name="redirect_to_original", summary="Перенаправление на оригинальный URL", description="Перенаправление на оригинальный URL и запись статистики посещений")
-async def redirect_to_original(short_code: str, request: Request, db: Session = Depends(get_db)):
+@query_budget(3)
+async def redirect_to_original(short_code: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """Перенаправление на оригинальный URL
     
     Args:
@@ -226,55 +481,97 @@ async def redirect_to_original(short_code: str, request: Request, db: Session =
     Raises:
         HTTPException: Если ссылка не найдена или срок ее действия истек
     """
-    # Пытаемся получить URL из кэша Redis
-    cached_url = get_cache(f"link:{short_code}")
-    original_url = None
-    link = None
-
-    if cached_url:
-        original_url = cached_url
-        # Все равно получаем ссылку из БД для обновления статистики
-        link = db.query(Link).filter(Link.short_code == short_code).first()
-    else:
-        link = db.query(Link).filter(Link.short_code == short_code).first()
-        if not link:
+    entry = resolve_redirect(short_code, request, db)
+    response.headers["Cache-Control"] = redirect_cache_control(entry)
+    return {"url": entry["url"]}
+
+def resolve_redirect(short_code: str, request: Request, db: Session) -> dict:
+    """Найти ссылку для перенаправления и учесть переход
+
+    Args:
+        short_code (str): Короткий код ссылки
+        request (Request): Объект запроса FastAPI
+        db (Session): Сессия базы данных
+
+    Returns:
+        dict: Запись кэша ссылки (URL, признак постоянной ссылки, срок действия)
+
+    Raises:
+        HTTPException: Если ссылка не найдена или срок ее действия истек
+    """
+    # Пытаемся получить ссылку из кэша Redis
+    entry = read_link_entry(get_cache(f"link:{short_code}"))
+
+    if not entry:
+        # Легкий запрос без ORM-сущности: нужны только id, URL и срок действия
+        link = lookup_redirect(db, short_code)
+        # Удаленная ссылка (ожидает очистки) считается отсутствующей
+        if not link or link.is_active is False:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Ссылка не найдена"
             )
-            
-        # Проверка срока истечения
-        if link.expires_at and link.expires_at < datetime.utcnow():
-            raise HTTPException(
-                status_code=status.HTTP_410_GONE,
-                detail="Срок действия ссылки истек"
-            )
-            
-        original_url = link.original_url
-        # Кэшируем URL
-        set_cache(f"link:{short_code}", original_url, 86400)  # 24 часа в секундах
-
-    if link:
-        # Обновляем статистику
-        link.access_count += 1
-        link.last_accessed = datetime.utcnow()
+        entry = link_cache_entry(link.original_url, link.permanent, link.expires_at)
+        # Кэшируем ссылку (истекшие ссылки не кэшируются)
+        cache_link(short_code, entry)
         
-        # Записываем детальную статистику
-        stats = LinkStat(
-            link_id=link.id,
-            ip_address=str(request.client.host),
-            user_agent=request.headers.get("user-agent"),
-            referer=request.headers.get("referer")
+    # Проверка срока истечения
+    if entry_expired(entry):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Срок действия ссылки истек"
         )
-        db.add(stats)
-        db.commit()
 
-    return {"url": original_url}
+    # Обновляем счетчик и записываем детальную статистику (по короткому коду:
+    # при попадании в кэш отдельный поиск ссылки не нужен)
+    record_click(
+        db, short_code,
+        ip_address=str(request.client.host),
+        user_agent=request.headers.get("user-agent"),
+        referer=request.headers.get("referer")
+    )
+    db.commit()
+    add_project_click(short_code)
+    publish_click(short_code)
+
+    return entry
+
+@router.get("/{short_code}/live", summary="Переходы в реальном времени", description="Поток Server-Sent Events с количеством переходов по ссылке, объединенных по тикам")
+@query_budget(1)
+async def live_clicks(short_code: str, request: Request, db: Session = Depends(get_read_db)):
+    """Подписаться на переходы по ссылке
+
+    Каждое событие `clicks` содержит количество переходов с прошлого
+    события. Все зрители ссылки в процессе используют одну подписку Redis.
+
+    Args:
+        short_code (str): Короткий код ссылки
+
+    Returns:
+        StreamingResponse: Поток text/event-stream
+
+    Raises:
+        HTTPException: Если ссылка не найдена или достигнут предел зрителей
+    """
+    link = lookup_redirect(db, short_code)
+    if not link or link.is_active is False:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Link not found")
+    try:
+        viewer = hub.add(short_code)
+    except OverflowError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many live viewers")
+
+    return StreamingResponse(
+        stream_clicks(short_code, viewer, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.delete("/{short_code}", include_in_schema=False)
 @router.delete("/{short_code}/", summary="Удалить ссылку", description="Удалить сокращенную ссылку")
 async def delete_link(
     short_code: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -291,7 +588,8 @@ async def delete_link(
     """
     link = db.query(Link).filter(
         Link.short_code == short_code,
-        Link.owner_id == current_user.id
+        Link.owner_id == current_user.id,
+        Link.is_active.isnot(False)
     ).first()
 
     if not link:
@@ -300,11 +598,18 @@ async def delete_link(
             detail="Link not found or you don't have permission"
         )
 
-    db.delete(link)
+    # Мягкое удаление: статистику и саму ссылку удаляет фоновая задача
+    # purge_deleted_links небольшими порциями
+    link.is_active = False
+    link.url_hash = None
+    adjust_project_counts(db, [(short_code, link.owner_id, link.project, -1, -flushed_clicks(short_code, link.access_count))])
     db.commit()
+    mark_write(request)
 
     # Clear Redis cache
     clear_link_cache(short_code)
+    bump_generation(SEARCH_GENERATION_KEY)
+    clear_owner_cache([link.owner_id])
 
     return {"message": "Link deleted successfully"}
 
@@ -312,6 +617,7 @@ async def delete_link(
 async def update_link(
     short_code: str,
     link_update: LinkUpdate,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -320,6 +626,7 @@ async def update_link(
     Args:
         short_code (str): Короткий код ссылки для обновления
         link_update (LinkUpdate): Данные для обновления
+        request (Request): Объект запроса FastAPI
         db (Session): Сессия базы данных
         current_user (User): Текущий пользователь
     Returns:
@@ -329,7 +636,8 @@ async def update_link(
     """
     link = db.query(Link).filter(
         Link.short_code == short_code,
-        Link.owner_id == current_user.id
+        Link.owner_id == current_user.id,
+        Link.is_active.isnot(False)
     ).first()
 
     if not link:
@@ -340,10 +648,12 @@ async def update_link(
 
     if link_update.original_url:
         link.original_url = str(link_update.original_url)
+        # Хеш описывал прежний URL
+        link.url_hash = None
     if link_update.custom_alias:
         existing_link = db.query(Link).filter(
             Link.custom_alias == link_update.custom_alias,
-            Link.id != link.id
+            Link.short_code != link.short_code
         ).first()
         if existing_link:
             raise HTTPException(
@@ -351,14 +661,20 @@ async def update_link(
                 detail="Кастомный алиас уже используется"
             )
         link.custom_alias = link_update.custom_alias
+        link.url_hash = None
     if link_update.expires_at:
         link.expires_at = link_update.expires_at
+    if link_update.permanent is not None:
+        link.permanent = link_update.permanent
 
     db.commit()
     db.refresh(link)
+    mark_write(request)
 
     # Обновляем кэш Redis
     clear_link_cache(short_code)
-    set_cache(f"link:{short_code}", str(link.original_url), 86400)  # 24 часа в секундах
+    cache_link(short_code, link_cache_entry(link.original_url, link.permanent, link.expires_at))
+    bump_generation(SEARCH_GENERATION_KEY)
+    clear_owner_cache([current_user.id])
 
     return link
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, HttpUrl, EmailStr
-from typing import Optional
+from pydantic import BaseModel, Field, HttpUrl, EmailStr
+from typing import List, Optional
 from datetime import datetime
 
 class LinkBase(BaseModel):
@@ -7,6 +7,7 @@ class LinkBase(BaseModel):
     custom_alias: Optional[str] = None
     expires_at: Optional[datetime] = None
     project: Optional[str] = None  
+    permanent: bool = False
 
 class LinkCreate(LinkBase):
     pass
@@ -16,6 +17,7 @@ class LinkUpdate(BaseModel):
     custom_alias: Optional[str] = None
     expires_at: Optional[datetime] = None
     project: Optional[str] = None 
+    permanent: Optional[bool] = None
 
 class Link(LinkBase):
     id: int
@@ -42,6 +44,29 @@ class LinkStats(BaseModel):
             datetime: lambda v: v.isoformat() if v else None
         }
 
+# Запрос статистики нескольких ссылок (страница панели управления)
+class LinkStatsBatch(BaseModel):
+    codes: List[str] = Field(..., min_items=1, max_items=500)
+
+# Массовое изменение ссылок проекта
+class ProjectLinksUpdate(BaseModel):
+    expires_at: Optional[datetime] = None
+    permanent: Optional[bool] = None
+
+# Сводка для панели управления пользователя
+class ProjectSummary(BaseModel):
+    name: str
+    link_count: int
+    click_count: int
+
+class LinkSummary(BaseModel):
+    total_links: int
+    total_clicks: int
+    clicks_24h: int
+    clicks_7d: int
+    expiring_soon: int
+    top_projects: List[ProjectSummary]
+
 class UserBase(BaseModel):
     email: EmailStr
 
@@ -0,0 +1,229 @@
+"""Массовое заполнение БД синтетическими данными для нагрузочных проверок
+
+Запуск:
+    python -m app.seed --links 10000000 [--max-stats-per-link 20] [--seed 42]
+                       [--batch-size 50000] [--corpus-file corpus.tsv]
+
+Данные детерминированы (одинаковый seed и дата - одинаковые строки) и похожи
+на настоящие: домены распределены по закону Ципфа, переходы сильно смещены к
+небольшой доле ссылок (распределение Парето), часть ссылок имеет срок
+действия, в том числе уже истекший. Строки генерируются потоком и пишутся
+пакетами: на Postgres через COPY, на других БД через executemany, поэтому
+память не растет с объемом данных. Каждый пакет - отдельная транзакция.
+
+Короткие коды - 7 символов (коды API - 6), поэтому с ними не пересекаются.
+--corpus-file сохраняет пары `код<TAB>URL` для LOAD_CORPUS_FILE в Locust.
+"""
+import argparse
+import csv
+import io
+import itertools
+import random
+import string
+from functools import partial
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, func, select, text
+
+from .database import Base, DATABASE_URL
+from .models import Link, LinkStat
+
+LINK_COPY_COLUMNS = [
+    "id", "original_url", "short_code", "created_at", "expires_at", "last_accessed",
+    "access_count", "is_active", "permanent", "project",
+]
+STAT_COPY_COLUMNS = ["link_id", "accessed_at", "ip_address", "user_agent", "referer", "country"]
+
+CODE_ALPHABET = string.digits + string.ascii_letters
+CODE_LENGTH = 7
+# Взаимно простой с 62 множитель: перестановка id -> код без повторов
+CODE_MULTIPLIER = 2654435761
+
+POPULAR_DOMAINS = [
+    "youtube.com", "github.com", "wikipedia.org", "google.com", "medium.com", "reddit.com",
+    "stackoverflow.com", "twitter.com", "amazon.com", "habr.com", "docs.python.org", "news.ycombinator.com",
+]
+# Хвост из малопопулярных доменов
+DOMAINS = POPULAR_DOMAINS + [f"site{i}.example.com" for i in range(1000)]
+PATH_WORDS = ["blog", "post", "watch", "article", "docs", "item", "product", "news", "page", "wiki", "issues", "r"]
+PROJECTS = ["marketing", "docs", "newsletter", "social", "support"]
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_0) Safari/605.1.15",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) Mobile/15E148",
+    "Mozilla/5.0 (Linux; Android 14) Chrome/120.0 Mobile",
+    "curl/8.4.0",
+]
+REFERERS = [None, None, "https://t.me/", "https://www.google.com/", "https://vk.com/", "https://twitter.com/"]
+COUNTRIES = ["RU", "RU", "RU", "US", "DE", "KZ", "BY", "GB", None]
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    # Тот же формат, в котором SQLAlchemy хранит даты в SQLite; Postgres его тоже принимает
+    return value.isoformat(sep=" ", timespec="microseconds") if value else None
+
+
+def short_code_for(link_id: int) -> str:
+    """Детерминированный уникальный код ссылки по ее id"""
+    value = (link_id * CODE_MULTIPLIER) % len(CODE_ALPHABET) ** CODE_LENGTH
+    chars = []
+    for _ in range(CODE_LENGTH):
+        value, index = divmod(value, len(CODE_ALPHABET))
+        chars.append(CODE_ALPHABET[index])
+    return "".join(chars)
+
+
+def generate(count: int, seed: int = 42, start_id: int = 1, max_stats_per_link: int = 20,
+             now: Optional[datetime] = None) -> Iterator[Tuple[tuple, List[tuple]]]:
+    """Сгенерировать ссылки и их статистику
+
+    Args:
+        count (int): Количество ссылок
+        seed (int): Начальное значение генератора
+        start_id (int): id первой ссылки
+        max_stats_per_link (int): Предел записей статистики на ссылку
+        now (datetime, optional): Момент, относительно которого считаются даты
+            (по умолчанию начало текущих суток UTC)
+
+    Yields:
+        Tuple[tuple, List[tuple]]: Строка links (LINK_COPY_COLUMNS) и строки
+            link_stats (STAT_COPY_COLUMNS)
+    """
+    rng = random.Random(seed)
+    if now is None:
+        now = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    domain_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(DOMAINS) + 1)))
+
+    for link_id in range(start_id, start_id + count):
+        domain = rng.choices(DOMAINS, cum_weights=domain_weights)[0]
+        url = f"https://{domain}/{rng.choice(PATH_WORDS)}/{link_id}"
+        created_at = now - timedelta(seconds=rng.randrange(730 * 86400))
+        expires_at = None
+        if rng.random() < 0.25:
+            # Срок действия от дня до года; часть ссылок уже истекла
+            expires_at = created_at + timedelta(days=rng.randint(1, 365))
+        # Парето: большая часть переходов приходится на небольшую долю ссылок
+        access_count = min(int(rng.paretovariate(1.16)) - 1, 1000000)
+
+        stats = []
+        last_accessed = None
+        for _ in range(min(access_count, max_stats_per_link)):
+            accessed_at = created_at + timedelta(seconds=rng.randrange(max(int((now - created_at).total_seconds()), 1)))
+            last_accessed = max(last_accessed, accessed_at) if last_accessed else accessed_at
+            stats.append((
+                link_id,
+                _timestamp(accessed_at),
+                f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+                rng.choice(USER_AGENTS),
+                rng.choice(REFERERS),
+                rng.choice(COUNTRIES),
+            ))
+
+        link = (
+            link_id,
+            url,
+            short_code_for(link_id),
+            _timestamp(created_at),
+            _timestamp(expires_at),
+            _timestamp(last_accessed),
+            access_count,
+            True,
+            rng.random() < 0.05,
+            rng.choice(PROJECTS) if rng.random() < 0.3 else None,
+        )
+        yield link, stats
+
+
+def _copy_rows(cursor, table: str, columns: List[str], rows: List[tuple]):
+    """Загрузить строки командой COPY (Postgres)"""
+    buffer = io.StringIO()
+    # В формате CSV пустое поле без кавычек - NULL
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _insert_rows(cursor, table: str, columns: List[str], rows: List[tuple], placeholder: str = "?"):
+    """Загрузить строки через executemany (SQLite и другие БД)"""
+    placeholders = ", ".join(placeholder for _ in columns)
+    cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+
+def seed(engine, count: int, seed: int = 42, batch_size: int = 50000, max_stats_per_link: int = 20,
+         corpus_file=None, now: Optional[datetime] = None) -> dict:
+    """Добавить в БД синтетические ссылки и статистику
+
+    Новые id начинаются после максимального существующего, поэтому команду
+    можно запускать повторно для наращивания объема.
+
+    Args:
+        engine: Движок БД
+        count (int): Количество ссылок
+        seed (int): Начальное значение генератора
+        batch_size (int): Ссылок в одном пакете (транзакции)
+        max_stats_per_link (int): Предел записей статистики на ссылку
+        corpus_file (file, optional): Куда записать пары `код<TAB>URL`
+        now (datetime, optional): Опорный момент для дат
+
+    Returns:
+        dict: Количество добавленных ссылок и записей статистики
+    """
+    with engine.connect() as connection:
+        start_id = (connection.execute(select(func.max(Link.__table__.c.id))).scalar() or 0) + 1
+    if engine.dialect.name == "postgresql":
+        load = _copy_rows
+    else:
+        load = partial(_insert_rows, placeholder="?" if engine.dialect.paramstyle == "qmark" else "%s")
+    result = {"links": 0, "stats": 0}
+
+    rows = generate(count, seed=seed, start_id=start_id, max_stats_per_link=max_stats_per_link, now=now)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        links = [link for link, _ in batch]
+        stats = [stat for _, link_stats in batch for stat in link_stats]
+        with engine.begin() as connection:
+            cursor = connection.connection.cursor()
+            load(cursor, Link.__tablename__, LINK_COPY_COLUMNS, links)
+            if stats:
+                load(cursor, LinkStat.__tablename__, STAT_COPY_COLUMNS, stats)
+        if corpus_file is not None:
+            corpus_file.writelines(f"{link[2]}\t{link[1]}\n" for link in links)
+        result["links"] += len(links)
+        result["stats"] += len(stats)
+        print(f"Загружено ссылок: {result['links']}/{count}, записей статистики: {result['stats']}")
+
+    if engine.dialect.name == "postgresql" and result["links"]:
+        # id заданы явно: сдвигаем последовательность за последний id
+        with engine.begin() as connection:
+            connection.execute(text("SELECT setval('links_id_seq', (SELECT max(id) FROM links))"))
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Массовое заполнение БД синтетическими данными")
+    parser.add_argument("--links", type=int, required=True, help="Количество ссылок")
+    parser.add_argument("--max-stats-per-link", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--corpus-file", help="Файл для пар код<TAB>URL (корпус Locust)")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    corpus_file = open(args.corpus_file, "w") if args.corpus_file else None
+    try:
+        print(seed(
+            engine, args.links, seed=args.seed, batch_size=args.batch_size,
+            max_stats_per_link=args.max_stats_per_link, corpus_file=corpus_file
+        ))
+    finally:
+        if corpus_file is not None:
+            corpus_file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Быстрая сериализация списков ссылок
+
+Списки ссылок читаются из БД только нужными столбцами (без ORM-сущностей) и
+кодируются в JSON один раз через orjson. Готовые байты отдаются в ответе
+напрямую, минуя повторную валидацию pydantic (`response_model` остается для
+документации), и при необходимости тем же объектом кладутся в кэш.
+"""
+from typing import Iterable
+
+import orjson
+from fastapi import Response
+
+from .models import Link
+
+# Поля ответа schemas.Link в порядке схемы
+LINK_FIELDS = (
+    "original_url", "custom_alias", "expires_at", "project", "permanent",
+    "id", "short_code", "created_at", "last_accessed", "access_count", "owner_id",
+)
+LINK_COLUMNS = tuple(getattr(Link, name) for name in LINK_FIELDS)
+
+
+class JSONBytesResponse(Response):
+    """Ответ с уже сериализованным JSON"""
+    media_type = "application/json"
+
+
+def dumps(data) -> bytes:
+    """Сериализовать данные в JSON (datetime - в ISO 8601, как у pydantic)"""
+    return orjson.dumps(data)
+
+
+def dump_links(rows: Iterable) -> bytes:
+    """Сериализовать строки запроса по LINK_COLUMNS в JSON-список ссылок
+
+    Args:
+        rows (Iterable): Строки запроса `db.query(*LINK_COLUMNS)`
+    Returns:
+        bytes: JSON-массив объектов со всеми полями schemas.Link
+    """
+    return orjson.dumps([dict(zip(LINK_FIELDS, row)) for row in rows])
@@ -0,0 +1,150 @@
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BindParameter
+from typing import Dict, List, Optional
+
+from .hash_ring import HashRing
+
+# Шард, на котором живут таблицы, не подлежащие шардированию (users)
+PRIMARY_SHARD = "primary"
+# Таблицы, распределяемые по шардам по short_code (счетчики проектов лежат
+# на шардах своих ссылок)
+SHARDED_TABLES = ("links", "link_stats", "projects")
+
+
+def shard_name(url: str) -> str:
+    """Стабильное имя шарда по URL базы (без пользователя и пароля)
+
+    Имя определяет положение шарда на кольце, поэтому смена пароля не
+    должна приводить к перераспределению ссылок.
+    """
+    u = make_url(url)
+    return f"{u.drivername}://{u.host or ''}:{u.port or ''}/{u.database or ''}"
+
+
+def _table_name(mapper) -> Optional[str]:
+    if mapper is None:
+        return None
+    return mapper.local_table.name
+
+
+def _short_codes(clause) -> List[str]:
+    """Значения short_code из условий вида links.short_code == :value"""
+    codes = []
+
+    def visit_binary(binary):
+        column, value = binary.left, binary.right
+        if isinstance(column, BindParameter):
+            column, value = value, column
+        if (
+            binary.operator is operators.eq
+            and getattr(column, "key", None) == "short_code"
+            and getattr(getattr(column, "table", None), "name", None) == "links"
+            and isinstance(value, BindParameter)
+        ):
+            codes.append(value.effective_value)
+
+    if clause is not None:
+        visitors.traverse(clause, {}, {"binary": visit_binary})
+    return codes
+
+
+class ShardRouter:
+    """Маршрутизатор таблицы links по шардам
+
+    Ссылка и ее статистика лежат на шарде, выбранном консистентным
+    хешированием short_code. Запросы по short_code идут на один шард,
+    остальные (поиск, выборки по владельцу) - на все шарды с объединением
+    результатов (scatter-gather). Пользователи хранятся на основной БД.
+    """
+
+    def __init__(self, primary, shards: Dict[str, object], vnodes: int = 160):
+        self.primary = primary
+        self.shards = dict(shards)
+        self.ring = HashRing(self.shards, vnodes=vnodes)
+
+    @classmethod
+    def from_urls(cls, primary_url: str, shard_urls: List[str], **engine_options) -> "ShardRouter":
+        """Создать маршрутизатор по URL основной БД и шардов"""
+        primary = create_engine(primary_url, **engine_options)
+        shards = {}
+        for url in shard_urls:
+            shards[shard_name(url)] = primary if url == primary_url else create_engine(url, **engine_options)
+        return cls(primary, shards)
+
+    @property
+    def binds(self) -> dict:
+        binds = {PRIMARY_SHARD: self.primary}
+        binds.update(self.shards)
+        return binds
+
+    def shard_for_code(self, short_code: str) -> str:
+        """Имя шарда, на котором хранится ссылка"""
+        return self.ring.get_node(short_code)
+
+    def shards_for_owner(self, owner_id: int) -> List[str]:
+        """Шарды, которые нужно опросить для запросов по владельцу
+
+        Ссылки размещаются по short_code, поэтому ссылки одного владельца
+        могут оказаться на любом шарде.
+        """
+        return list(self.shards)
+
+    def engine_for_code(self, short_code: str):
+        """Движок шарда, на котором хранится ссылка"""
+        return self.shards[self.shard_for_code(short_code)]
+
+    # --- функции выбора шарда для ShardedSession ---
+
+    def _shard_chooser(self, mapper, instance, clause=None):
+        table = _table_name(mapper)
+        if table == "links" and instance is not None:
+            return self.shard_for_code(instance.short_code)
+        if table == "link_stats" and instance is not None:
+            link = instance.link
+            if link is None:
+                raise ValueError("LinkStat must be attached to its Link to choose a shard")
+            state = inspect(link)
+            return state.identity_token or self.shard_for_code(link.short_code)
+        if table in SHARDED_TABLES:
+            codes = _short_codes(clause)
+            if codes:
+                return self.shard_for_code(codes[0])
+            raise ValueError(f"Cannot choose a shard for {table} without a short_code")
+        return PRIMARY_SHARD
+
+    def _id_chooser(self, query, ident):
+        entity = query.column_descriptions[0]["entity"]
+        if _table_name(inspect(entity)) in SHARDED_TABLES:
+            return list(self.shards)
+        return [PRIMARY_SHARD]
+
+    def _execute_chooser(self, orm_context) -> List[str]:
+        table = _table_name(orm_context.bind_mapper)
+        if table not in SHARDED_TABLES:
+            return [PRIMARY_SHARD]
+        parent = orm_context.lazy_loaded_from
+        if parent is not None and _table_name(parent.mapper) in SHARDED_TABLES:
+            # Связанные строки (статистика ссылки) лежат на шарде родителя
+            return [parent.identity_token]
+        statement = orm_context.statement
+        codes = _short_codes(getattr(statement, "whereclause", None))
+        if codes:
+            return sorted({self.shard_for_code(code) for code in codes})
+        return list(self.shards)
+
+    def session_factory(self) -> sessionmaker:
+        """Фабрика сессий, прозрачно распределяющих запросы по шардам"""
+        return sessionmaker(
+            class_=ShardedSession,
+            autocommit=False,
+            autoflush=False,
+            shards=self.binds,
+            shard_chooser=self._shard_chooser,
+            id_chooser=self._id_chooser,
+            execute_chooser=self._execute_chooser,
+            info={"shard_router": self},
+        )
@@ -1,11 +1,28 @@
 from fastapi import Depends
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import asyncio
+import os
+import time
 
-from .database import get_db
+from .database import get_db, SessionLocal
 from .models import Link, LinkStat
-from .redis_client import clear_link_cache
+from .redis_client import clear_link_cache, clear_owner_cache, set_many, bump_generation, SEARCH_GENERATION_KEY
+from .http_cache import link_cache_entry, LINK_CACHE_TTL
+from .metrics import observe_cleanup
+from .queries import adjust_project_counts, has_deleted_links, purge_stats_chunk, purge_links_chunk
+from .project_clicks import flush_project_clicks, flushed_clicks
+
+# Прогрев кэша при старте: сколько ссылок загружать и сколько секунд на это отводить
+CACHE_WARMUP_LIMIT = int(os.getenv("CACHE_WARMUP_LIMIT", "1000"))
+CACHE_WARMUP_BUDGET = float(os.getenv("CACHE_WARMUP_BUDGET", "2.0"))
+CACHE_WARMUP_BATCH = 500
+# Очистка удаленных ссылок: размер порции (одна транзакция) и интервал запуска в секундах
+PURGE_CHUNK_SIZE = int(os.getenv("PURGE_CHUNK_SIZE", "5000"))
+PURGE_INTERVAL = float(os.getenv("PURGE_INTERVAL", "60"))
+# Интервал записи накопленных переходов в счетчики проектов в секундах
+PROJECT_CLICKS_FLUSH_INTERVAL = float(os.getenv("PROJECT_CLICKS_FLUSH_INTERVAL", "10"))
 
 async def cleanup_inactive_links(db: Session, days_inactive: int = 30):
     """Удаление ссылок, которые не использовались указанное количество дней
@@ -17,6 +34,7 @@ async def cleanup_inactive_links(db: Session, days_inactive: int = 30):
     Returns:
         int: Количество удаленных ссылок
     """
+    started = time.perf_counter()
     cutoff_date = datetime.utcnow() - timedelta(days=days_inactive)
     
     # Получаем ссылки, у которых последний переход был раньше cutoff_date
@@ -27,14 +45,34 @@ async def cleanup_inactive_links(db: Session, days_inactive: int = 30):
     ).all()
     
     # Удаляем ссылки и очищаем кэш
+    owners = _release_projects(db, inactive_links)
     for link in inactive_links:
         clear_link_cache(link.short_code)
         db.delete(link)
     
     db.commit()
+    if inactive_links:
+        bump_generation(SEARCH_GENERATION_KEY)
+        clear_owner_cache(owners)
+    observe_cleanup("inactive", started, len(inactive_links))
     
     return len(inactive_links)
 
+def _release_projects(db: Session, links) -> set:
+    """Уменьшить счетчики проектов удаляемых ссылок
+
+    Удаленные ранее (is_active = false) ссылки в счетчиках уже не учитываются.
+
+    Returns:
+        set: Владельцы удаляемых активных ссылок
+    """
+    active = {link.short_code: link for link in links if link.is_active is not False}
+    adjust_project_counts(db, [
+        (link.short_code, link.owner_id, link.project, -1, -flushed_clicks(link.short_code, link.access_count))
+        for link in active.values()
+    ])
+    return {link.owner_id for link in active.values()}
+
 async def cleanup_expired_links(db: Session):
     """Удаление ссылок с истекшим сроком действия
     
@@ -44,6 +82,7 @@ async def cleanup_expired_links(db: Session):
     Returns:
         int: Количество удаленных ссылок
     """
+    started = time.perf_counter()
     now = datetime.utcnow()
     
     # Получаем ссылки с истекшим сроком
@@ -53,11 +92,16 @@ async def cleanup_expired_links(db: Session):
     ).all()
     
     # Удаляем ссылки и очищаем кэш
+    owners = _release_projects(db, expired_links)
     for link in expired_links:
         clear_link_cache(link.short_code)
         db.delete(link)
     
     db.commit()
+    if expired_links:
+        bump_generation(SEARCH_GENERATION_KEY)
+        clear_owner_cache(owners)
+    observe_cleanup("expired", started, len(expired_links))
     
     return len(expired_links)
 
@@ -76,4 +120,173 @@ async def scheduled_cleanup():
             db.close()
         
         # Запускаем очистку каждые 24 часа
-        await asyncio.sleep(86400)
\ No newline at end of file
+        await asyncio.sleep(86400)
+
+def purge_deleted_links(db: Session, chunk_size: int = PURGE_CHUNK_SIZE, max_chunks: int = None):
+    """Удалить статистику и сами удаленные (is_active = false) ссылки
+
+    Удаление идет порциями по chunk_size строк, каждая порция - отдельная
+    короткая транзакция, поэтому ссылка с миллионами переходов не блокирует
+    таблицу одной большой транзакцией. Сначала удаляется статистика, затем
+    ссылки без статистики (это освобождает их коды и алиасы).
+
+    Args:
+        db (Session): Сессия базы данных
+        chunk_size (int): Строк в одной порции
+        max_chunks (int, optional): Максимальное количество порций за вызов
+
+    Returns:
+        dict: Количество удаленных записей статистики и ссылок
+    """
+    started = time.perf_counter()
+    result = {"stats": 0, "links": 0}
+    # Обычно удаленных ссылок нет: одна проверка по частичному индексу
+    # вместо двух DELETE на каждом шарде
+    if not has_deleted_links(db):
+        db.rollback()
+        return result
+    chunks = 0
+    for key, purge in (("stats", purge_stats_chunk), ("links", purge_links_chunk)):
+        while max_chunks is None or chunks < max_chunks:
+            deleted = purge(db, chunk_size)
+            db.commit()
+            chunks += 1
+            result[key] += deleted
+            if deleted < chunk_size:
+                break
+    observe_cleanup("purge", started, result["links"])
+    return result
+
+def _purge_job():
+    db = SessionLocal()
+    try:
+        return purge_deleted_links(db)
+    finally:
+        db.close()
+
+async def scheduled_purge(interval: float = PURGE_INTERVAL):
+    """Планировщик очистки удаленных ссылок (выполняется в пуле потоков)
+
+    Returns:
+        None
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            result = await loop.run_in_executor(None, _purge_job)
+            if result["stats"] or result["links"]:
+                print(f"Очистка удаленных ссылок: {result}")
+        except Exception as e:
+            print(f"Ошибка очистки удаленных ссылок: {e}")
+        await asyncio.sleep(interval)
+
+def _flush_project_clicks_job():
+    db = SessionLocal()
+    try:
+        return flush_project_clicks(db)
+    finally:
+        db.close()
+
+async def flush_pending_project_clicks():
+    """Записать накопленные переходы в счетчики проектов (в пуле потоков)
+
+    Returns:
+        int: Количество записанных переходов (0 при ошибке)
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(None, _flush_project_clicks_job)
+    except Exception as e:
+        print(f"Ошибка записи переходов в счетчики проектов: {e}")
+        return 0
+
+async def scheduled_project_clicks_flush(interval: float = PROJECT_CLICKS_FLUSH_INTERVAL):
+    """Планировщик записи переходов в счетчики проектов
+
+    Returns:
+        None
+    """
+    while True:
+        await asyncio.sleep(interval)
+        await flush_pending_project_clicks()
+
+def warm_cache(db: Session, limit: int = CACHE_WARMUP_LIMIT, deadline: float = None):
+    """Загрузить самые популярные ссылки в Redis и кэш процесса
+
+    Ссылки читаются одним запросом (только нужные столбцы) и пишутся
+    пакетами через конвейер. Работа прекращается по достижении deadline.
+
+    Args:
+        db (Session): Сессия базы данных
+        limit (int): Максимальное количество ссылок
+        deadline (float, optional): Момент time.monotonic(), после которого прогрев прекращается
+
+    Returns:
+        int: Количество загруженных в кэш ссылок
+    """
+    now = datetime.utcnow()
+    # Ссылки, истекающие раньше TTL кэша, не прогреваем: пакет пишется с одним
+    # TTL, и запись пережила бы ссылку (при чтении entry_expired все равно вернет
+    # 410, но такая запись только занимает кэш). Их закэширует первый переход
+    # через cache_link с TTL до срока действия
+    query = db.query(Link.short_code, Link.original_url, Link.permanent, Link.expires_at).filter(
+        Link.is_active.isnot(False),
+        or_(Link.expires_at.is_(None), Link.expires_at > now + timedelta(seconds=LINK_CACHE_TTL))
+    ).order_by(
+        Link.access_count.desc(),
+        Link.last_accessed.desc().nullslast()
+    ).limit(limit).yield_per(CACHE_WARMUP_BATCH)
+
+    warmed = 0
+    batch = {}
+    for short_code, original_url, permanent, expires_at in query:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        batch[f"link:{short_code}"] = link_cache_entry(original_url, permanent, expires_at)
+        if len(batch) >= CACHE_WARMUP_BATCH:
+            set_many(batch, LINK_CACHE_TTL)
+            warmed += len(batch)
+            batch = {}
+    if batch and (deadline is None or time.monotonic() < deadline):
+        set_many(batch, LINK_CACHE_TTL)
+        warmed += len(batch)
+
+    return warmed
+
+def _warm_cache_job(limit: int, deadline: float):
+    db = SessionLocal()
+    try:
+        return warm_cache(db, limit, deadline)
+    finally:
+        db.close()
+
+async def warm_up_cache_on_startup(limit: int = CACHE_WARMUP_LIMIT, budget: float = CACHE_WARMUP_BUDGET):
+    """Прогрев кэша при старте приложения с ограничением по времени
+
+    Прогрев выполняется в пуле потоков; старт приложения ждет его не дольше
+    budget секунд, после чего поток сам останавливается на следующем пакете.
+
+    Args:
+        limit (int): Максимальное количество ссылок
+        budget (float): Бюджет времени в секундах
+
+    Returns:
+        int: Количество загруженных в кэш ссылок (0, если бюджет исчерпан)
+    """
+    if limit <= 0 or budget <= 0:
+        return 0
+
+    loop = asyncio.get_running_loop()
+    deadline = time.monotonic() + budget
+    future = loop.run_in_executor(None, _warm_cache_job, limit, deadline)
+    try:
+        warmed = await asyncio.wait_for(asyncio.shield(future), timeout=budget)
+    except asyncio.TimeoutError:
+        print(f"Прогрев кэша не уложился в {budget} с, продолжаем без него")
+        return 0
+    except Exception as e:
+        print(f"Ошибка прогрева кэша: {e}")
+        return 0
+
+    print(f"Прогрев кэша: загружено ссылок {warmed}")
+    return warmed
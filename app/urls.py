@@ -0,0 +1,38 @@
+"""Нормализация URL и хеш для дедупликации ссылок
+
+В режиме дедупликации (DEDUPE_LINKS=true) ссылка без алиаса хранит хеш
+нормализованного URL в links.url_hash. Уникальный индекс (owner_id, url_hash)
+позволяет найти уже созданную владельцем ссылку одним запросом по индексу
+и не дает создать вторую при параллельных запросах.
+"""
+import hashlib
+import os
+from urllib.parse import urlsplit, urlunsplit
+
+DEDUPE_LINKS = os.getenv("DEDUPE_LINKS", "false").lower() in ("1", "true", "yes")
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """Привести URL к каноническому виду
+
+    Схема и хост переводятся в нижний регистр, порт по умолчанию и пустой
+    фрагмент отбрасываются, пустой путь заменяется на "/". Путь, параметры
+    и фрагмент не меняются: от них может зависеть ответ сервера.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    netloc = host
+    if parts.username is not None:
+        credentials = parts.username + (f":{parts.password}" if parts.password is not None else "")
+        netloc = f"{credentials}@{host}"
+    if parts.port is not None and parts.port != _DEFAULT_PORTS.get(scheme):
+        netloc += f":{parts.port}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, parts.fragment))
+
+
+def url_hash(url: str) -> str:
+    """Хеш нормализованного URL (32 шестнадцатеричных символа)"""
+    return hashlib.blake2b(normalize_url(url).encode("utf-8"), digest_size=16).hexdigest()
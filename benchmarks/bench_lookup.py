@@ -0,0 +1,80 @@
+"""Микробенчмарк: поиск ссылки для редиректа через ORM и через Core
+
+Запуск:
+    python -m benchmarks.bench_lookup [--links 10000] [--calls 20000]
+
+Измеряется процессорное время (time.process_time) на один вызов на SQLite
+в памяти, чтобы сравнивать накладные расходы Python, а не сеть.
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Link
+from app.queries import lookup_redirect, read_stats
+
+
+def setup(links: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(Link.__table__.insert(), [
+            {"original_url": f"https://example.com/{i}", "short_code": f"code{i}", "access_count": i}
+            for i in range(links)
+        ])
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def measure(name, func, codes):
+    func(codes[0])
+    started = time.process_time()
+    for code in codes:
+        func(code)
+    elapsed = time.process_time() - started
+    per_call = elapsed / len(codes) * 1e6
+    print(f"{name:<28} {per_call:8.1f} мкс/вызов")
+    return per_call
+
+
+def run(links: int = 10000, calls: int = 20000) -> dict:
+    Session = setup(links)
+    codes = [f"code{random.randrange(links)}" for _ in range(calls)]
+    db = Session()
+
+    def orm_lookup(code):
+        link = db.query(Link).filter(Link.short_code == code).first()
+        result = (link.id, link.original_url, link.expires_at)
+        # Как в запросе: сессия живет один запрос, identity map не переиспользуется
+        db.expunge_all()
+        return result
+
+    def core_lookup(code):
+        target = lookup_redirect(db, code)
+        return (target.id, target.original_url, target.expires_at)
+
+    def core_stats(code):
+        return read_stats(db, code).as_dict()
+
+    results = {
+        "orm_lookup_us": measure("ORM: Link по short_code", orm_lookup, codes),
+        "core_lookup_us": measure("Core: lookup_redirect", core_lookup, codes),
+        "core_stats_us": measure("Core: read_stats", core_stats, codes),
+    }
+    db.close()
+    reduction = 1 - results["core_lookup_us"] / results["orm_lookup_us"]
+    print(f"Снижение CPU на вызов: {reduction:.0%}")
+    results["reduction"] = reduction
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.links, args.calls)
@@ -0,0 +1,72 @@
+"""Бенчмарк редиректа: маршрут FastAPI против быстрого ASGI-пути
+
+Запуск:
+    python -m benchmarks.bench_redirect [--links 1000] [--requests 5000]
+
+Запросы `GET /{short_code}` подаются прямо в ASGI-приложение (без сети) на
+SQLite в памяти, кэш - локальная замена Redis. Все ссылки в кэше, поэтому
+сравнивается обработка попадания: маршрут FastAPI (внедрение зависимостей,
+сессия БД, JSON) и FastRedirectMiddleware. Оба варианта учитывают переход в БД.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import app.redis_client as redis_module
+from app.fast_redirect import FastRedirectMiddleware
+from app.main import app
+from app.models import Link
+from benchmarks.common import memory_database, release_database, request, use_database, use_fake_redis
+
+
+def setup(links: int):
+    engine, Session = memory_database()
+    with engine.begin() as connection:
+        connection.execute(Link.__table__.insert(), [
+            {"original_url": f"https://example.com/{i}", "short_code": f"code{i}", "access_count": 0}
+            for i in range(links)
+        ])
+    use_database(Session)
+    use_fake_redis()
+    redis_module.set_many({f"link:code{i}": f"https://example.com/{i}" for i in range(links)}, 86400)
+
+
+async def measure(name, asgi, paths, expected):
+    await request(asgi, paths[0])
+    started = time.perf_counter()
+    for path in paths:
+        status = await request(asgi, path)
+        assert status == expected, f"{name}: {status}"
+    rps = len(paths) / (time.perf_counter() - started)
+    print(f"{name:<32} {rps:10.0f} запросов/с")
+    return rps
+
+
+def run(links: int = 1000, requests: int = 5000) -> dict:
+    setup(links)
+    paths = [f"/code{random.randrange(links)}" for _ in range(requests)]
+    loop = asyncio.new_event_loop()
+    try:
+        results = {
+            "route_rps": loop.run_until_complete(measure("Маршрут FastAPI (JSON)", app.router, paths, 200)),
+            "fast_json_rps": loop.run_until_complete(measure(
+                "Быстрый путь (JSON)", FastRedirectMiddleware(app.router, application=app, mode="json"), paths, 200
+            )),
+            "fast_redirect_rps": loop.run_until_complete(measure(
+                "Быстрый путь (302)", FastRedirectMiddleware(app.router, application=app, mode="302"), paths, 302
+            )),
+        }
+    finally:
+        loop.close()
+        release_database()
+    print(f"Ускорение: {results['fast_json_rps'] / results['route_rps']:.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    run(args.links, args.requests)
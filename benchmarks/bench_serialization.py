@@ -0,0 +1,82 @@
+"""Бенчмарк сериализации списков ссылок
+
+Запуск:
+    python -m benchmarks.bench_serialization [--sizes 100,10000] [--repeat 20]
+
+Сравниваются два пути от запроса к БД до байтов ответа на SQLite в памяти:
+ORM-сущности + валидация через schemas.Link (как в FastAPI с response_model)
+и выборка столбцов + orjson (app.serialization).
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Link
+from app.schemas import Link as LinkResponse
+from app.serialization import LINK_COLUMNS, dump_links
+
+
+def setup(size: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(Link.__table__.insert(), [
+            {"original_url": f"https://example.com/{i}", "short_code": f"code{i}", "access_count": i, "project": "bench"}
+            for i in range(size)
+        ])
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def measure(name, func, repeat):
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        size = len(func())
+    elapsed = (time.perf_counter() - started) / repeat * 1000
+    print(f"  {name:<28} {elapsed:9.2f} мс/ответ ({size} байт)")
+    return elapsed
+
+
+def run(sizes=(100, 10000), repeat: int = 20) -> dict:
+    field = create_response_field(name="bench", type_=List[LinkResponse])
+    loop = asyncio.new_event_loop()
+    results = {}
+    try:
+        for size in sizes:
+            db = setup(size)
+
+            def pydantic_path():
+                links = db.query(Link).filter(Link.project == "bench").all()
+                content = loop.run_until_complete(serialize_response(field=field, response_content=links))
+                db.expunge_all()
+                return JSONResponse(content).body
+
+            def fast_path():
+                return dump_links(db.query(*LINK_COLUMNS).filter(Link.project == "bench").all())
+
+            print(f"{size} ссылок:")
+            pydantic_ms = measure("ORM + pydantic + json", pydantic_path, repeat)
+            fast_ms = measure("Столбцы + orjson", fast_path, repeat)
+            print(f"  Ускорение: {pydantic_ms / fast_ms:.1f}x")
+            results[size] = {"pydantic_ms": pydantic_ms, "fast_ms": fast_ms}
+            db.close()
+    finally:
+        loop.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,10000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run([int(size) for size in args.sizes.split(",")], args.repeat)
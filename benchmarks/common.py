@@ -0,0 +1,134 @@
+"""Общие помощники бенчмарков: БД в памяти, замена Redis и вызов ASGI-приложения"""
+import json
+import time
+from contextlib import AsyncExitStack
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.redis_client as redis_module
+from app.database import Base, get_db, get_read_db
+from app.main import app
+from tests.redis_stub import FakeRedis
+
+
+def memory_database():
+    """SQLite в памяти со схемой приложения
+
+    Returns:
+        Tuple[Engine, sessionmaker]: Движок и фабрика сессий
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def use_database(Session):
+    """Подключить приложение к фабрике сессий через переопределения get_db"""
+    def bench_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = bench_get_db
+    app.dependency_overrides[get_read_db] = bench_get_db
+
+
+def release_database():
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_read_db, None)
+
+
+def use_fake_redis(name: str = "bench") -> FakeRedis:
+    """Заменить узлы Redis одной локальной заменой в памяти"""
+    fake = FakeRedis(name)
+    redis_module.configure_nodes({name: fake})
+    redis_module.local_cache.clear()
+    return fake
+
+
+async def request(asgi, path: str, method: str = "GET", body: Optional[dict] = None,
+                  headers: Optional[Dict[str, str]] = None) -> int:
+    """Выполнить HTTP-запрос прямо в ASGI-приложении (без сети)
+
+    Returns:
+        int: Статус ответа
+    """
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    raw_headers = [(b"host", b"bench"), (b"user-agent", b"bench")]
+    if body is not None:
+        raw_headers.append((b"content-type", b"application/json"))
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode("latin-1"), value.encode("latin-1")))
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query.encode(),
+        "headers": raw_headers, "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    status = None
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    # Стек для зависимостей с yield, как его создает FastAPI.__call__
+    async with AsyncExitStack() as stack:
+        scope["fastapi_astack"] = stack
+        await asgi(scope, receive, send)
+    return status
+
+
+def summarize(timings: List[float]) -> dict:
+    """Сводка по времени операций: пропускная способность и перцентили в мс"""
+    ordered = sorted(timings)
+
+    def percentile(p):
+        return ordered[min(int(len(ordered) * p), len(ordered) - 1)] * 1000
+
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "ops_per_sec": len(ordered) / total if total else 0.0,
+        "mean_ms": total / len(ordered) * 1000,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def measure(func: Callable[[int], object], count: int, prepare: Callable[[int], object] = None) -> dict:
+    """Замерить count вызовов func(i); prepare(i) выполняется вне замера"""
+    timings = []
+    for i in range(count):
+        if prepare is not None:
+            prepare(i)
+        started = time.perf_counter()
+        func(i)
+        timings.append(time.perf_counter() - started)
+    return summarize(timings)
+
+
+async def measure_async(func, count: int, prepare: Callable[[int], object] = None) -> dict:
+    """То же, что measure, для корутин"""
+    timings = []
+    for i in range(count):
+        if prepare is not None:
+            prepare(i)
+        started = time.perf_counter()
+        await func(i)
+        timings.append(time.perf_counter() - started)
+    return summarize(timings)
@@ -0,0 +1,290 @@
+"""Воспроизводимый набор бенчмарков основных операций
+
+Запуск:
+    python -m benchmarks.suite [--output results.json] [--quick]
+    python -m benchmarks.suite --output new.json --compare baseline.json [--threshold 0.15]
+
+Работает без внешних сервисов: SQLite в памяти и локальная замена Redis,
+HTTP-запросы подаются прямо в ASGI-приложение (со всеми middleware).
+Случайные данные берутся из генератора с фиксированным seed.
+
+Измеряются:
+- generate_short_code и создание ссылок через `POST /links/shorten`;
+- редирект при попадании и промахе кэша (кэш сбрасывается вне замера);
+- поиск по URL на таблицах разного размера (каждый запрос уникален, кэш не помогает);
+- чтение статистики из БД и из кэша;
+- задачи очистки истекших и неактивных ссылок на больших наборах.
+
+Результаты сохраняются в JSON вместе с коммитом и версиями. С --compare
+для каждого результата сравнивается пропускная способность (ops_per_sec)
+с базовым файлом; падение больше порога дает код выхода 1.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import sqlalchemy
+
+from app.main import app
+from app.models import Link, LinkStat
+from app.redis_client import clear_link_cache, delete_cache
+from app.routers.links import generate_short_code
+from app.tasks import cleanup_expired_links, cleanup_inactive_links
+from benchmarks.common import (
+    measure, measure_async, memory_database, release_database, request, use_database, use_fake_redis
+)
+
+SEED = 20240601
+
+# Параметры полного и быстрого прогонов
+PROFILES = {
+    "full": {
+        "codes": 100000, "creates": 2000, "links": 10000, "redirects": 5000,
+        "search_sizes": [1000, 10000, 50000], "searches": 200, "stats": 2000,
+        "cleanup_sizes": [10000, 50000],
+    },
+    "quick": {
+        "codes": 10000, "creates": 200, "links": 1000, "redirects": 500,
+        "search_sizes": [1000, 5000], "searches": 50, "stats": 200,
+        "cleanup_sizes": [2000],
+    },
+}
+
+
+def seed_links(engine, count: int, expired: int = 0, stats_per_link: int = 0, stale_stats: int = 0):
+    """Заполнить таблицы ссылками и статистикой одним executemany на таблицу
+
+    Args:
+        engine: Движок БД
+        count (int): Количество ссылок (коды code0..codeN-1)
+        expired (int): Сколько первых ссылок уже истекли
+        stats_per_link (int): Записей статистики на каждую ссылку
+        stale_stats (int): Сколько ссылок (после истекших) не использовались больше 30 дней
+    """
+    now = datetime.utcnow()
+    links = [
+        {
+            "id": i + 1,
+            "original_url": f"https://example.com/page/{i}",
+            "short_code": f"code{i}",
+            "access_count": i % 100,
+            "is_active": True,
+            "permanent": False,
+            "expires_at": now - timedelta(days=1) if i < expired else None,
+        }
+        for i in range(count)
+    ]
+    stats = []
+    for i in range(count):
+        stale = expired <= i < expired + stale_stats
+        accessed_at = now - timedelta(days=60) if stale else now - timedelta(hours=1)
+        stats.extend(
+            {"link_id": i + 1, "accessed_at": accessed_at, "ip_address": "127.0.0.1"}
+            for _ in range(stats_per_link)
+        )
+    with engine.begin() as connection:
+        connection.execute(Link.__table__.insert(), links)
+        if stats:
+            connection.execute(LinkStat.__table__.insert(), stats)
+
+
+def fresh_database():
+    engine, Session = memory_database()
+    use_database(Session)
+    return engine, Session
+
+
+def bench_short_codes(params: dict) -> dict:
+    return {"generate_short_code": measure(lambda i: generate_short_code(), params["codes"])}
+
+
+def bench_create(loop, params: dict) -> dict:
+    fresh_database()
+    use_fake_redis()
+    body = {"original_url": "https://example.com/new"}
+
+    async def create(i):
+        status = await request(app, "/links/shorten", method="POST", body=body)
+        assert status == 200, f"create: {status}"
+
+    return {"create_link": loop.run_until_complete(measure_async(create, params["creates"]))}
+
+
+def bench_redirect(loop, params: dict, rng: random.Random) -> dict:
+    engine, _ = fresh_database()
+    use_fake_redis()
+    links = params["links"]
+    seed_links(engine, links)
+    codes = [f"code{rng.randrange(links)}" for _ in range(params["redirects"])]
+
+    async def redirect(i):
+        status = await request(app, f"/{codes[i]}")
+        assert status == 200, f"redirect: {status}"
+
+    # Первый проход заполняет кэш; промахи замеряются после сброса ключа
+    loop.run_until_complete(measure_async(redirect, len(codes)))
+    hit = loop.run_until_complete(measure_async(redirect, len(codes)))
+    miss = loop.run_until_complete(measure_async(redirect, len(codes), prepare=lambda i: clear_link_cache(codes[i])))
+    return {"redirect_hit": hit, "redirect_miss": miss}
+
+
+def bench_search(loop, params: dict, rng: random.Random) -> dict:
+    results = {}
+    for size in params["search_sizes"]:
+        engine, _ = fresh_database()
+        use_fake_redis()
+        seed_links(engine, size)
+        # Уникальная строка в каждом запросе: ключ кэша поиска не повторяется
+        terms = [f"page/{rng.randrange(size)}&n={i}" for i in range(params["searches"])]
+
+        async def search(i):
+            status = await request(app, f"/links/search?original_url={terms[i]}")
+            assert status == 200, f"search: {status}"
+
+        results[f"search_{size}"] = loop.run_until_complete(measure_async(search, len(terms)))
+    return results
+
+
+def bench_stats(loop, params: dict, rng: random.Random) -> dict:
+    engine, _ = fresh_database()
+    use_fake_redis()
+    links = params["links"]
+    seed_links(engine, links, stats_per_link=5)
+    codes = [f"code{rng.randrange(links)}" for _ in range(params["stats"])]
+
+    async def stats(i):
+        status = await request(app, f"/links/{codes[i]}/stats")
+        assert status == 200, f"stats: {status}"
+
+    cold = loop.run_until_complete(measure_async(stats, len(codes), prepare=lambda i: delete_cache(f"stats:{codes[i]}")))
+    cached = loop.run_until_complete(measure_async(stats, len(codes)))
+    return {"stats_cold": cold, "stats_cached": cached}
+
+
+def run_cleanup(loop, job, size: int, **seed) -> dict:
+    """Однократный замер задачи очистки; ops_per_sec - удаленные ссылки в секунду"""
+    engine, Session = fresh_database()
+    use_fake_redis()
+    seed_links(engine, size, **seed)
+    db = Session()
+    try:
+        started = time.perf_counter()
+        deleted = loop.run_until_complete(job(db))
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+    return {"count": deleted, "seconds": elapsed, "ops_per_sec": deleted / elapsed if elapsed else 0.0}
+
+
+def bench_cleanup(loop, params: dict) -> dict:
+    results = {}
+    for size in params["cleanup_sizes"]:
+        # Четверть ссылок истекла, еще четверть давно не использовалась
+        results[f"cleanup_expired_{size}"] = run_cleanup(
+            loop, cleanup_expired_links, size, expired=size // 4, stats_per_link=1
+        )
+        results[f"cleanup_inactive_{size}"] = run_cleanup(
+            loop, cleanup_inactive_links, size, stats_per_link=1, stale_stats=size // 4
+        )
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(profile: str = "full") -> dict:
+    """Выполнить все бенчмарки
+
+    Args:
+        profile (str): Набор параметров из PROFILES
+
+    Returns:
+        dict: {"meta": {...}, "results": {название: сводка}}
+    """
+    params = PROFILES[profile]
+    random.seed(SEED)
+    rng = random.Random(SEED)
+    loop = asyncio.new_event_loop()
+    results = {}
+    try:
+        results.update(bench_short_codes(params))
+        results.update(bench_create(loop, params))
+        results.update(bench_redirect(loop, params, rng))
+        results.update(bench_search(loop, params, rng))
+        results.update(bench_stats(loop, params, rng))
+        results.update(bench_cleanup(loop, params))
+    finally:
+        loop.close()
+        release_database()
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "profile": profile,
+            "params": params,
+            "seed": SEED,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Результаты, пропускная способность которых упала больше чем на threshold
+
+    Returns:
+        list: Строки с описанием регрессий
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or not base.get("ops_per_sec"):
+            continue
+        change = result["ops_per_sec"] / base["ops_per_sec"] - 1
+        print(f"{name:<28} {base['ops_per_sec']:12.1f} -> {result['ops_per_sec']:12.1f} ops/s ({change:+.1%})")
+        if change < -threshold:
+            regressions.append(f"{name}: {change:+.1%}")
+    return regressions
+
+
+def report(data: dict):
+    for name, result in data["results"].items():
+        line = f"{name:<28} {result['ops_per_sec']:12.1f} ops/s"
+        if "p95_ms" in result:
+            line += f"   p50 {result['p50_ms']:8.3f} мс   p95 {result['p95_ms']:8.3f} мс   p99 {result['p99_ms']:8.3f} мс"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Файл для результатов в JSON")
+    parser.add_argument("--quick", action="store_true", help="Уменьшенные размеры данных")
+    parser.add_argument("--compare", help="Базовый файл результатов для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Допустимое падение пропускной способности")
+    args = parser.parse_args()
+
+    data = run("quick" if args.quick else "full")
+    report(data)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(data, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(data, json.load(baseline_file), args.threshold)
+        if regressions:
+            print("Регрессии: " + ", ".join(regressions))
+            sys.exit(1)
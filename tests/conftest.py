@@ -2,8 +2,13 @@ import pytest
 from unittest.mock import Mock
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from app.database import Base
-from app.redis_client import redis_client
+from sqlalchemy.pool import StaticPool
+from app.database import Base, get_db, get_read_db
+import app.redis_client as redis_module
+from app.redis_client import redis_client, redis_breaker, local_cache
+from tests.redis_stub import FakeRedis
+
+pytest_plugins = ["tests.query_budget_plugin"]
 
 @pytest.fixture(scope="function")
 def db_session():
@@ -43,6 +48,9 @@ def mock_redis():
     
     # Мокируем метод incr 
     mock_client.incr.return_value = 1
+
+    # Мокируем метод publish (события живой статистики)
+    mock_client.publish.return_value = 0
     
     # Заменяем реальный клиент Redis на мок-клиент
     redis_client.connection_pool = mock_client
@@ -51,5 +59,49 @@ def mock_redis():
     redis_client.delete = mock_client.delete
     redis_client.exists = mock_client.exists
     redis_client.incr = mock_client.incr
+    redis_client.publish = mock_client.publish
     
-    return mock_client
\ No newline at end of file
+    # Сбрасываем автоматический выключатель и кэш процесса между тестами
+    redis_breaker.reset()
+    local_cache.clear()
+    
+    return mock_client
+
+@pytest.fixture
+def fake_redis_nodes():
+    """Фабрика узлов кэша на локальных заменах Redis (с внедрением отказов)"""
+    saved_nodes = dict(redis_module.nodes)
+    saved_ring = redis_module.hash_ring
+
+    def configure(*names):
+        fakes = {name: FakeRedis(name) for name in names}
+        redis_module.configure_nodes(fakes)
+        return fakes
+
+    yield configure
+
+    redis_module.nodes.clear()
+    redis_module.nodes.update(saved_nodes)
+    redis_module.hash_ring = saved_ring
+    local_cache.clear()
+
+
+@pytest.fixture
+def app_db(monkeypatch):
+    """Отдельная БД в памяти, подключенная к приложению через переопределения get_db"""
+    from app.main import app
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, override_get_db)
+    return Session
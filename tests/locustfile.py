@@ -1,20 +1,123 @@
-from locust import HttpUser, task, between, events
-from faker import Faker
+"""Нагрузочное тестирование с моделями реальной нагрузки
+
+Запуск без веб-интерфейса против локального сервера:
+    locust -f tests/locustfile.py --headless --host http://localhost:8000
+
+Нагрузка идет фазами (WorkloadShape), длительность каждой - LOAD_STAGE_SECONDS:
+1. steady - анонимные пользователи переходят по ссылкам с частотой по закону
+   Ципфа (несколько ссылок получают большую часть переходов), авторизованные
+   пользователи работают со своими ссылками;
+2. burst - всплеск создания ссылок;
+3. cold - кэш сбрасывается (FLUSHDB по LOAD_REDIS_URL, если задан), переходы
+   равномерно распределены по всему корпусу, включая "хвост" без кэша;
+4. steady - восстановление после холодного кэша.
+
+Корпус ссылок создается при старте (LOAD_CORPUS_SIZE ссылок) или читается из
+LOAD_CORPUS_FILE (`код<TAB>URL` в строке; при распределенном запуске
+лучше файл, иначе корпус создает каждый воркер). По завершении проверяются SLA:
+p95, p99 и доля ошибок; при нарушении код выхода - 1.
+"""
+import itertools
+import os
 import random
-import time
+
+from faker import Faker
+from locust import HttpUser, LoadTestShape, between, constant_throughput, events, task
 
 fake = Faker()
 
+# Корпус ссылок
+LOAD_CORPUS_SIZE = int(os.getenv("LOAD_CORPUS_SIZE", "500"))
+LOAD_CORPUS_FILE = os.getenv("LOAD_CORPUS_FILE")
+# Параметр распределения Ципфа (чем больше, тем сильнее перекос к популярным ссылкам)
+LOAD_ZIPF_S = float(os.getenv("LOAD_ZIPF_S", "1.1"))
+# Переходов в секунду на одного анонимного пользователя
+LOAD_REDIRECT_RATE = float(os.getenv("LOAD_REDIRECT_RATE", "10"))
+# Фазы нагрузки
+LOAD_STAGE_SECONDS = int(os.getenv("LOAD_STAGE_SECONDS", "60"))
+LOAD_USERS = int(os.getenv("LOAD_USERS", "50"))
+LOAD_BURST_USERS = int(os.getenv("LOAD_BURST_USERS", "20"))
+# Redis локального сервера для фазы холодного кэша (не задан - кэш не сбрасывается)
+LOAD_REDIS_URL = os.getenv("LOAD_REDIS_URL")
+# SLA
+SLA_P95_MS = float(os.getenv("SLA_P95_MS", "200"))
+SLA_P99_MS = float(os.getenv("SLA_P99_MS", "500"))
+SLA_ERROR_RATE = float(os.getenv("SLA_ERROR_RATE", "0.01"))
+
+# Короткие коды и URL корпуса; популярность убывает с индексом
+corpus_codes = []
+corpus_urls = []
+zipf_weights = []
+# Текущая фаза нагрузки (устанавливает WorkloadShape)
+current_phase = "steady"
+
+
+def load_corpus(session, host: str):
+    """Заполнить корпус из файла или созданием ссылок через API
+
+    Args:
+        session (requests.Session): HTTP-сессия
+        host (str): Адрес тестируемого сервера
+    """
+    if corpus_codes:
+        return
+    if LOAD_CORPUS_FILE:
+        # Строка файла: короткий код и, через табуляцию, оригинальный URL
+        with open(LOAD_CORPUS_FILE) as corpus_file:
+            for line in corpus_file:
+                fields = line.rstrip("\n").split("\t")
+                if fields[0]:
+                    corpus_codes.append(fields[0])
+                    corpus_urls.append(fields[-1])
+    else:
+        for _ in range(LOAD_CORPUS_SIZE):
+            url = f"{fake.url()}{fake.uri_path()}"
+            response = session.post(f"{host.rstrip('/')}/links/shorten", json={"original_url": url})
+            if response.status_code == 200:
+                corpus_codes.append(response.json()["short_code"])
+                corpus_urls.append(url)
+    # Накопленные веса 1/k^s: выбор популярной ссылки - двоичный поиск в random.choices
+    zipf_weights.extend(itertools.accumulate(1 / rank ** LOAD_ZIPF_S for rank in range(1, len(corpus_codes) + 1)))
+    print(f"Корпус: {len(corpus_codes)} ссылок")
+
+
+def popular_index() -> int:
+    """Индекс ссылки корпуса: по Ципфу, а в фазе cold - равномерно"""
+    if current_phase == "cold":
+        return random.randrange(len(corpus_codes))
+    return random.choices(range(len(corpus_codes)), cum_weights=zipf_weights)[0]
+
+
+class RedirectUser(HttpUser):
+    """Анонимный пользователь, который только переходит по ссылкам"""
+    wait_time = constant_throughput(LOAD_REDIRECT_RATE)
+
+    @task
+    def redirect(self):
+        if not corpus_codes:
+            return
+        # Редирект не выполняем: оригинальные URL указывают на внешние сайты
+        self.client.get(f"/{corpus_codes[popular_index()]}", name="/redirect", allow_redirects=False)
+
+
+class CreatorUser(HttpUser):
+    """Анонимный пользователь, создающий ссылки без пауз (всплеск создания)"""
+    wait_time = between(0, 0.1)
+
+    @task
+    def create_short_link(self):
+        self.client.post("/links/shorten", json={"original_url": fake.url()}, name="/links/shorten [burst]")
+
+
 class URLShortenerUser(HttpUser):
-    host = "http://localhost:8000"
     wait_time = between(1, 3)
-    
+
     def on_start(self):
         """Авторизация пользователя перед началом тестов"""
         # Генерируем данные пользователя
         self.user_email = fake.email()
         self.user_password = "test_password123"
-        
+
         # Регистрация тестового пользователя
         register_response = self.client.post(
             "/auth/register",
@@ -23,7 +126,7 @@ class URLShortenerUser(HttpUser):
                 "password": self.user_password
             }
         )
-        
+
         if register_response.status_code != 200:
             # Если пользователь уже существует, пробуем войти
             response = self.client.post(
@@ -35,12 +138,12 @@ class URLShortenerUser(HttpUser):
             )
         else:
             response = register_response
-        
+
         # Сохраняем токен для последующих запросов
         self.token = response.json()["access_token"]
         self.headers = {"Authorization": f"Bearer {self.token}"}
         self.my_links = []
-    
+
     @task(3)
     def create_short_link(self):
         """Создание короткой ссылки"""
@@ -54,39 +157,36 @@ class URLShortenerUser(HttpUser):
         )
         if response.status_code == 200:
             self.my_links.append(response.json()["short_code"])
-    
+
     @task(5)
     def redirect_to_original(self):
-        """Переход по короткой ссылке"""
-        if not self.my_links:
-            # Если нет своих ссылок, создаем новую
-            response = self.client.post(
-                "/links/shorten",
-                headers=self.headers,
-                json={"original_url": fake.url()}
-            )
-            if response.status_code == 200:
-                short_code = response.json()["short_code"]
-                self.my_links.append(short_code)
-        else:
-            # Используем случайную существующую ссылку
+        """Переход по популярной ссылке корпуса или по своей ссылке"""
+        if corpus_codes:
+            short_code = corpus_codes[popular_index()]
+        elif self.my_links:
             short_code = random.choice(self.my_links)
-        
+        else:
+            return
+
         # Выполняем редирект
         self.client.get(
             f"/{short_code}",
-            name="/redirect"
+            name="/redirect",
+            allow_redirects=False
         )
-    
+
     @task(2)
     def search_links(self):
-        """Поиск ссылок"""
+        """Поиск ссылок: популярные URL ищут чаще"""
+        if not corpus_urls:
+            return
         self.client.get(
-            "/links/search?original_url=example",  # Исправлено: query -> original_url
+            "/links/search",
+            params={"original_url": corpus_urls[popular_index()]},
             headers=self.headers,
             name="/links/search"
         )
-    
+
     @task(1)
     def get_link_info(self):
         """Получение информации о ссылке"""
@@ -97,7 +197,7 @@ class URLShortenerUser(HttpUser):
                 headers=self.headers,
                 name="/links/info"
             )
-    
+
     @task(1)
     def update_link(self):
         """Обновление ссылки"""
@@ -110,10 +210,76 @@ class URLShortenerUser(HttpUser):
                 name="/links/update"
             )
 
+
+def flush_cache():
+    """Сбросить кэш локального сервера перед фазой cold"""
+    if not LOAD_REDIS_URL:
+        print("LOAD_REDIS_URL не задан: фаза cold без сброса кэша (только равномерные переходы)")
+        return
+    import redis
+    redis.from_url(LOAD_REDIS_URL).flushdb()
+    print("Кэш сброшен")
+
+
+class WorkloadShape(LoadTestShape):
+    """Фазы нагрузки: steady, burst, cold, steady"""
+
+    stages = [
+        ("steady", LOAD_USERS, [RedirectUser, URLShortenerUser]),
+        ("burst", LOAD_USERS + LOAD_BURST_USERS, [RedirectUser, CreatorUser]),
+        ("cold", LOAD_USERS, [RedirectUser]),
+        ("steady", LOAD_USERS, [RedirectUser, URLShortenerUser]),
+    ]
+
+    def tick(self):
+        global current_phase
+        index = int(self.get_run_time() // LOAD_STAGE_SECONDS)
+        if index >= len(self.stages):
+            return None
+        phase, users, user_classes = self.stages[index]
+        if phase != current_phase:
+            print(f"Фаза нагрузки: {phase}")
+            if phase == "cold":
+                flush_cache()
+            current_phase = phase
+        return users, users, user_classes
+
+
+def check_sla(environment) -> list:
+    """Нарушения SLA по итоговой статистике прогона"""
+    total = environment.stats.total
+    if not total.num_requests:
+        return ["нет ни одного запроса"]
+    failures = []
+    p95 = total.get_response_time_percentile(0.95)
+    p99 = total.get_response_time_percentile(0.99)
+    if p95 > SLA_P95_MS:
+        failures.append(f"p95 {p95:.0f} мс > {SLA_P95_MS:.0f} мс")
+    if p99 > SLA_P99_MS:
+        failures.append(f"p99 {p99:.0f} мс > {SLA_P99_MS:.0f} мс")
+    if total.fail_ratio > SLA_ERROR_RATE:
+        failures.append(f"доля ошибок {total.fail_ratio:.2%} > {SLA_ERROR_RATE:.2%}")
+    return failures
+
+
 @events.test_start.add_listener
 def on_test_start(environment, **kwargs):
     print("Начало нагрузочного тестирования...")
+    import requests
+    with requests.Session() as session:
+        load_corpus(session, environment.host)
+
 
 @events.test_stop.add_listener
 def on_test_stop(environment, **kwargs):
-    print("Завершение нагрузочного тестирования...")
\ No newline at end of file
+    print("Завершение нагрузочного тестирования...")
+
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    failures = check_sla(environment)
+    if failures:
+        print("SLA нарушено: " + "; ".join(failures))
+        environment.process_exit_code = 1
+    else:
+        print("SLA выполнено")
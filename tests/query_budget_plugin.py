@@ -0,0 +1,28 @@
+"""Плагин pytest: тест падает, если маршрут превысил бюджет запросов к БД
+
+Подключается в conftest.py. Во время каждого теста включен строгий режим
+app.query_budget: превышения бюджетов `@query_budget(...)` и повторяющиеся
+запросы (N+1) собираются и после теста приводят к ошибке. Тесты с меткой
+`no_query_budget` (например, запросы ко всем шардам) не проверяются.
+"""
+import pytest
+
+from app import query_budget
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "no_query_budget: не проверять бюджеты запросов к БД")
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets(request, monkeypatch):
+    if request.node.get_closest_marker("no_query_budget"):
+        yield
+        return
+    monkeypatch.setattr(query_budget, "strict", True)
+    query_budget.violations.clear()
+    yield
+    found = list(query_budget.violations)
+    query_budget.violations.clear()
+    if found:
+        pytest.fail("Превышен бюджет запросов к БД:\n" + "\n".join(repr(v) for v in found), pytrace=False)
@@ -0,0 +1,143 @@
+import time
+import redis
+
+
+class FakeRedis:
+    """Локальная замена Redis в памяти с возможностью внедрения отказов
+
+    Пока атрибут `fail` равен True, любая команда вызывает redis.ConnectionError.
+    Счетчик `calls` позволяет проверить, дошел ли вызов до "сервера".
+    """
+
+    def __init__(self, name="fake"):
+        self.name = name
+        self.fail = False
+        self.calls = 0
+        self.store = {}
+        self.subscribers = []
+
+    def _check(self):
+        self.calls += 1
+        if self.fail:
+            raise redis.ConnectionError(f"{self.name}: connection refused")
+
+    def _alive(self, key):
+        item = self.store.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at < time.monotonic():
+            del self.store[key]
+            return None
+        return value
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def ping(self):
+        self._check()
+        return True
+
+    def get(self, key):
+        self._check()
+        return self._alive(key)
+
+    def mget(self, keys, *args):
+        self._check()
+        keys = list(keys) + list(args)
+        return [self._alive(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self._check()
+        expires_at = time.monotonic() + ex if ex else None
+        self.store[key] = (self._encode(value), expires_at)
+        return True
+
+    def setex(self, key, ttl, value):
+        return self.set(key, value, ex=ttl)
+
+    def delete(self, *keys):
+        self._check()
+        return sum(1 for key in keys if self.store.pop(key, None) is not None)
+
+    def exists(self, key):
+        self._check()
+        return int(self._alive(key) is not None)
+
+    def incr(self, key):
+        self._check()
+        value = int(self._alive(key) or 0) + 1
+        expires_at = self.store.get(key, (None, None))[1]
+        self.store[key] = (self._encode(value), expires_at)
+        return value
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    def publish(self, channel, message):
+        self._check()
+        receivers = [pubsub for pubsub in self.subscribers if channel in pubsub.channels]
+        for pubsub in receivers:
+            pubsub.messages.append({"type": "message", "channel": channel.encode(), "data": self._encode(message)})
+        return len(receivers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        pubsub = FakePubSub(self)
+        self.subscribers.append(pubsub)
+        return pubsub
+
+
+class FakePubSub:
+    """Подписка FakeRedis: сообщения копятся до get_message()"""
+
+    def __init__(self, client):
+        self.client = client
+        self.channels = set()
+        self.messages = []
+
+    def subscribe(self, *channels):
+        self.client._check()
+        self.channels.update(channels)
+
+    def unsubscribe(self, *channels):
+        self.client._check()
+        self.channels.difference_update(channels)
+
+    def get_message(self, timeout=0):
+        self.client._check()
+        return self.messages.pop(0) if self.messages else None
+
+    def close(self):
+        self.channels.clear()
+        if self in self.client.subscribers:
+            self.client.subscribers.remove(self)
+
+
+class FakePipeline:
+    """Конвейер команд для FakeRedis: команды копятся и выполняются в execute()"""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        self.client._check()
+        commands, self.commands = self.commands, []
+        return [method(*args, **kwargs) for method, args, kwargs in commands]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.commands = []
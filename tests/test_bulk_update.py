@@ -0,0 +1,97 @@
+import json
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+import app.bulk_update as bulk_update
+from app.main import app
+from app.models import Link
+from app.redis_client import get_cache, set_cache
+
+client = TestClient(app)
+
+def register(email):
+    client.post("/auth/register", json={"email": email, "password": "testpassword"})
+    response = client.post("/auth/token", data={"username": email, "password": "testpassword"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def create_project(headers, project, count):
+    codes = []
+    for i in range(count):
+        response = client.post(
+            "/links/shorten", json={"original_url": f"https://example.com/{project}/{i}", "project": project},
+            headers=headers
+        )
+        codes.append(response.json()["short_code"])
+    return codes
+
+def test_delete_project(app_db, fake_redis_nodes):
+    """Тест удаления проекта с очисткой кэша"""
+    fake_redis_nodes("node-a", "node-b")
+    alice, bob = register("alice@example.com"), register("bob@example.com")
+    codes = create_project(alice, "docs", 5)
+    kept = create_project(alice, "blog", 1) + create_project(bob, "docs", 1)
+    for code in codes:
+        set_cache(f"stats:{code}", {"access_count": 1})
+
+    response = client.delete("/links/projects/docs", headers=alice)
+
+    assert response.status_code == 200
+    assert response.json() == {"deleted": 5}
+    assert all(client.get(f"/links/{code}/redirect/", allow_redirects=False).status_code == 404 for code in codes)
+    assert all(get_cache(f"stats:{code}") is None for code in codes)
+    assert client.get("/links/projects/docs", headers=alice).json() == []
+    assert all(client.get(f"/links/{code}").status_code == 200 for code in kept)
+    assert client.delete("/links/projects/docs", headers=alice).status_code == 404
+
+    db = app_db()
+    assert db.query(Link).filter(Link.is_active.is_(False)).count() == 5
+    db.close()
+
+def test_update_project_expiry(app_db, fake_redis_nodes):
+    """Тест установки срока действия всем ссылкам проекта"""
+    fake_redis_nodes("node-a")
+    alice = register("alice@example.com")
+    codes = create_project(alice, "docs", 3)
+    assert client.get(f"/links/{codes[0]}/redirect/", allow_redirects=False).status_code == 200
+
+    response = client.patch("/links/projects/docs", json={"expires_at": "2000-01-01T00:00:00"}, headers=alice)
+
+    assert response.json() == {"updated": 3}
+    # Закэшированная ссылка не переживает изменения срока действия
+    assert client.get(f"/links/{codes[0]}/redirect/", allow_redirects=False).status_code == 410
+    db = app_db()
+    assert {link.expires_at for link in db.query(Link)} == {datetime(2000, 1, 1)}
+    db.close()
+
+    assert client.patch("/links/projects/docs", json={}, headers=alice).status_code == 400
+    assert client.patch("/links/projects/other", json={"permanent": True}, headers=alice).status_code == 404
+
+def test_update_project_chunks(db_session):
+    """Тест обработки порциями и отчета о прогрессе"""
+    db_session.add_all([
+        Link(original_url=f"https://example.com/{i}", short_code=f"chunk{i}", owner_id=1, project="docs")
+        for i in range(5)
+    ])
+    db_session.commit()
+
+    progress = list(bulk_update.iter_project_updates(db_session, 1, "docs", {"permanent": True}, chunk_size=2))
+
+    assert progress == [2, 4, 5]
+    assert db_session.query(Link).filter(Link.permanent.is_(True)).count() == 5
+    assert bulk_update.update_project_links(db_session, 1, "docs", {"permanent": False}, chunk_size=2) == 5
+
+def test_delete_project_progress_stream(app_db, fake_redis_nodes):
+    """Тест потока прогресса (NDJSON) при удалении проекта"""
+    fake_redis_nodes("node-a")
+    alice = register("alice@example.com")
+    create_project(alice, "docs", 3)
+
+    response = client.delete("/links/projects/docs", params={"progress": "true"}, headers=alice)
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"processed": 3}, {"deleted": 3}
+    ]
+    assert client.get("/links/projects/docs", headers=alice).json() == []
+    assert client.delete("/links/projects/docs", params={"progress": "true"}, headers=alice).status_code == 404
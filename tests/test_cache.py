@@ -1,7 +1,8 @@
 import pytest
 from unittest.mock import Mock
 import json
-from app.redis_client import set_cache, get_cache, delete_cache, clear_link_cache, increment_counter
+import redis
+from app.redis_client import set_cache, get_cache, delete_cache, clear_link_cache, increment_counter, get_generation, bump_generation
 
 def test_set_cache(mock_redis):
     """Тест функции установки кэша"""
@@ -67,4 +68,19 @@ def test_increment_counter(mock_redis):
     mock_redis.get.return_value = b"5"
     result = increment_counter("counter:existing")
     mock_redis.incr.assert_called_with("counter:existing")
-    assert result == 5
\ No newline at end of file
+    assert result == 5
+
+def test_generation_counter(mock_redis):
+    """Тест счетчика поколений для тегированной инвалидации"""
+    mock_redis.get.return_value = None
+    assert get_generation("search:generation") == 0
+
+    mock_redis.get.return_value = b"7"
+    assert get_generation("search:generation") == 7
+
+    bump_generation("search:generation")
+    mock_redis.incr.assert_called_with("search:generation")
+
+    # Без Redis поколение неизвестно
+    mock_redis.get.side_effect = redis.ConnectionError("connection refused")
+    assert get_generation("search:generation") is None
@@ -0,0 +1,132 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app.redis_client as redis_module
+from app.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from app.local_cache import LocalCache
+from app.main import app
+from app.redis_client import get_cache, set_cache, delete_cache, cache_health, local_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def fake_redis(fake_redis_nodes):
+    """Единственный узел кэша - локальная замена Redis с внедрением отказов"""
+    fake = fake_redis_nodes("fake")["fake"]
+    fake.breaker = redis_module.nodes["fake"].breaker
+    fake.clock = FakeClock()
+    fake.breaker._clock = fake.clock
+    return fake
+
+def test_breaker_opens_after_threshold():
+    """Тест размыкания после серии ошибок"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=10, clock=clock)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.metrics()["opened_total"] == 1
+    assert breaker.metrics()["rejected_total"] == 1
+
+def test_breaker_half_open_single_probe():
+    """Тест полуоткрытого состояния: пропускается только один пробный вызов"""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    # Ошибка пробного вызова снова размыкает цепь
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.metrics()["state_code"] == 0
+
+def test_cache_falls_back_to_local_cache(fake_redis):
+    """Тест чтения из кэша процесса, когда Redis недоступен"""
+    set_cache("link:abc", "https://example.com")
+    assert fake_redis.get("link:abc") == b"https://example.com"
+
+    fake_redis.fail = True
+    assert get_cache("link:abc") == "https://example.com"
+    assert get_cache("link:missing") is None
+
+def test_cache_skips_redis_when_open(fake_redis):
+    """Тест пропуска обращений к Redis при разомкнутом выключателе"""
+    fake_redis.fail = True
+    for _ in range(fake_redis.breaker.failure_threshold):
+        get_cache("link:abc")
+    assert fake_redis.breaker.state == OPEN
+
+    calls = fake_redis.calls
+    set_cache("link:abc", "https://example.com")
+    delete_cache("stats:abc")
+    assert fake_redis.calls == calls
+    assert get_cache("link:abc") == "https://example.com"
+
+def test_cache_recovers_after_probe(fake_redis):
+    """Тест восстановления после успешного пробного запроса"""
+    fake_redis.fail = True
+    for _ in range(fake_redis.breaker.failure_threshold):
+        get_cache("link:abc")
+    assert fake_redis.breaker.state == OPEN
+
+    fake_redis.fail = False
+    fake_redis.clock.now += fake_redis.breaker.recovery_timeout
+    set_cache("link:abc", "https://example.com")
+    assert fake_redis.breaker.state == CLOSED
+    assert fake_redis.get("link:abc") == b"https://example.com"
+
+def test_invalidations_replayed_after_recovery(fake_redis, app_db):
+    """Тест: изменение ссылки при разомкнутом выключателе доходит до Redis после восстановления"""
+    client = TestClient(app)
+    client.post("/auth/register", json={"email": "alice@example.com", "password": "testpassword"})
+    token = client.post("/auth/token", data={"username": "alice@example.com", "password": "testpassword"})
+    headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+    code = client.post("/links/shorten", json={"original_url": "https://example.com/old"}, headers=headers).json()["short_code"]
+    assert client.get(f"/links/{code}/redirect/").json() == {"url": "https://example.com/old"}
+
+    fake_redis.fail = True
+    for _ in range(fake_redis.breaker.failure_threshold):
+        get_cache("link:missing")
+    assert fake_redis.breaker.state == OPEN
+    client.put(f"/links/{code}", json={"original_url": "https://example.com/new"}, headers=headers)
+    assert cache_health()["fake"]["pending_invalidations"] >= 1
+
+    # Redis вернулся со старой записью; кэш процесса уже истек (или это другой воркер)
+    fake_redis.fail = False
+    fake_redis.clock.now += fake_redis.breaker.recovery_timeout
+    local_cache.clear()
+
+    assert client.get(f"/links/{code}/redirect/").json() == {"url": "https://example.com/new"}
+    assert fake_redis.breaker.state == CLOSED
+    assert cache_health()["fake"]["pending_invalidations"] == 0
+
+def test_local_cache_ttl():
+    """Тест истечения записей кэша процесса"""
+    clock = FakeClock()
+    cache = LocalCache(maxsize=2, ttl=5, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=100)
+    cache.set("c", 3)
+    # Самая старая запись вытеснена по LRU
+    assert cache.get("a") is None
+    clock.now += 6
+    # TTL ограничен собственным TTL кэша
+    assert cache.get("b") is None
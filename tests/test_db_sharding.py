@@ -0,0 +1,163 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+
+from app.main import app
+from app.database import Base, get_db, get_read_db
+from app.models import Link, LinkStat, Project
+from app.queries import adjust_project_counts, read_projects
+from app.reshard import reshard
+from app.sharding import ShardRouter
+from app.tasks import purge_deleted_links
+
+client = TestClient(app)
+
+
+def make_router(tmp_path, *names):
+    engines = {}
+    for name in ("primary",) + names:
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        engines[name] = engine
+    return ShardRouter(engines["primary"], {name: engines[name] for name in names})
+
+def count_links(engine):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(Link.__table__)).scalar()
+
+@pytest.fixture
+def sharded(tmp_path, monkeypatch):
+    """Приложение поверх двух шардов и отдельной БД пользователей"""
+    router = make_router(tmp_path, "shard-a", "shard-b")
+    ShardedSessionLocal = router.session_factory()
+
+    def override_get_db():
+        db = ShardedSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, override_get_db)
+
+    client.post("/auth/register", json={"email": "shard@example.com", "password": "password"})
+    token = client.post(
+        "/auth/token", data={"username": "shard@example.com", "password": "password"}
+    ).json()["access_token"]
+    router.headers = {"Authorization": f"Bearer {token}"}
+    return router
+
+# Запросы без короткого кода выполняются на каждом шарде, бюджеты рассчитаны на одну БД
+@pytest.mark.no_query_budget
+def test_endpoints_work_across_shards(sharded):
+    """Тест прозрачной работы всех эндпоинтов ссылок поверх шардов"""
+    headers = sharded.headers
+    codes = []
+    for i in range(20):
+        response = client.post(
+            "/links/shorten",
+            headers=headers,
+            json={"original_url": f"https://sharded.com/{i}", "project": f"project-{i % 2}"}
+        )
+        assert response.status_code == 200
+        codes.append(response.json()["short_code"])
+
+    # Ссылки распределены по обоим шардам, пользователи - только в основной БД
+    assert count_links(sharded.shards["shard-a"]) > 0
+    assert count_links(sharded.shards["shard-b"]) > 0
+    assert count_links(sharded.primary) == 0
+
+    for code in codes[:5]:
+        assert client.get(f"/links/{code}/redirect").json()["url"].startswith("https://sharded.com/")
+        assert client.get(f"/{code}").status_code == 200
+        assert client.get(f"/links/{code}").json()["short_code"] == code
+        assert client.get(f"/links/{code}/stats").json()["access_count"] == 2
+
+    search = client.get("/links/search?original_url=sharded.com").json()
+    assert len(search) == 20
+
+    assert sorted(client.get("/links/projects", headers=headers).json()) == ["project-0", "project-1"]
+    assert len(client.get("/links/projects/project-0", headers=headers).json()) == 10
+
+    response = client.post(
+        "/links/shorten", headers=headers,
+        json={"original_url": "https://sharded.com/alias", "custom_alias": "my-alias"}
+    )
+    assert response.status_code == 200
+    response = client.post(
+        "/links/shorten", headers=headers,
+        json={"original_url": "https://sharded.com/alias2", "custom_alias": "my-alias"}
+    )
+    assert response.status_code == 400
+
+    response = client.put(f"/links/{codes[0]}", headers=headers, json={"original_url": "https://updated.com"})
+    assert response.json()["original_url"] == "https://updated.com"
+
+    assert client.delete(f"/links/{codes[0]}", headers=headers).status_code == 200
+    assert client.get(f"/links/{codes[0]}").status_code == 404
+    # Статистика удаляется фоновой очисткой на шарде ссылки
+    session = sharded.session_factory()()
+    assert purge_deleted_links(session, chunk_size=1) == {"stats": 2, "links": 1}
+    session.close()
+    remaining = 0
+    for engine in sharded.shards.values():
+        with engine.connect() as connection:
+            remaining += connection.execute(select(func.count()).select_from(LinkStat.__table__)).scalar()
+    assert remaining == 8
+
+def test_reshard_moves_only_remapped_links(tmp_path):
+    """Тест переноса ссылок при добавлении шарда"""
+    source = make_router(tmp_path, "shard-a", "shard-b")
+    session = source.session_factory()()
+    for i in range(200):
+        link = Link(original_url=f"https://reshard.com/{i}", short_code=f"code{i}")
+        session.add(link)
+        session.add(LinkStat(link=link, ip_address="127.0.0.1"))
+    session.commit()
+    session.close()
+
+    shard_c = create_engine(f"sqlite:///{tmp_path / 'shard-c'}.db")
+    Base.metadata.create_all(bind=shard_c)
+    target = ShardRouter(source.primary, dict(source.shards, **{"shard-c": shard_c}))
+
+    assert reshard(source, target, dry_run=True)["moved"] == reshard(source, target, batch_size=7)["moved"]
+    moved = count_links(shard_c)
+    assert 0 < moved < 200
+    assert count_links(source.shards["shard-a"]) + count_links(source.shards["shard-b"]) + moved == 200
+
+    # Все ссылки доступны через новую конфигурацию вместе со статистикой
+    session = target.session_factory()()
+    for i in range(200):
+        link = session.query(Link).filter(Link.short_code == f"code{i}").first()
+        assert link is not None
+        assert len(link.stats) == 1
+    session.close()
+
+    # Повторный запуск ничего не переносит
+    assert reshard(source, target)["moved"] == 0
+
+def test_reshard_moves_project_counters(tmp_path):
+    """Тест переноса счетчиков проекта вместе со ссылками"""
+    source = make_router(tmp_path, "shard-a", "shard-b")
+    session = source.session_factory()()
+    adjust_project_counts(session, [(f"code{i}", 1, "docs", 1, 2) for i in range(50)])
+    session.add_all([
+        Link(original_url=f"https://reshard.com/{i}", short_code=f"code{i}", owner_id=1, project="docs", access_count=2)
+        for i in range(50)
+    ])
+    session.commit()
+    session.close()
+
+    shard_c = create_engine(f"sqlite:///{tmp_path / 'shard-c'}.db")
+    Base.metadata.create_all(bind=shard_c)
+    target = ShardRouter(source.primary, dict(source.shards, **{"shard-c": shard_c}))
+    reshard(source, target)
+
+    for name, engine in target.shards.items():
+        with engine.connect() as connection:
+            count = connection.execute(select(Project.link_count)).scalar() or 0
+        assert count == count_links(engine)
+    session = target.session_factory()()
+    assert read_projects(session, 1) == ["docs"]
+    session.close()
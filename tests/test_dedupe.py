@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+
+import app.routers.links as links
+from app.main import app
+from app.models import Link
+from app.schemas import LinkCreate
+from app.urls import normalize_url, url_hash
+
+client = TestClient(app)
+
+@pytest.fixture
+def dedupe(app_db, monkeypatch):
+    monkeypatch.setattr(links, "DEDUPE_LINKS", True)
+    return app_db
+
+def register(email):
+    client.post("/auth/register", json={"email": email, "password": "testpassword"})
+    response = client.post("/auth/token", data={"username": email, "password": "testpassword"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def shorten(headers=None, **data):
+    response = client.post("/links/shorten", json={"original_url": "https://Example.com:443/page", **data}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["short_code"]
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Example.COM:443") == "https://example.com/"
+    assert normalize_url("http://example.com:8080/a?b=1#c") == "http://example.com:8080/a?b=1#c"
+    assert normalize_url("https://user:pw@Example.com/Path") == "https://user:pw@example.com/Path"
+    assert url_hash("https://example.com") == url_hash("https://EXAMPLE.com/")
+
+def test_dedupe_returns_existing_link(dedupe):
+    """Тест возврата существующей ссылки владельца с тем же нормализованным URL"""
+    alice, bob = register("alice@example.com"), register("bob@example.com")
+
+    code = shorten(alice)
+    assert shorten(alice, original_url="https://example.com/page") == code
+    # Другой владелец, алиас и другие параметры - новые ссылки
+    assert shorten(bob) != code
+    assert shorten(alice, custom_alias="mine") == "mine"
+    assert shorten(alice, project="docs") != code
+
+    db = dedupe()
+    assert db.query(Link).filter(Link.url_hash.isnot(None)).count() == 2
+    db.close()
+
+def test_dedupe_replaces_expired_link(dedupe):
+    """Тест того, что истекшая ссылка не возвращается и освобождает хеш"""
+    db = dedupe()
+    db.add(Link(
+        original_url="https://example.com/page", short_code="old", url_hash=url_hash("https://example.com/page"),
+        expires_at=datetime.utcnow() - timedelta(days=1)
+    ))
+    db.commit()
+
+    code = shorten()
+
+    assert code != "old"
+    assert db.query(Link).filter(Link.short_code == "old").one().url_hash is None
+    assert db.query(Link).filter(Link.short_code == code).one().url_hash is not None
+    db.close()
+
+def test_dedupe_with_timezone_aware_expiry(dedupe):
+    """Тест повторного использования ссылки со сроком действия в часовом поясе"""
+    alice = register("alice@example.com")
+    first = shorten(alice, expires_at="2030-01-01T12:00:00+00:00")
+
+    assert shorten(alice, expires_at="2030-01-01T12:00:00+00:00") == first
+    # Срок из Postgres (timestamptz) и тот же момент с другим смещением в запросе
+    stored = Link(is_active=True, project=None, permanent=False,
+                  expires_at=datetime(2030, 1, 1, 12, tzinfo=timezone.utc), original_url="https://example.com/")
+    request = LinkCreate(original_url="https://example.com/", expires_at="2030-01-01T15:00:00+03:00")
+    assert links._reusable(stored, request)
+    assert not links._reusable(stored, LinkCreate(original_url="https://example.com/", expires_at="2030-01-01T15:00:00"))
+
+def test_url_hash_unique_per_owner(db_session):
+    """Тест уникального индекса (owner_id, url_hash)"""
+    db_session.add(Link(original_url="https://example.com", short_code="a1", owner_id=1, url_hash="h"))
+    db_session.add(Link(original_url="https://example.com", short_code="a2", owner_id=1))
+    db_session.add(Link(original_url="https://example.com", short_code="a3", owner_id=2, url_hash="h"))
+    db_session.commit()
+
+    db_session.add(Link(original_url="https://example.com", short_code="a4", owner_id=1, url_hash="h"))
+    with pytest.raises(IntegrityError):
+        db_session.commit()
+
+def test_exact_search(app_db):
+    """Тест поиска по точному URL"""
+    db = app_db()
+    db.add_all([
+        Link(original_url="https://example.com/", short_code="exact1"),
+        Link(original_url="https://example.com/page", short_code="longer"),
+    ])
+    db.commit()
+    db.close()
+
+    exact = client.get("/links/search", params={"original_url": "https://EXAMPLE.com", "exact": True}).json()
+    substring = client.get("/links/search", params={"original_url": "https://example.com"}).json()
+
+    assert [link["short_code"] for link in exact] == ["exact1"]
+    assert {link["short_code"] for link in substring} == {"exact1", "longer"}
+
+def test_exact_and_substring_search_cached_separately(app_db, fake_redis_nodes):
+    """Тест: точный и подстрочный поиск не делят запись кэша"""
+    fake_redis_nodes("node-a")
+    db = app_db()
+    db.add(Link(original_url="https://example.com/?page=1", short_code="page1"))
+    db.commit()
+    db.close()
+
+    assert client.get("/links/search", params={"original_url": "1", "exact": True}).json() == []
+    substring = client.get("/links/search", params={"original_url": "=1"}).json()
+
+    assert [link["short_code"] for link in substring] == ["page1"]
@@ -0,0 +1,109 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+
+import app.main as main_module
+from app.main import app
+from app.fast_redirect import FastRedirectMiddleware
+from app.http_cache import cache_link, entry_expired, link_cache_entry, redirect_cache_control
+from app.models import Link, LinkStat
+from app.redis_client import set_cache
+
+
+@pytest.fixture
+def session_factory(app_db):
+    db = app_db()
+    db.add(Link(original_url="https://example.com/fast", short_code="fast", access_count=0))
+    db.commit()
+    db.close()
+    return app_db
+
+def clicks(Session):
+    db = Session()
+    try:
+        return db.query(Link).filter(Link.short_code == "fast").first().access_count, db.query(LinkStat).count()
+    finally:
+        db.close()
+
+def test_cache_hit_served_before_routing(session_factory, fake_redis_nodes, monkeypatch):
+    """Тест ответа из кэша без вызова маршрута и с учетом перехода"""
+    fake_redis_nodes("node-a")
+    set_cache("link:fast", "https://example.com/fast", 60)
+
+    def fail_route(*args, **kwargs):
+        raise AssertionError("маршрут не должен вызываться при попадании в кэш")
+    monkeypatch.setattr(main_module.links, "resolve_redirect", fail_route)
+
+    response = TestClient(app).get("/fast")
+    assert response.status_code == 200
+    assert response.json() == {"url": "https://example.com/fast"}
+    assert clicks(session_factory) == (1, 1)
+
+def test_redirect_mode(session_factory, fake_redis_nodes):
+    """Тест настоящего редиректа с заголовком Location"""
+    fake_redis_nodes("node-a")
+    set_cache("link:fast", "https://example.com/fast?q=1", 60)
+    client = TestClient(FastRedirectMiddleware(app, application=app, mode="302"))
+
+    response = client.get("/fast", allow_redirects=False, headers={"user-agent": "pytest"})
+    assert response.status_code == 302
+    assert response.headers["location"] == "https://example.com/fast?q=1"
+    assert response.content == b""
+    assert clicks(session_factory) == (1, 1)
+
+def test_cache_miss_falls_back_to_app(session_factory, fake_redis_nodes, monkeypatch):
+    """Тест передачи запроса приложению при промахе кэша"""
+    fake_redis_nodes("node-a")
+    client = TestClient(app)
+
+    assert client.get("/missing").status_code == 404
+    assert client.get("/health").json()["status"] == "ok"
+
+    monkeypatch.setattr(main_module, "REDIRECT_MODE", "301")
+    response = client.get("/fast", allow_redirects=False)
+    assert response.status_code == 301
+    assert response.headers["location"] == "https://example.com/fast"
+    assert clicks(session_factory) == (1, 1)
+
+    # Маршрут заполнил кэш: следующий запрос обслуживается быстрым путем
+    assert client.get("/fast").json() == {"url": "https://example.com/fast"}
+    assert clicks(session_factory) == (2, 2)
+
+def test_permanent_link_from_cache(session_factory, fake_redis_nodes):
+    """Тест постоянного редиректа и Cache-Control из записи кэша"""
+    fake_redis_nodes("node-a")
+    set_cache("link:fast", link_cache_entry("https://example.com/fast", permanent=True), 60)
+    client = TestClient(FastRedirectMiddleware(app, application=app, mode="302"))
+
+    response = client.get("/fast", allow_redirects=False)
+    assert response.status_code == 301
+    assert response.headers["cache-control"] == "public, max-age=86400"
+
+    # Истекшая ссылка передается приложению, которое отвечает 410
+    expired = link_cache_entry("https://example.com/fast", expires_at=datetime.utcnow() - timedelta(minutes=1))
+    set_cache("link:fast", expired, 60)
+    assert client.get("/fast", allow_redirects=False).status_code == 410
+
+def test_timezone_aware_expires_at(session_factory, fake_redis_nodes):
+    """Тест срока действия с часовым поясом (timestamptz из Postgres)"""
+    fake_redis_nodes("node-a")
+    msk = timezone(timedelta(hours=3))
+    future = datetime.now(msk) + timedelta(minutes=10)
+    entry = link_cache_entry("https://example.com/fast", permanent=True, expires_at=future)
+
+    assert entry["expires_at"] == future.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+    assert not entry_expired(entry)
+    assert not entry_expired(entry, now=datetime.now(timezone.utc))
+    assert 590 <= int(redirect_cache_control(entry).split("=")[1]) <= 600
+    # Запись, сохраненная с часовым поясом
+    stored = {**entry, "expires_at": (datetime.now(msk) - timedelta(minutes=1)).isoformat()}
+    assert entry_expired(stored)
+
+    cache_link("fast", entry)
+    client = TestClient(FastRedirectMiddleware(app, application=app, mode="302"))
+    assert client.get("/fast", allow_redirects=False).status_code == 301
+
+def test_invalid_mode():
+    """Тест отказа при неподдерживаемом режиме"""
+    with pytest.raises(ValueError):
+        FastRedirectMiddleware(app, application=app, mode="303")
@@ -0,0 +1,84 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.bulk_import import import_links, detect_format
+from app.main import app
+from app.models import Link
+
+client = TestClient(app)
+
+CSV_FILE = (
+    "original_url,custom_alias,project\n"
+    "https://example.com/1,first,docs\n"
+    "not-a-url,,\n"
+    "https://example.com/3,,\n"
+    "https://example.com/4,first,\n"
+    "https://example.com/5,taken,\n"
+    "https://example.com/6,bad alias,\n"
+)
+
+@pytest.fixture
+def auth_headers(app_db):
+    client.post("/auth/register", json={"email": "import@example.com", "password": "testpassword"})
+    response = client.post("/auth/token", data={"username": "import@example.com", "password": "testpassword"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def test_import_endpoint_reports_row_errors(app_db, auth_headers):
+    """Тест импорта CSV через эндпоинт с отчетом об ошибках по строкам"""
+    db = app_db()
+    db.add(Link(original_url="https://example.com/taken", short_code="taken", custom_alias="taken"))
+    db.commit()
+
+    response = client.post(
+        "/links/import",
+        files={"file": ("links.csv", CSV_FILE.encode("utf-8"), "text/csv")},
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["processed"], result["imported"], result["failed"], result["last_row"]) == (6, 2, 4, 6)
+    assert [error["row"] for error in result["errors"]] == [2, 4, 5, 6]
+    assert "original_url" in result["errors"][0]["error"]
+    assert not result["errors_truncated"]
+    imported = db.query(Link).filter(Link.owner_id.isnot(None)).order_by(Link.id).all()
+    assert [link.original_url for link in imported] == ["https://example.com/1", "https://example.com/3"]
+    assert imported[0].short_code == "first" and imported[0].project == "docs"
+    assert len(imported[1].short_code) == 6
+    db.close()
+
+def test_import_endpoint_requires_known_format(app_db, auth_headers):
+    """Тест отказа при неизвестном формате и без авторизации"""
+    files = {"file": ("links.txt", b"https://example.com", "text/plain")}
+    assert client.post("/links/import", files=files, headers=auth_headers).status_code == 400
+    assert client.post("/links/import", files=files).status_code == 401
+
+def test_import_batches_and_resume(db_session):
+    """Тест пакетной вставки, отчета о прогрессе и продолжения после сбоя"""
+    lines = [f'{{"original_url": "https://example.com/{i}", "custom_alias": "alias{i}"}}' for i in range(1, 8)]
+    lines.insert(3, "{broken")
+    data = "\n".join(lines) + "\n"
+    progress, errors = [], []
+
+    result = import_links(
+        db_session, io.StringIO(data), "jsonl", batch_size=3,
+        on_error=lambda row, error: errors.append(row), on_progress=progress.append
+    )
+
+    assert (result["imported"], result["failed"], result["last_row"]) == (7, 1, 8)
+    assert errors == [4]
+    assert [item["last_row"] for item in progress] == [3, 6, 8]
+
+    # Повторный запуск с последней зафиксированной строки ничего не дублирует
+    db_session.query(Link).filter(Link.custom_alias.in_(["alias6", "alias7"])).delete(synchronize_session=False)
+    db_session.commit()
+    resumed = import_links(db_session, io.StringIO(data), "jsonl", batch_size=3, skip=6)
+    assert (resumed["processed"], resumed["imported"], resumed["failed"]) == (2, 2, 0)
+    assert db_session.query(Link).count() == 7
+
+def test_detect_format():
+    assert detect_format("links.CSV") == "csv"
+    assert detect_format("links.ndjson") == "jsonl"
+    assert detect_format("links.xlsx") is None
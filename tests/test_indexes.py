@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from app.models import Link, LinkStat
+from app.queries import _alias_exists_stmt, _has_deleted_stmt, _recent_clicks_stmt, _redirect_stmt
+
+def query_plan(db_session, statement, **params) -> str:
+    """План выполнения запроса (EXPLAIN QUERY PLAN) одной строкой"""
+    if hasattr(statement, "statement"):
+        statement = statement.statement
+    compiled = statement.compile(dialect=db_session.bind.dialect)
+    values = compiled.construct_params(params)
+    args = tuple(values[name] for name in compiled.positiontup)
+    rows = db_session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), args).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+def test_hot_queries_use_indexes(db_session):
+    """Тест того, что горячие запросы не сканируют таблицы целиком"""
+    now = datetime.utcnow()
+    plans = [
+        ("ix_links_short_code", query_plan(db_session, _redirect_stmt, short_code="abc")),
+        # Уникальное ограничение custom_alias
+        ("sqlite_autoindex_links_1", query_plan(db_session, _alias_exists_stmt, alias="alias")),
+        ("ix_links_owner_id_project", query_plan(db_session, db_session.query(Link).filter(
+            Link.owner_id == 1, Link.project == "project"
+        ))),
+        ("ix_links_owner_id_project", query_plan(db_session, db_session.query(Link.project).filter(
+            Link.owner_id == 1, Link.project.isnot(None)
+        ).distinct())),
+        ("ix_links_expires_at", query_plan(db_session, db_session.query(Link).filter(
+            Link.expires_at < now, Link.expires_at.isnot(None)
+        ))),
+        ("ux_links_owner_id_url_hash", query_plan(db_session, db_session.query(Link).filter(
+            Link.owner_id == 1, Link.url_hash == "hash"
+        ))),
+        # Поиск по точному URL
+        ("ix_links_original_url", query_plan(db_session, db_session.query(Link).filter(
+            Link.original_url == "https://example.com/"
+        ))),
+        # Очистка удаленных ссылок
+        ("ix_links_inactive", query_plan(db_session, _has_deleted_stmt)),
+        ("ix_links_inactive", query_plan(db_session, db_session.query(Link.id).filter(
+            Link.is_active.is_(False)
+        ).limit(10))),
+        ("ix_link_stats_link_id_accessed_at", query_plan(db_session, db_session.query(LinkStat).filter(
+            LinkStat.link_id == 1
+        ))),
+        ("ix_link_stats_accessed_at", query_plan(db_session, db_session.query(LinkStat.link_id).filter(
+            LinkStat.accessed_at < now
+        ))),
+        # Переходы владельца за неделю: от его ссылок, а не от всей статистики
+        ("ix_link_stats_link_id_accessed_at", query_plan(
+            db_session, _recent_clicks_stmt, owner_id=1, day_ago=now, week_ago=now
+        )),
+    ]
+
+    for index, plan in plans:
+        assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan, plan
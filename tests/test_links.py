@@ -1,4 +1,5 @@
 import pytest
+import redis
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -6,9 +7,9 @@ from sqlalchemy.pool import StaticPool
 from datetime import datetime, timedelta
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_read_db
 from app.models import User, Link
-from app.redis_client import redis_client
+from app.redis_client import redis_client, local_cache
 
 # Создаем тестовую базу данных в памяти
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -30,6 +31,7 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 client = TestClient(app)
 
@@ -251,6 +253,11 @@ def test_delete_link(auth_headers):
     # Проверяем удаление ссылки
     response = client.get(f"/links/{short_code}", headers=auth_headers)
     assert response.status_code == 404
+    # Удаленная ссылка до очистки ведет себя как отсутствующая
+    assert client.get(f"/links/{short_code}/redirect").status_code == 404
+    assert client.get(f"/links/{short_code}/stats").status_code == 404
+    assert client.delete(f"/links/{short_code}", headers=auth_headers).status_code == 404
+    assert short_code not in [link["short_code"] for link in client.get("/links/search?original_url=example.com/delete").json()]
 
 def test_projects_functionality(auth_headers):
     """Тест функциональности проектов"""
@@ -376,4 +383,115 @@ def test_bulk_link_creation(auth_headers):
     # Проверяем, что все ссылки созданы и доступны
     for short_code in links_created:
         response = client.get(f"/links/{short_code}", headers=auth_headers)
-        assert response.status_code == 200
\ No newline at end of file
+        assert response.status_code == 200
+
+def test_redirect_when_redis_unavailable(auth_headers, mock_redis):
+    """Тест редиректа при недоступном Redis: данные берутся из БД"""
+    create_response = client.post(
+        "/links/shorten",
+        headers=auth_headers,
+        json={"original_url": "https://example.com/no-redis"}
+    )
+    short_code = create_response.json()["short_code"]
+
+    mock_redis.get.side_effect = redis.ConnectionError("connection refused")
+    mock_redis.setex.side_effect = redis.ConnectionError("connection refused")
+    mock_redis.publish.side_effect = redis.ConnectionError("connection refused")
+    local_cache.clear()
+
+    response = client.get(f"/links/{short_code}/redirect")
+    assert response.status_code == 200
+    assert response.json()["url"] == "https://example.com/no-redis"
+
+    health = client.get("/health").json()
+    assert any(node["consecutive_failures"] >= 1 for node in health["redis_circuit"].values())
+
+def test_search_cache_invalidated_by_mutations(auth_headers, fake_redis_nodes):
+    """Тест инвалидации кэша поиска при создании, изменении и удалении ссылок"""
+    fakes = fake_redis_nodes("node-a", "node-b")
+    client.post(
+        "/links/shorten",
+        headers=auth_headers,
+        json={"original_url": "https://generation-test.com/one"}
+    )
+    assert len(client.get("/links/search?original_url=generation-test.com").json()) == 1
+    # Результат поиска закэширован
+    assert any(key.startswith("search:") and key != "search:generation"
+               for fake in fakes.values() for key in fake.store)
+
+    create_response = client.post(
+        "/links/shorten",
+        headers=auth_headers,
+        json={"original_url": "https://generation-test.com/two"}
+    )
+    short_code = create_response.json()["short_code"]
+    assert len(client.get("/links/search?original_url=generation-test.com").json()) == 2
+
+    client.put(
+        f"/links/{short_code}",
+        headers=auth_headers,
+        json={"original_url": "https://other-domain.com/two"}
+    )
+    assert len(client.get("/links/search?original_url=generation-test.com").json()) == 1
+
+    client.delete(f"/links/{short_code}", headers=auth_headers)
+    assert client.get("/links/search?original_url=other-domain.com").json() == []
+
+def test_conditional_get_link_info_and_stats(auth_headers):
+    """Тест ETag и ответа 304 для информации и статистики ссылки"""
+    create_response = client.post(
+        "/links/shorten",
+        headers=auth_headers,
+        json={"original_url": "https://example.com/etag"}
+    )
+    short_code = create_response.json()["short_code"]
+
+    for path in (f"/links/{short_code}", f"/links/{short_code}/stats"):
+        response = client.get(path)
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == "no-cache"
+
+        not_modified = client.get(path, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
+        assert client.get(path, headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+        assert client.get(path, headers={"If-None-Match": '"other"'}).status_code == 200
+
+    # Переход меняет данные ссылки, а вместе с ними и ETag
+    etag = client.get(f"/links/{short_code}").headers["etag"]
+    client.get(f"/links/{short_code}/redirect")
+    response = client.get(f"/links/{short_code}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+def test_redirect_cache_control(auth_headers):
+    """Тест Cache-Control редиректа для постоянных и временных ссылок"""
+    temporary = client.post(
+        "/links/shorten",
+        headers=auth_headers,
+        json={"original_url": "https://example.com/temporary"}
+    ).json()["short_code"]
+    permanent = client.post(
+        "/links/shorten",
+        headers=auth_headers,
+        json={"original_url": "https://example.com/permanent", "permanent": True}
+    ).json()["short_code"]
+    expiring = client.post(
+        "/links/shorten",
+        headers=auth_headers,
+        json={
+            "original_url": "https://example.com/expiring",
+            "permanent": True,
+            "expires_at": (datetime.utcnow() + timedelta(minutes=10)).isoformat()
+        }
+    ).json()["short_code"]
+
+    assert client.get(f"/links/{temporary}/redirect").headers["cache-control"] == "no-cache"
+    assert client.get(f"/links/{permanent}/redirect").headers["cache-control"] == "public, max-age=86400"
+    max_age = int(client.get(f"/{expiring}").headers["cache-control"].split("max-age=")[1])
+    assert 500 < max_age <= 600
+
+    response = client.put(f"/links/{permanent}", headers=auth_headers, json={"permanent": False})
+    assert response.json()["permanent"] is False
+    assert client.get(f"/links/{permanent}/redirect").headers["cache-control"] == "no-cache"
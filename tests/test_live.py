@@ -0,0 +1,97 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.live as live
+from app.http_cache import link_cache_entry
+from app.live import LiveHub, Viewer, publish_click, stream_clicks
+from app.main import app
+from app.models import Link
+from app.redis_client import set_cache
+
+client = TestClient(app)
+
+@pytest.fixture
+def hub(monkeypatch):
+    hub = LiveHub(tick=60)
+    monkeypatch.setattr(live, "hub", hub)
+    yield hub
+    if hub._task is not None:
+        hub._task.cancel()
+
+@pytest.mark.asyncio
+async def test_fan_out_one_subscription_per_link(hub, fake_redis_nodes):
+    """Тест раздачи: одна подписка на ссылку, переходы объединяются за тик"""
+    fakes = fake_redis_nodes("node-a", "node-b")
+    viewers = [hub.add("campaign") for _ in range(1000)] + [hub.add("other")]
+    hub.drain(list(hub.viewers))
+
+    for _ in range(5):
+        publish_click("campaign")
+    publish_click("quiet")
+    hub.dispatch(hub.drain(list(hub.viewers)))
+
+    assert sum(len(pubsub.channels) for fake in fakes.values() for pubsub in fake.subscribers) == 2
+    assert all(viewer.pending == 5 for viewer in viewers[:-1])
+    assert viewers[-1].pending == 0
+
+    # Последний зритель ушел - подписка снимается
+    hub.remove("other", viewers[-1])
+    hub.drain(list(hub.viewers))
+    channels = {channel for fake in fakes.values() for pubsub in fake.subscribers for channel in pubsub.channels}
+    assert channels == {"clicks:campaign"}
+
+@pytest.mark.asyncio
+async def test_slow_viewer_gets_coalesced_events(hub, fake_redis_nodes):
+    """Тест обратного давления: непрочитанные переходы складываются в одно событие"""
+    fake_redis_nodes("node-a")
+    viewer = hub.add("campaign")
+    for count in (3, 4, 5):
+        hub.dispatch({"campaign": count})
+    checks = iter([False, True])
+
+    async def is_disconnected():
+        return next(checks)
+
+    events = [chunk async for chunk in stream_clicks("campaign", viewer, is_disconnected)]
+
+    assert events[0].startswith("retry:")
+    assert len(events) == 2
+    assert json.loads(events[1].split("data: ")[1])["clicks"] == 12
+    assert "campaign" not in hub.viewers
+
+@pytest.mark.asyncio
+async def test_local_delivery_without_redis(hub, fake_redis_nodes):
+    """Тест: без Redis переходы доставляются зрителям своего процесса"""
+    fakes = fake_redis_nodes("node-a")
+    viewer = hub.add("campaign")
+    fakes["node-a"].fail = True
+
+    publish_click("campaign")
+    publish_click("unwatched")
+    hub.dispatch(hub.drain(list(hub.viewers)))
+
+    assert viewer.pending == 1
+    assert not hub._local
+
+def test_live_requires_existing_link(app_db):
+    assert client.get("/links/missing/live").status_code == 404
+
+def test_fast_path_hits_are_published(app_db, hub, fake_redis_nodes):
+    """Тест: переходы, отданные быстрым путем из кэша, доходят до зрителей"""
+    fake_redis_nodes("node-a", "node-b")
+    db = app_db()
+    db.add(Link(original_url="https://example.com/live", short_code="livefast", access_count=0))
+    db.commit()
+    db.close()
+    set_cache("link:livefast", link_cache_entry("https://example.com/live"), 60)
+    viewer = Viewer()
+    hub.viewers["livefast"] = {viewer}
+    hub.drain(["livefast"])
+
+    for _ in range(3):
+        assert client.get("/livefast").json() == {"url": "https://example.com/live"}
+    hub.dispatch(hub.drain(["livefast"]))
+
+    assert viewer.pending == 3
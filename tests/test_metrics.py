@@ -0,0 +1,78 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.main import app
+from app.metrics import cache_family, measure_event_loop_lag
+from app.models import Link
+from app.tasks import cleanup_expired_links
+
+client = TestClient(app)
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_cache_family():
+    """Тест ограниченного набора семейств ключей"""
+    assert cache_family("link:abc") == "link"
+    assert cache_family("search:3:example.com") == "search"
+    assert cache_family("rate:127.0.0.1") == "other"
+
+def test_request_cache_and_db_metrics(app_db, fake_redis_nodes):
+    """Тест метрик маршрутов, кэша и запросов к БД"""
+    fake_redis_nodes("node-a")
+    db = app_db()
+    db.add(Link(original_url="https://example.com/counted", short_code="counted", access_count=0))
+    db.commit()
+    db.close()
+
+    route = {"method": "GET", "route": "/links/{short_code}/redirect/", "status": "200"}
+    fast_route = {"method": "GET", "route": "/{short_code}", "status": "200"}
+    before = {
+        "route": sample("http_request_duration_seconds_count", **route),
+        "fast": sample("http_request_duration_seconds_count", **fast_route),
+        "miss": sample("cache_requests_total", family="link", result="miss"),
+        "hit": sample("cache_requests_total", family="link", result="hit"),
+        "selects": sample("db_queries_total", operation="select"),
+        "inserts": sample("db_queries_total", operation="insert"),
+    }
+
+    # Первый переход - промах (маршрут заполняет кэш), второй - попадание на быстром пути
+    assert client.get("/links/counted/redirect/").status_code == 200
+    assert client.get("/counted").status_code == 200
+
+    assert sample("http_request_duration_seconds_count", **route) == before["route"] + 1
+    assert sample("http_request_duration_seconds_count", **fast_route) == before["fast"] + 1
+    assert sample("cache_requests_total", family="link", result="miss") == before["miss"] + 1
+    assert sample("cache_requests_total", family="link", result="hit") == before["hit"] + 1
+    assert sample("db_queries_total", operation="select") > before["selects"]
+    assert sample("db_queries_total", operation="insert") == before["inserts"] + 2
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for name in ("http_request_duration_seconds_bucket", "cache_requests_total", "db_query_duration_seconds",
+                 "redis_circuit_state"):
+        assert name in response.text
+
+@pytest.mark.asyncio
+async def test_cleanup_metrics(db_session):
+    """Тест метрик задачи очистки"""
+    db_session.add(Link(original_url="https://example.com", short_code="old",
+                        expires_at=datetime.utcnow() - timedelta(days=1)))
+    db_session.commit()
+    count = sample("cleanup_duration_seconds_count", job="expired")
+    deleted = sample("cleanup_deleted_rows_total", job="expired")
+
+    assert await cleanup_expired_links(db_session) == 1
+
+    assert sample("cleanup_duration_seconds_count", job="expired") == count + 1
+    assert sample("cleanup_deleted_rows_total", job="expired") == deleted + 1
+
+@pytest.mark.asyncio
+async def test_event_loop_lag():
+    """Тест замера задержки цикла событий"""
+    count = sample("event_loop_lag_seconds_count")
+    assert await measure_event_loop_lag(0.01) >= 0
+    assert sample("event_loop_lag_seconds_count") == count + 1
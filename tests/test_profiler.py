@@ -0,0 +1,70 @@
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.profiler as profiler
+from app.main import app
+from app.profiler import Sampler
+
+client = TestClient(app)
+
+@pytest.fixture
+def profiler_enabled(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiler, "PROFILER_TOKEN", "secret")
+    monkeypatch.setattr(profiler, "PROFILER_OUTPUT_DIR", str(tmp_path))
+    return tmp_path
+
+def busy_wait(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_sampler_collects_other_threads():
+    """Тест сбора стеков рабочих потоков в формате collapsed stacks"""
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_wait, args=(stop,), name="busy-worker")
+    worker.start()
+    sampler = Sampler(interval=0.001, app_only=False)
+    try:
+        assert sampler.start()
+        # Второй сэмплер в том же воркере не запускается
+        assert not Sampler().start()
+        threading.Event().wait(0.05)
+    finally:
+        sampler.stop()
+        stop.set()
+        worker.join()
+
+    lines = sampler.collapsed().splitlines()
+    busy = [line for line in lines if line.startswith("busy-worker;") and "busy_wait (" in line]
+    assert busy
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+
+def test_profiler_disabled_without_token():
+    """Тест: без PROFILER_TOKEN профилировщик недоступен"""
+    response = client.get("/health", headers={"X-Profile-Token": "anything"})
+    assert "x-profile-file" not in response.headers
+    assert client.post("/debug/profile?seconds=0.01").status_code == 404
+
+def test_profile_single_request(profiler_enabled):
+    """Тест профилирования одного запроса по заголовку"""
+    assert "x-profile-file" not in client.get("/health", headers={"X-Profile-Token": "wrong"}).headers
+
+    response = client.get("/health", headers={"X-Profile-Token": "secret"})
+    assert response.status_code == 200
+    path = response.headers["x-profile-file"]
+    assert os.path.dirname(path) == str(profiler_enabled)
+    assert os.path.exists(path)
+
+def test_profile_window(profiler_enabled):
+    """Тест профилирования воркера в течение окна"""
+    assert client.post("/debug/profile?seconds=0.01", headers={"X-Profile-Token": "wrong"}).status_code == 403
+
+    response = client.post("/debug/profile?seconds=0.05", headers={"X-Profile-Token": "secret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    # Профиль запроса на эндпоинт профилирования содержит только его собственное ожидание
+    for line in response.text.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0 and ";" in stack
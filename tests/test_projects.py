@@ -0,0 +1,149 @@
+import io
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+
+import app.project_clicks as project_clicks
+import app.query_budget as query_budget
+from app.bulk_import import import_links
+from app.main import app
+from app.models import Link, Project
+from app.project_clicks import flush_project_clicks
+from app.tasks import cleanup_expired_links
+
+client = TestClient(app)
+
+@pytest.fixture
+def alice(app_db):
+    client.post("/auth/register", json={"email": "alice@example.com", "password": "testpassword"})
+    response = client.post("/auth/token", data={"username": "alice@example.com", "password": "testpassword"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture(autouse=True)
+def pending_clicks(monkeypatch):
+    """Отдельный буфер переходов для каждого теста"""
+    pending = Counter()
+    monkeypatch.setattr(project_clicks, "_pending", pending)
+    return pending
+
+def flush(Session):
+    db = Session()
+    try:
+        return flush_project_clicks(db)
+    finally:
+        db.close()
+
+def counters(Session):
+    db = Session()
+    try:
+        return {project.name: (project.link_count, project.click_count) for project in db.query(Project)}
+    finally:
+        db.close()
+
+def shorten(headers, project, **data):
+    response = client.post(
+        "/links/shorten", json={"original_url": "https://example.com/", "project": project, **data}, headers=headers
+    )
+    return response.json()["short_code"]
+
+def test_project_counters(app_db, alice, fake_redis_nodes):
+    """Тест счетчиков проектов при создании, переходах и удалении ссылок"""
+    fake_redis_nodes("node-a")
+    first, second = shorten(alice, "docs"), shorten(alice, "docs")
+    shorten(alice, "blog")
+    shorten(alice, None)
+    client.get(f"/links/{first}/redirect/")
+    client.get(f"/{first}")
+    client.get(f"/links/{second}/redirect/")
+
+    # Редирект не трогает строку проекта: переходы записываются при сбросе буфера
+    assert counters(app_db) == {"docs": (2, 0), "blog": (1, 0)}
+    assert flush(app_db) == 3
+    assert counters(app_db) == {"docs": (2, 3), "blog": (1, 0)}
+    assert client.get("/links/projects", headers=alice).json() == ["blog", "docs"]
+
+    client.delete(f"/links/{first}", headers=alice)
+    assert counters(app_db)["docs"] == (1, 1)
+    client.delete("/links/projects/blog", headers=alice)
+    assert counters(app_db)["blog"] == (0, 0)
+    # Кэш списка проектов очищается при удалении
+    assert client.get("/links/projects", headers=alice).json() == ["docs"]
+
+def test_get_projects_reads_project_index(app_db, alice, fake_redis_nodes, monkeypatch):
+    """Тест: список проектов читается одним запросом и затем из кэша"""
+    monkeypatch.setattr(query_budget, "QUERY_DEBUG_HEADERS", True)
+    fake_redis_nodes("node-a")
+    shorten(alice, "docs")
+
+    cold = client.get("/links/projects", headers=alice)
+    warm = client.get("/links/projects", headers=alice)
+
+    # Запрос пользователя для авторизации и запрос к projects
+    assert cold.headers["x-db-queries"] == "2"
+    assert warm.headers["x-db-queries"] == "1"
+    assert cold.json() == warm.json() == ["docs"]
+    shorten(alice, "blog")
+    assert client.get("/links/projects", headers=alice).json() == ["blog", "docs"]
+
+def test_delete_before_flush(app_db, alice, fake_redis_nodes, pending_clicks):
+    """Тест: удаление ссылки до сброса буфера не занижает счетчик переходов проекта"""
+    fake_redis_nodes("node-a")
+    first, second = shorten(alice, "docs"), shorten(alice, "docs")
+    for _ in range(5):
+        client.get(f"/links/{first}/redirect/")
+    client.get(f"/links/{second}/redirect/")
+    blog = shorten(alice, "blog")
+    client.get(f"/links/{blog}/redirect/")
+
+    client.delete(f"/links/{first}", headers=alice)
+    client.delete("/links/projects/blog", headers=alice)
+    flush(app_db)
+
+    assert counters(app_db) == {"docs": (1, 1), "blog": (0, 0)}
+
+def test_deleted_link_clicks_from_other_process(app_db, alice, fake_redis_nodes, pending_clicks):
+    """Тест: переходы удаленной ссылки из буфера другого процесса все равно записываются"""
+    fake_redis_nodes("node-a")
+    first, second = shorten(alice, "docs"), shorten(alice, "docs")
+    for _ in range(3):
+        client.get(f"/links/{first}/redirect/")
+    client.get(f"/links/{second}/redirect/")
+    # Переходы первой ссылки учтены в буфере другого процесса
+    other_process = Counter({first: pending_clicks.pop(first)})
+
+    client.delete(f"/links/{first}", headers=alice)
+    pending_clicks.update(other_process)
+    flush(app_db)
+
+    assert counters(app_db) == {"docs": (1, 1)}
+
+def test_failed_flush_keeps_clicks(app_db, pending_clicks, monkeypatch):
+    """Тест: при ошибке записи переходы остаются в буфере до следующего сброса"""
+    pending_clicks.update({"first": 2, "second": 1})
+
+    def locked(db, clicks):
+        raise OperationalError("UPDATE projects", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(project_clicks, "apply_project_clicks", locked)
+    with pytest.raises(OperationalError):
+        flush(app_db)
+    assert pending_clicks == {"first": 2, "second": 1}
+
+@pytest.mark.asyncio
+async def test_project_counters_for_import_and_cleanup(db_session):
+    """Тест счетчиков при массовом импорте и удалении истекших ссылок"""
+    data = "original_url,project\nhttps://example.com/1,docs\nhttps://example.com/2,docs\nhttps://example.com/3,\n"
+    import_links(db_session, io.StringIO(data), "csv", owner_id=1)
+    db_session.add(Link(
+        original_url="https://example.com/old", short_code="old", owner_id=1, project="docs",
+        expires_at=datetime.utcnow() - timedelta(days=1)
+    ))
+    db_session.query(Project).filter(Project.name == "docs").update({"link_count": Project.link_count + 1})
+    db_session.commit()
+
+    assert db_session.query(Project.link_count).filter(Project.name == "docs").scalar() == 3
+    await cleanup_expired_links(db_session)
+    assert db_session.query(Project.link_count).filter(Project.name == "docs").scalar() == 2
@@ -0,0 +1,41 @@
+from app.models import Link, LinkStat
+from app.queries import lookup_redirect, short_code_exists, alias_exists, read_stats, record_click, RedirectTarget
+
+def test_lookup_redirect(db_session):
+    """Тест поиска ссылки для редиректа без ORM-сущности"""
+    db_session.add(Link(original_url="https://example.com/fast", short_code="fast", access_count=0))
+    db_session.commit()
+
+    target = lookup_redirect(db_session, "fast")
+    assert isinstance(target, RedirectTarget)
+    assert target.original_url == "https://example.com/fast"
+    assert target.expires_at is None
+    assert not hasattr(target, "__dict__")
+    assert lookup_redirect(db_session, "missing") is None
+
+def test_existence_checks(db_session):
+    """Тест проверок занятости кода и алиаса"""
+    db_session.add(Link(original_url="https://example.com", short_code="my-alias", custom_alias="my-alias"))
+    db_session.commit()
+
+    assert short_code_exists(db_session, "my-alias")
+    assert not short_code_exists(db_session, "free")
+    assert alias_exists(db_session, "my-alias")
+    assert not alias_exists(db_session, "free")
+
+def test_record_click_and_read_stats(db_session):
+    """Тест учета перехода и чтения статистики"""
+    link = Link(original_url="https://example.com/stats", short_code="stats", access_count=0)
+    db_session.add(link)
+    db_session.commit()
+
+    record_click(db_session, "stats", link.id, ip_address="127.0.0.1", user_agent="pytest")
+    record_click(db_session, "stats", link.id)
+    db_session.commit()
+
+    stats = read_stats(db_session, "stats")
+    assert stats.access_count == 2
+    assert stats.last_accessed is not None
+    assert stats.as_dict()["original_url"] == "https://example.com/stats"
+    assert db_session.query(LinkStat).filter_by(link_id=link.id).count() == 2
+    assert read_stats(db_session, "missing") is None
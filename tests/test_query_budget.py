@@ -0,0 +1,50 @@
+from fastapi.testclient import TestClient
+
+import app.query_budget as query_budget
+from app.main import app
+from app.models import Link
+from app.query_budget import QueryStats, check_budget
+
+client = TestClient(app)
+
+def test_debug_headers_and_cached_redirect(app_db, fake_redis_nodes, monkeypatch):
+    """Тест заголовков отладки: при попадании в кэш редирект не ищет ссылку в БД"""
+    monkeypatch.setattr(query_budget, "QUERY_DEBUG_HEADERS", True)
+    fake_redis_nodes("node-a")
+    db = app_db()
+    db.add(Link(original_url="https://example.com/budget", short_code="budget", access_count=0))
+    db.commit()
+    db.close()
+
+    # Промах кэша: поиск ссылки, обновление счетчика и запись статистики
+    miss = client.get("/links/budget/redirect/")
+    assert miss.headers["x-db-queries"] == "3"
+    assert float(miss.headers["x-db-time"]) >= 0
+    # Попадание: только обновление счетчика и запись статистики
+    hit = client.get("/links/budget/redirect/")
+    assert hit.headers["x-db-queries"] == "2"
+    assert hit.headers["x-db-rows"] == "2"
+
+    assert client.get("/links/budget/stats").headers["x-db-queries"] == "1"
+
+def test_no_debug_headers_by_default(app_db):
+    """Тест: без режима отладки заголовки не добавляются"""
+    assert "x-db-queries" not in client.get("/links/missing").headers
+
+def test_budget_violation_and_repeated_queries(monkeypatch):
+    """Тест фиксации превышения бюджета и повторяющихся запросов"""
+    stats = QueryStats()
+    stats.queries = 7
+    stats.statements["SELECT link_stats.id FROM link_stats WHERE link_stats.link_id = ?"] = 6
+    stats.statements["SELECT links.id FROM links"] = 1
+
+    check_budget("GET /links/x", 3, stats)
+    messages = [violation.message for violation in query_budget.violations]
+    query_budget.violations.clear()
+
+    assert len(messages) == 2
+    assert "бюджете 3" in messages[0]
+    assert "N+1" in messages[1] and "link_stats" in messages[1]
+
+    check_budget("GET /links/x", None, QueryStats())
+    assert query_budget.violations == []
@@ -0,0 +1,79 @@
+from app.hash_ring import HashRing
+from app.redis_client import get_cache, set_cache, get_many, set_many, delete_many, add_node, node_for
+from tests.redis_stub import FakeRedis
+
+KEYS = [f"link:code{i}" for i in range(3000)]
+
+def test_hash_ring_balance():
+    """Тест равномерного распределения ключей по узлам"""
+    ring = HashRing(["a", "b", "c"])
+    groups = ring.group(KEYS)
+    assert set(groups) == {"a", "b", "c"}
+    for keys in groups.values():
+        # Каждый узел получает примерно треть ключей
+        assert 600 < len(keys) < 1400
+
+def test_hash_ring_minimal_remapping():
+    """Тест минимального переноса ключей при добавлении узла"""
+    ring = HashRing(["a", "b", "c"])
+    before = {key: ring.get_node(key) for key in KEYS}
+    ring.add_node("d")
+    moved = [key for key in KEYS if ring.get_node(key) != before[key]]
+
+    # Ключи переезжают только на новый узел, и их около 1/4
+    assert all(ring.get_node(key) == "d" for key in moved)
+    assert 400 < len(moved) < 1200
+
+    ring.remove_node("d")
+    assert all(ring.get_node(key) == before[key] for key in KEYS)
+
+def test_cache_routes_keys_to_shards(fake_redis_nodes):
+    """Тест размещения ключей на узлах по кольцу"""
+    fakes = fake_redis_nodes("node-a", "node-b")
+    for i in range(50):
+        set_cache(f"link:code{i}", f"https://example.com/{i}")
+
+    assert fakes["node-a"].store and fakes["node-b"].store
+    for i in range(50):
+        key = f"link:code{i}"
+        assert key in fakes[node_for(key).name].store
+        assert get_cache(key) == f"https://example.com/{i}"
+
+def test_batch_operations_grouped_per_shard(fake_redis_nodes):
+    """Тест пакетных операций: одна команда на каждый узел"""
+    fakes = fake_redis_nodes("node-a", "node-b", "node-c")
+    items = {f"stats:code{i}": {"access_count": i} for i in range(30)}
+    set_many(items, ttl=60)
+
+    calls = {name: fake.calls for name, fake in fakes.items()}
+    results = get_many(list(items) + ["stats:missing"])
+    assert results == items
+    for name, fake in fakes.items():
+        assert fake.calls - calls[name] <= 1
+
+    delete_many(items)
+    assert not any(fake.store for fake in fakes.values())
+
+def test_failed_shard_affects_only_its_keys(fake_redis_nodes):
+    """Тест отказа одного узла: ключи остальных узлов читаются из Redis"""
+    fakes = fake_redis_nodes("node-a", "node-b")
+    set_many({f"link:code{i}": f"https://example.com/{i}" for i in range(20)})
+    fakes["node-a"].fail = True
+
+    results = get_many([f"link:code{i}" for i in range(20)])
+    # Ключи упавшего узла берутся из кэша процесса
+    assert len(results) == 20
+
+    # Ключ, записанный в обход кэша процесса, доступен только из живого узла
+    key = next(key for key in KEYS if node_for(key).name == "node-b")
+    fakes["node-b"].store[key] = (b"https://fresh.example.com", None)
+    assert get_cache(key) == "https://fresh.example.com"
+
+def test_add_node_moves_part_of_keys(fake_redis_nodes):
+    """Тест добавления узла в работающий кэш"""
+    fake_redis_nodes("node-a", "node-b")
+    before = {key: node_for(key).name for key in KEYS}
+    add_node("node-c", FakeRedis("node-c"))
+    moved = [key for key in KEYS if node_for(key).name != before[key]]
+    assert all(node_for(key).name == "node-c" for key in moved)
+    assert len(moved) < len(KEYS) / 2
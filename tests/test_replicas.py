@@ -0,0 +1,99 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from starlette.requests import Request
+
+import app.database as database
+from app.database import Base, ReplicaPool, from_replica, get_read_db, mark_write, read_engine
+from app.main import app
+from app.models import Link
+
+
+def make_request(token=None, host="10.0.0.1"):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return Request({"type": "http", "headers": headers, "client": (host, 12345)})
+
+@pytest.fixture
+def replicas(tmp_path, monkeypatch):
+    """Две реплики на SQLite-файлах с разными данными"""
+    engines = []
+    for name in ("replica1", "replica2"):
+        replica = create_engine(f"sqlite:///{tmp_path / name}.db", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=replica)
+        with replica.begin() as connection:
+            connection.execute(Link.__table__.insert(), {"original_url": f"https://{name}.com", "short_code": name})
+        engines.append(replica)
+    pool = ReplicaPool(engines)
+    monkeypatch.setattr(database, "replica_pool", pool)
+    monkeypatch.setattr(database, "_recent_writes", {})
+    return engines
+
+def test_round_robin_between_replicas(replicas):
+    """Тест циклического выбора реплик"""
+    picked = [database.replica_pool.pick() for _ in range(4)]
+    assert picked == [replicas[0], replicas[1], replicas[0], replicas[1]]
+
+def test_unhealthy_replica_is_skipped(replicas, tmp_path):
+    """Тест исключения недоступной реплики"""
+    broken = create_engine(f"sqlite:///{tmp_path}/missing/dir/replica.db")
+    pool = ReplicaPool([broken, replicas[0]])
+    assert all(pool.pick() is replicas[0] for _ in range(3))
+
+    pool.mark_failed(replicas[0])
+    assert pool.pick() is None
+
+def test_read_session_uses_replica(replicas):
+    """Тест чтения с реплики через зависимость get_read_db"""
+    generator = get_read_db(make_request())
+    db = next(generator)
+    codes = [link.short_code for link in db.query(Link).all()]
+    assert codes in (["replica1"], ["replica2"])
+    assert from_replica(db)
+    generator.close()
+
+def test_read_your_writes_stickiness(replicas, monkeypatch):
+    """Тест чтения с основной БД сразу после изменения данных тем же клиентом"""
+    writer = make_request(token="writer")
+    other = make_request(token="other")
+    mark_write(writer)
+
+    assert read_engine(writer) is database.engine
+    assert read_engine(other) in replicas
+
+    # По истечении окна клиент снова читает с реплик
+    monkeypatch.setattr(database, "READ_YOUR_WRITES_WINDOW", 0)
+    assert read_engine(writer) in replicas
+
+def test_write_marker_is_shared_between_workers(replicas, fake_redis_nodes):
+    """Тест: отметку изменения видит и другой воркер (через Redis)"""
+    fakes = fake_redis_nodes("node-a")
+    writer = make_request(token="writer")
+    mark_write(writer)
+    # Другой воркер: в его памяти отметки нет
+    database._recent_writes.clear()
+
+    assert read_engine(writer) is database.engine
+    assert read_engine(make_request(token="other")) in replicas
+    assert not any(b"writer" in key.encode() for key in fakes["node-a"].store)
+
+    # Без Redis остается только отметка процесса
+    fakes["node-a"].fail = True
+    assert read_engine(writer) in replicas
+
+def test_replica_reads_are_not_cached(replicas, fake_redis_nodes, monkeypatch):
+    """Тест: ответы реплики не попадают в общие кэши"""
+    fakes = fake_redis_nodes("node-a")
+    monkeypatch.delitem(app.dependency_overrides, get_read_db, raising=False)
+    client = TestClient(app)
+    # Проверки доступности реплик выполняются заранее, вне бюджета запроса
+    assert all(database.replica_pool.is_healthy(replica) for replica in replicas)
+
+    response = client.get("/links/search", params={"original_url": "replica"})
+
+    assert len(response.json()) == 1
+    assert not [key for key in fakes["node-a"].store if key.startswith("search:")]
+
+def test_no_replicas_falls_back_to_primary(monkeypatch):
+    """Тест чтения с основной БД, если реплики не настроены"""
+    monkeypatch.setattr(database, "replica_pool", ReplicaPool())
+    assert read_engine(make_request()) is database.engine
@@ -0,0 +1,51 @@
+import asyncio
+import io
+from datetime import datetime
+
+from app.models import Link, LinkStat
+from app.seed import generate, seed, short_code_for
+from app.tasks import cleanup_expired_links
+
+NOW = datetime(2024, 6, 1)
+
+def test_generate_is_deterministic():
+    """Тест того, что одинаковый seed дает одинаковые данные"""
+    first = list(generate(200, seed=7, now=NOW))
+    assert first == list(generate(200, seed=7, now=NOW))
+    assert first != list(generate(200, seed=8, now=NOW))
+
+def test_short_codes_are_unique():
+    """Тест уникальности кодов и их длины (не пересекаются с кодами API)"""
+    codes = {short_code_for(link_id) for link_id in range(1, 100001)}
+    assert len(codes) == 100000
+    assert all(len(code) == 7 for code in codes)
+
+def test_seed_loads_batches(db_session):
+    """Тест загрузки пакетами, корпуса и реалистичных распределений"""
+    engine = db_session.bind
+    corpus = io.StringIO()
+
+    result = seed(engine, 1000, seed=1, batch_size=300, max_stats_per_link=5, corpus_file=corpus, now=NOW)
+
+    assert result["links"] == db_session.query(Link).count() == 1000
+    assert result["stats"] == db_session.query(LinkStat).count()
+    assert len(corpus.getvalue().splitlines()) == 1000
+    # Переходы смещены: 10% ссылок собирают больше половины переходов
+    counts = sorted((count for count, in db_session.query(Link.access_count)), reverse=True)
+    assert sum(counts[:100]) > sum(counts) / 2
+    # Даты читаются ORM, часть ссылок уже истекла
+    assert isinstance(db_session.query(Link).first().created_at, datetime)
+    assert db_session.query(Link).filter(Link.expires_at < datetime.utcnow()).count() > 0
+
+    # Повторный запуск продолжает id и не конфликтует по кодам
+    seed(engine, 100, seed=1, batch_size=300, now=NOW)
+    assert db_session.query(Link).count() == 1100
+
+def test_cleanup_on_seeded_data(db_session):
+    """Тест очистки истекших ссылок на сгенерированных данных"""
+    seed(db_session.bind, 500, seed=3, now=NOW)
+    expired = db_session.query(Link).filter(Link.expires_at < datetime.utcnow()).count()
+
+    deleted = asyncio.run(cleanup_expired_links(db_session))
+
+    assert deleted == expired > 0
@@ -0,0 +1,36 @@
+import json
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models import Link
+from app.redis_client import get_raw, set_raw
+from app.schemas import Link as LinkResponse
+from app.serialization import LINK_COLUMNS, dump_links
+
+def test_dump_links_matches_pydantic(db_session):
+    """Тест совпадения быстрой сериализации с ответом через схему pydantic"""
+    db_session.add_all([
+        Link(original_url="https://example.com/a", short_code="a", access_count=3, project="p",
+             expires_at=datetime(2030, 1, 1, 12, 30, 15, 123456)),
+        Link(original_url="https://example.com/b", short_code="b", custom_alias="b", access_count=0,
+             last_accessed=datetime.utcnow() - timedelta(days=1)),
+    ])
+    db_session.commit()
+
+    expected = [jsonable_encoder(LinkResponse.from_orm(link)) for link in db_session.query(Link).order_by(Link.id)]
+    body = dump_links(db_session.query(*LINK_COLUMNS).order_by(Link.id).all())
+
+    assert isinstance(body, bytes)
+    assert json.loads(body) == expected
+
+def test_raw_cache_roundtrip(fake_redis_nodes):
+    """Тест хранения готовых байтов в кэше без перекодирования"""
+    fakes = fake_redis_nodes("node-a")
+    body = b'[{"id":1}]'
+    set_raw("search:1:example", body, 60)
+    assert get_raw("search:1:example") == body
+
+    # Без Redis байты отдаются из кэша процесса
+    fakes["node-a"].fail = True
+    assert get_raw("search:1:example") == body
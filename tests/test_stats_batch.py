@@ -0,0 +1,56 @@
+from fastapi.testclient import TestClient
+
+import app.query_budget as query_budget
+from app.main import app
+from app.models import Link
+
+client = TestClient(app)
+
+def test_stats_batch(app_db, fake_redis_nodes, monkeypatch):
+    """Тест статистики нескольких ссылок: один MGET на узел, один запрос IN на промахи"""
+    monkeypatch.setattr(query_budget, "QUERY_DEBUG_HEADERS", True)
+    fakes = fake_redis_nodes("node-a", "node-b")
+    mgets = []
+
+    def counting(fake):
+        mget = fake.mget
+
+        def wrapper(keys, *args):
+            mgets.append(fake.name)
+            return mget(keys, *args)
+        return wrapper
+
+    for fake in fakes.values():
+        monkeypatch.setattr(fake, "mget", counting(fake))
+    db = app_db()
+    db.add_all([
+        Link(original_url=f"https://example.com/{i}", short_code=f"batch{i}", access_count=i)
+        for i in range(10)
+    ])
+    db.commit()
+    db.close()
+    codes = [f"batch{i}" for i in range(10)] + ["missing", "batch0"]
+
+    cold = client.post("/links/stats/batch", json={"codes": codes})
+
+    assert cold.status_code == 200
+    body = cold.json()
+    assert list(body) == [f"batch{i}" for i in range(10)] + ["missing"]
+    assert body["batch3"]["access_count"] == 3
+    assert body["batch3"]["original_url"] == "https://example.com/3"
+    assert body["missing"] is None
+    assert cold.headers["x-db-queries"] == "1"
+    assert sorted(mgets) == ["node-a", "node-b"]
+
+    # Статистика найденных ссылок уже в кэше: в БД идет только запрос по промаху
+    warm = client.post("/links/stats/batch", json={"codes": codes})
+    assert warm.json() == body
+    assert warm.headers["x-db-queries"] == "1"
+    cached = client.post("/links/stats/batch", json={"codes": codes[:10]})
+    assert cached.headers["x-db-queries"] == "0"
+    assert cached.json()["batch9"] == client.get("/links/batch9/stats").json()
+
+def test_stats_batch_limits(app_db):
+    """Тест ограничений на размер запроса"""
+    assert client.post("/links/stats/batch", json={"codes": []}).status_code == 422
+    assert client.post("/links/stats/batch", json={"codes": ["x"] * 501}).status_code == 422
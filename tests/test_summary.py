@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.query_budget as query_budget
+from app.main import app
+from app.models import Link, LinkStat
+from app.project_clicks import flush_project_clicks
+
+client = TestClient(app)
+
+@pytest.fixture
+def alice(app_db):
+    client.post("/auth/register", json={"email": "alice@example.com", "password": "testpassword"})
+    response = client.post("/auth/token", data={"username": "alice@example.com", "password": "testpassword"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def shorten(headers, **data):
+    response = client.post("/links/shorten", json={"original_url": "https://example.com/", **data}, headers=headers)
+    return response.json()["short_code"]
+
+def test_links_summary(app_db, alice, fake_redis_nodes, monkeypatch):
+    """Тест сводки: агрегаты одним запросом, кэш и очистка при изменении ссылок"""
+    monkeypatch.setattr(query_budget, "QUERY_DEBUG_HEADERS", True)
+    fake_redis_nodes("node-a")
+    soon = (datetime.utcnow() + timedelta(days=2)).isoformat()
+    later = (datetime.utcnow() + timedelta(days=30)).isoformat()
+    docs = shorten(alice, project="docs", expires_at=soon)
+    blog = shorten(alice, project="blog", expires_at=later)
+    shorten(alice)
+    shorten(None, project="docs")
+    for _ in range(3):
+        client.get(f"/links/{docs}/redirect/")
+    client.get(f"/links/{blog}/redirect/")
+    # Переход недельной давности
+    db = app_db()
+    link_id = db.query(Link.id).filter(Link.short_code == blog).scalar()
+    db.add(LinkStat(link_id=link_id, accessed_at=datetime.utcnow() - timedelta(days=3)))
+    db.commit()
+    flush_project_clicks(db)
+    db.close()
+
+    response = client.get("/links/summary", headers=alice)
+
+    assert response.status_code == 200
+    # Пользователь, счетчики проектов, ссылки без проекта, переходы за неделю
+    assert response.headers["x-db-queries"] == "4"
+    summary = response.json()
+    assert (summary["total_links"], summary["total_clicks"], summary["expiring_soon"]) == (3, 4, 1)
+    assert (summary["clicks_24h"], summary["clicks_7d"]) == (4, 5)
+    assert summary["top_projects"] == [
+        {"name": "docs", "link_count": 1, "click_count": 3},
+        {"name": "blog", "link_count": 1, "click_count": 1},
+    ]
+
+    # Повторный запрос из кэша, удаление ссылки его очищает
+    assert client.get("/links/summary", headers=alice).headers["x-db-queries"] == "1"
+    client.delete(f"/links/{docs}", headers=alice)
+    response = client.get("/links/summary", headers=alice)
+    summary = response.json()
+    assert (summary["total_links"], summary["total_clicks"], summary["expiring_soon"]) == (2, 1, 0)
+    assert [project["name"] for project in summary["top_projects"]] == ["blog"]
+    # Переходы за сутки и неделю пересчитываются только по истечении своего TTL
+    assert response.headers["x-db-queries"] == "3"
+    assert (summary["clicks_24h"], summary["clicks_7d"]) == (4, 5)
+
+def test_links_summary_with_many_stats(app_db, alice, fake_redis_nodes, monkeypatch):
+    """Тест бюджета запросов сводки для владельца с большой статистикой"""
+    monkeypatch.setattr(query_budget, "QUERY_DEBUG_HEADERS", True)
+    fake_redis_nodes("node-a")
+    codes = [shorten(alice, project=f"project{i % 3}") for i in range(6)] + [shorten(alice)]
+    db = app_db()
+    link_ids = [link_id for link_id, in db.query(Link.id).filter(Link.short_code.in_(codes))]
+    now = datetime.utcnow()
+    db.bulk_insert_mappings(LinkStat, [
+        {"link_id": link_ids[i % len(link_ids)], "accessed_at": now - timedelta(hours=i % 168)}
+        for i in range(5000)
+    ])
+    db.commit()
+    db.close()
+
+    response = client.get("/links/summary", headers=alice)
+
+    assert response.headers["x-db-queries"] == "4"
+    assert int(response.headers["x-db-rows"]) <= 10
+    summary = response.json()
+    assert summary["total_links"] == 7
+    assert summary["clicks_7d"] == 5000
+    assert summary["clicks_24h"] == sum(1 for i in range(5000) if i % 168 < 24)
+
+def test_links_summary_requires_auth(app_db):
+    assert client.get("/links/summary").status_code == 401
@@ -1,7 +1,9 @@
 import pytest
 import asyncio
 from datetime import datetime, timedelta
-from app.tasks import cleanup_inactive_links, cleanup_expired_links, scheduled_cleanup
+import time
+import app.tasks as tasks
+from app.tasks import cleanup_inactive_links, cleanup_expired_links, scheduled_cleanup, warm_cache, warm_up_cache_on_startup, purge_deleted_links
 from app.models import Link, LinkStat
 
 @pytest.mark.asyncio
@@ -127,4 +129,79 @@ async def test_cleanup_empty_results(db_session):
     deleted_inactive = await cleanup_inactive_links(db_session, days_inactive=30)
     
     assert deleted_expired == 0
-    assert deleted_inactive == 0
\ No newline at end of file
+    assert deleted_inactive == 0
+
+def test_warm_cache_loads_hot_links(db_session, fake_redis_nodes):
+    """Тест прогрева кэша самыми популярными ссылками"""
+    fakes = fake_redis_nodes("node-a", "node-b")
+    db_session.add_all([
+        Link(original_url="https://example.com/hot", short_code="hot", access_count=100),
+        Link(original_url="https://example.com/warm", short_code="warm", access_count=50),
+        Link(original_url="https://example.com/cold", short_code="cold", access_count=1),
+        Link(original_url="https://example.com/expiring", short_code="expiring", access_count=500,
+             expires_at=datetime.utcnow() + timedelta(hours=1)),
+    ])
+    db_session.commit()
+
+    warmed = warm_cache(db_session, limit=2)
+
+    assert warmed == 2
+    cached = {}
+    for fake in fakes.values():
+        cached.update(fake.store)
+    assert set(cached) == {"link:hot", "link:warm"}
+
+def test_warm_cache_respects_deadline(db_session, fake_redis_nodes):
+    """Тест остановки прогрева по истечении бюджета времени"""
+    fakes = fake_redis_nodes("node-a")
+    db_session.add(Link(original_url="https://example.com/hot", short_code="hot", access_count=100))
+    db_session.commit()
+
+    assert warm_cache(db_session, limit=10, deadline=time.monotonic() - 1) == 0
+    assert not fakes["node-a"].store
+
+@pytest.mark.asyncio
+async def test_warm_up_on_startup_time_budget(monkeypatch):
+    """Тест: медленный прогрев не задерживает старт дольше бюджета"""
+    def slow_job(limit, deadline):
+        time.sleep(0.5)
+        return limit
+
+    monkeypatch.setattr("app.tasks._warm_cache_job", slow_job)
+
+    started = time.monotonic()
+    warmed = await warm_up_cache_on_startup(limit=10, budget=0.05)
+    assert warmed == 0
+    assert time.monotonic() - started < 0.4
+
+    assert await warm_up_cache_on_startup(limit=0, budget=1) == 0
+
+
+def test_purge_deleted_links_in_chunks(db_session):
+    """Тест порционной очистки статистики и удаленных ссылок"""
+    deleted = Link(original_url="https://example.com/deleted", short_code="deleted", is_active=False)
+    alive = Link(original_url="https://example.com/alive", short_code="alive")
+    db_session.add_all([deleted, alive])
+    db_session.commit()
+    db_session.add_all([LinkStat(link_id=deleted.id) for _ in range(7)] + [LinkStat(link_id=alive.id)])
+    db_session.commit()
+
+    # Ограничение по количеству порций: за вызов удаляется не больше 2 * 3 записей
+    assert purge_deleted_links(db_session, chunk_size=3, max_chunks=2) == {"stats": 6, "links": 0}
+    assert purge_deleted_links(db_session, chunk_size=3) == {"stats": 1, "links": 1}
+
+    assert db_session.query(Link.short_code).all() == [("alive",)]
+    assert db_session.query(LinkStat).count() == 1
+    assert purge_deleted_links(db_session) == {"stats": 0, "links": 0}
+
+def test_purge_skipped_without_deleted_links(db_session, monkeypatch):
+    """Тест: без удаленных ссылок очистка не выполняет DELETE"""
+    db_session.add(Link(original_url="https://example.com/alive", short_code="alive"))
+    db_session.commit()
+
+    def unexpected(db, chunk_size):
+        raise AssertionError("DELETE без удаленных ссылок")
+
+    monkeypatch.setattr(tasks, "purge_stats_chunk", unexpected)
+    monkeypatch.setattr(tasks, "purge_links_chunk", unexpected)
+    assert purge_deleted_links(db_session) == {"stats": 0, "links": 0}